@@ -0,0 +1,151 @@
+"""In-process TTL/LRU cache for the query API's results."""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+from core.config import app_settings, logging_settings
+from core.logging.logger import get_logger
+from models.crawl_models import CrawlRun
+from sqlalchemy import func, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+log = get_logger(__name__, level=logging_settings.LOG_LEVEL)
+
+
+class QueryCache:
+    """In-process TTL/LRU cache of query results.
+
+    Entries expire after ttl seconds & the least recently used entries are
+    evicted past max_entries. Concurrent misses on the same key share one
+    load, so a burst of identical requests runs the query once.
+
+    clear() is called when a new crawl run is recorded, see
+    invalidate_if_crawled(). Loads started before a clear() are returned to
+    their callers but not cached.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300):
+        """Cache up to max_entries results for ttl seconds each."""
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self.entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.loading: dict[Hashable, asyncio.Future] = {}
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+        ## Latest crawl_runs id seen, & when the table was last checked
+        self.crawl_run_id: int | None = None
+        self.last_crawl_check = 0.0
+
+    def get(self, key: Hashable = None) -> tuple[bool, Any]:
+        """Return (found, value) for key. Expired entries are dropped."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return False, None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return False, None
+
+        self.entries.move_to_end(key)
+
+        return True, value
+
+    def set(self, key: Hashable = None, value: Any = None) -> None:
+        """Cache value under key, evicting the least recently used past max_entries."""
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every entry. Loads already running finish but aren't cached."""
+        self.entries.clear()
+        self.generation += 1
+
+    async def get_or_load(
+        self, key: Hashable = None, loader: Callable[[], Awaitable[Any]] = None
+    ) -> Any:
+        """Return the cached value for key, or await loader() & cache its result."""
+        found, value = self.get(key)
+        if found:
+            self.hits += 1
+            return value
+
+        ## Another request is already running this query, wait for its result
+        pending = self.loading.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        generation = self.generation
+        pending = asyncio.ensure_future(loader())
+        self.loading[key] = pending
+        try:
+            ## Shielded so a disconnecting client doesn't cancel the load
+            #  for requests waiting on it
+            value = await asyncio.shield(pending)
+        finally:
+            self.loading.pop(key, None)
+
+        if generation == self.generation:
+            self.set(key, value)
+
+        return value
+
+    async def invalidate_if_crawled(
+        self, db: AsyncSession = None, check_interval: float = 5
+    ) -> None:
+        """Clear the cache if a crawl finished since the last check.
+
+        The crawl_runs table is checked at most once every check_interval
+        seconds, so cache hits don't wait on the database.
+        """
+        now = time.monotonic()
+        if now - self.last_crawl_check < check_interval:
+            return
+
+        ## Set before awaiting, so concurrent requests don't all check
+        self.last_crawl_check = now
+
+        try:
+            crawl_run_id = await db.scalar(select(func.max(CrawlRun.id)))
+        except DBAPIError as exc:
+            await db.rollback()
+            ## crawl_runs doesn't exist until the first crawl with this
+            #  version. Entries still expire after ttl seconds
+            log.debug(f"Can't check crawl_runs, relying on cache TTL. Details: {exc}")
+            return
+
+        if crawl_run_id != self.crawl_run_id:
+            if self.crawl_run_id is not None or self.entries:
+                log.info(f"Crawl run #{crawl_run_id} finished, clearing query cache")
+                self.clear()
+
+            self.crawl_run_id = crawl_run_id
+
+    def stats(self) -> dict:
+        """Return entry count, limits & hit ratio, for /health."""
+        lookups = self.hits + self.misses
+
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "crawl_run_id": self.crawl_run_id,
+        }
+
+
+query_cache = QueryCache(
+    max_entries=app_settings.API_CACHE_MAX_ENTRIES, ttl=app_settings.API_CACHE_TTL
+)
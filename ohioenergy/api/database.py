@@ -0,0 +1,89 @@
+"""Async read-only engine & sessions for the query API."""
+from functools import lru_cache
+from typing import AsyncIterator, Union
+
+from core.config import database_settings
+from core.database import (
+    SQLALCHEMY_READONLY_DATABASE_URI,
+    is_sqlite_uri,
+    set_sqlite_readonly_pragmas,
+)
+from sqlalchemy import URL, event, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+## Async drivers for each backend the crawler can write to
+async_drivers = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+psycopg",
+}
+
+
+def to_async_uri(uri: Union[str, URL] = None) -> URL:
+    """Swap a database URI's driver for its backend's async driver."""
+    if not uri:
+        raise ValueError("Missing uri")
+
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend not in async_drivers:
+        raise ValueError(
+            f"Unsupported database backend: {backend}. "
+            f"Must be one of {list(async_drivers)}"
+        )
+
+    return url.set(drivername=async_drivers[backend])
+
+
+def build_async_engine(uri: Union[str, URL] = None) -> AsyncEngine:
+    """Create an async engine with read-only connections to uri.
+
+    SQLite connections get the read-only pragmas from core.database,
+    PostgreSQL transactions are opened as READ ONLY.
+    """
+    url = to_async_uri(uri)
+
+    engine_kwargs = {
+        "echo": database_settings.DB_ECHO,
+        "pool_size": database_settings.DB_POOL_SIZE,
+        "max_overflow": database_settings.DB_MAX_OVERFLOW,
+        "pool_timeout": database_settings.DB_POOL_TIMEOUT,
+    }
+
+    sqlite = is_sqlite_uri(url)
+    if not sqlite:
+        engine_kwargs["execution_options"] = {"postgresql_readonly": True}
+
+    _engine = create_async_engine(url, **engine_kwargs)
+
+    if sqlite:
+        ## Pool events are only sent by the sync engine the async engine wraps
+        event.listen(_engine.sync_engine, "connect", set_sqlite_readonly_pragmas)
+
+    return _engine
+
+
+@lru_cache(maxsize=1)
+def get_async_engine() -> AsyncEngine:
+    """Return the API's read-only async engine, created on first call.
+
+    Connects to DB_READONLY_URI when it's set, like core.database's
+    get_readonly_engine().
+    """
+    return build_async_engine(SQLALCHEMY_READONLY_DATABASE_URI)
+
+
+@lru_cache(maxsize=1)
+def get_async_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    """Return the sessionmaker for get_async_db(), created on first call."""
+    return async_sessionmaker(get_async_engine(), expire_on_commit=False)
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency, yield a read-only session per request."""
+    async with get_async_sessionmaker()() as db:
+        yield db
@@ -0,0 +1,40 @@
+"""FastAPI dependencies shared by the routers."""
+from typing import Awaitable, Callable, Hashable
+
+from core.config import app_settings
+from fastapi import Depends, Response
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.cache import QueryCache, query_cache
+from api.database import get_async_db
+
+
+async def get_query_cache(db: AsyncSession = Depends(get_async_db)) -> QueryCache:
+    """FastAPI dependency, return the query cache, cleared if a crawl finished."""
+    await query_cache.invalidate_if_crawled(
+        db=db, check_interval=app_settings.API_CRAWL_CHECK_INTERVAL
+    )
+
+    return query_cache
+
+
+async def cached_json(
+    cache: QueryCache = None,
+    key: Hashable = None,
+    loader: Callable[[], Awaitable[BaseModel]] = None,
+) -> Response:
+    """Return loader()'s result as a JSON response, cached under key.
+
+    The encoded JSON is cached instead of the rows, so cache hits skip the
+    query & serialization.
+    """
+
+    async def load() -> bytes:
+        result = await loader()
+
+        return result.json().encode()
+
+    body = await cache.get_or_load(key=key, loader=load)
+
+    return Response(content=body, media_type="application/json")
@@ -0,0 +1,54 @@
+"""Read-only query API over the providers database.
+
+Requires the api dependency group: pdm install -G api. Run from the
+ohioenergy/ app directory:
+
+    uvicorn api.main:app --host 127.0.0.1 --port 8000
+
+Results are cached in-process & cleared when a crawl finishes, see
+api.cache. Configure with the APP_* & API_* settings in
+core/env_files/.env (see .env.example).
+"""
+from contextlib import asynccontextmanager
+
+from core.config import app_settings, logging_settings
+from core.logging.logger import get_logger
+from fastapi import Depends, FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.cache import query_cache
+from api.database import get_async_db, get_async_engine
+from api.routers import offers, providers
+
+log = get_logger(__name__, level=logging_settings.LOG_LEVEL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Log startup & dispose of the database engine on shutdown."""
+    log.info(f"Starting {app_settings.APP_TITLE} v{app_settings.APP_VERSION}")
+
+    yield
+
+    await get_async_engine().dispose()
+
+
+app = FastAPI(
+    title=app_settings.APP_TITLE,
+    description=app_settings.APP_DESCRIPTION,
+    version=app_settings.APP_VERSION,
+    lifespan=lifespan,
+)
+
+app.include_router(offers.router)
+app.include_router(providers.router)
+
+
+@app.get("/health", tags=["health"])
+async def health(db: AsyncSession = Depends(get_async_db)) -> dict:
+    """Check the database is reachable & report query cache stats."""
+    await query_cache.invalidate_if_crawled(
+        db=db, check_interval=app_settings.API_CRAWL_CHECK_INTERVAL
+    )
+
+    return {"status": "ok", "cache": query_cache.stats()}
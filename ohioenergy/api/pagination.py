@@ -0,0 +1,79 @@
+"""Keyset pagination with opaque cursors."""
+import base64
+import json
+from decimal import Decimal
+from typing import Any, Callable, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import ColumnElement, Select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def encode_cursor(values: Sequence[Any] = None) -> str:
+    """Encode the sort key of a page's last row as an opaque cursor."""
+    if values is None:
+        raise ValueError("Missing values")
+
+    ## Decimals are kept as strings so prices round trip exactly
+    payload = json.dumps(
+        [str(v) if isinstance(v, Decimal) else v for v in values],
+        separators=(",", ":"),
+    )
+
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str = None, size: int = None) -> list[Any]:
+    """Decode a cursor from encode_cursor(). Raise a 400 if it's not valid."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if not isinstance(values, list) or (size is not None and len(values) != size):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return values
+
+
+def keyset_after(
+    columns: Sequence[ColumnElement] = None,
+    values: Sequence[Any] = None,
+    descending: bool = False,
+) -> ColumnElement[bool]:
+    """Filter for rows sorted after values, on columns in the same order.
+
+    Expanded to (a > x) OR (a = x AND b > y) ..., instead of a row value
+    comparison, so it works on SQLite & PostgreSQL & can use the sort index.
+    """
+    if not columns or values is None or len(columns) != len(values):
+        raise ValueError("columns & values must be the same length")
+
+    clauses = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        after = column < value if descending else column > value
+        clauses.append(and_(*[c == v for c, v in zip(columns[:i], values[:i])], after))
+
+    return or_(*clauses)
+
+
+async def fetch_page(
+    db: AsyncSession = None,
+    stmt: Select = None,
+    limit: int = 50,
+    sort_key: Callable[[Any], Sequence[Any]] = None,
+) -> tuple[list[Any], str | None]:
+    """Run a sorted select for one page.
+
+    Fetches one row over limit to know if there is a next page. Returns the
+    page's rows & the cursor for the next page, or None on the last page.
+    """
+    rows = list(await db.scalars(stmt.limit(limit + 1)))
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(sort_key(rows[-1]))
+
+    return rows, next_cursor
@@ -0,0 +1,209 @@
+"""Offer snapshot endpoints: latest, cheapest & history."""
+from decimal import Decimal
+from typing import Optional
+
+from core.config import app_settings
+from fastapi import APIRouter, Depends, Query, Response
+from models.snapshot_models import OfferSnapshot
+from sqlalchemy import Select, and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.cache import QueryCache
+from api.database import get_async_db
+from api.dependencies import cached_json, get_query_cache
+from api.pagination import decode_cursor, fetch_page, keyset_after
+from api.schemas import OfferSnapshotOut, OfferSnapshotPage
+
+router = APIRouter(tags=["offers"])
+
+
+def latest_offers_stmt(
+    territory_id: int = None, utility_type: str = None, rate_type: str = None
+) -> Select:
+    """Select the offers from the latest scrape of each of a territory's rate codes.
+
+    Every offer on a comparison page shares the page's scrape_epoch, so the
+    latest page for each rate code is the rows at its max scrape_epoch.
+    """
+    if territory_id is None:
+        raise ValueError("Missing territory_id")
+
+    filters = [OfferSnapshot.territory_id == territory_id]
+    if utility_type:
+        filters.append(OfferSnapshot.utility_type == utility_type)
+
+    latest = (
+        select(
+            OfferSnapshot.rate_code,
+            func.max(OfferSnapshot.scrape_epoch).label("scrape_epoch"),
+        )
+        .where(*filters)
+        .group_by(OfferSnapshot.rate_code)
+        .subquery()
+    )
+
+    stmt = (
+        select(OfferSnapshot)
+        .join(
+            latest,
+            and_(
+                OfferSnapshot.rate_code == latest.c.rate_code,
+                OfferSnapshot.scrape_epoch == latest.c.scrape_epoch,
+            ),
+        )
+        .where(*filters)
+    )
+    if rate_type:
+        stmt = stmt.where(OfferSnapshot.rate_type == rate_type)
+
+    return stmt
+
+
+@router.get(
+    "/territories/{territory_id}/offers",
+    response_model=OfferSnapshotPage,
+    summary="Latest offers in a territory",
+)
+async def latest_offers(
+    territory_id: int,
+    utility_type: Optional[str] = None,
+    rate_type: Optional[str] = None,
+    limit: int = Query(default=50, ge=1, le=app_settings.API_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    cache: QueryCache = Depends(get_query_cache),
+) -> Response:
+    """List offers from the latest scrape of each rate code, by id."""
+
+    async def load() -> OfferSnapshotPage:
+        stmt = latest_offers_stmt(
+            territory_id=territory_id, utility_type=utility_type, rate_type=rate_type
+        ).order_by(OfferSnapshot.id)
+        if cursor:
+            (after_id,) = decode_cursor(cursor, size=1)
+            stmt = stmt.where(OfferSnapshot.id > after_id)
+
+        rows, next_cursor = await fetch_page(
+            db=db, stmt=stmt, limit=limit, sort_key=lambda row: [row.id]
+        )
+
+        return OfferSnapshotPage(
+            items=[OfferSnapshotOut.from_orm(row) for row in rows],
+            next_cursor=next_cursor,
+        )
+
+    return await cached_json(
+        cache=cache,
+        key=("latest", territory_id, utility_type, rate_type, limit, cursor),
+        loader=load,
+    )
+
+
+@router.get(
+    "/territories/{territory_id}/cheapest",
+    response_model=OfferSnapshotPage,
+    summary="Cheapest current offers in a territory",
+)
+async def cheapest_offers(
+    territory_id: int,
+    utility_type: Optional[str] = None,
+    rate_type: str = "Fixed",
+    limit: int = Query(default=10, ge=1, le=app_settings.API_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    cache: QueryCache = Depends(get_query_cache),
+) -> Response:
+    """List offers from the latest scrape, sorted by price per kWh/ccf."""
+
+    async def load() -> OfferSnapshotPage:
+        sort_columns = [OfferSnapshot.price_cents, OfferSnapshot.id]
+        stmt = (
+            latest_offers_stmt(
+                territory_id=territory_id,
+                utility_type=utility_type,
+                rate_type=rate_type,
+            )
+            .where(OfferSnapshot.price_cents.is_not(None))
+            .order_by(*sort_columns)
+        )
+        if cursor:
+            after_price, after_id = decode_cursor(cursor, size=2)
+            stmt = stmt.where(
+                keyset_after(sort_columns, [Decimal(after_price), after_id])
+            )
+
+        rows, next_cursor = await fetch_page(
+            db=db,
+            stmt=stmt,
+            limit=limit,
+            sort_key=lambda row: [row.price_cents, row.id],
+        )
+
+        return OfferSnapshotPage(
+            items=[OfferSnapshotOut.from_orm(row) for row in rows],
+            next_cursor=next_cursor,
+        )
+
+    return await cached_json(
+        cache=cache,
+        key=("cheapest", territory_id, utility_type, rate_type, limit, cursor),
+        loader=load,
+    )
+
+
+@router.get(
+    "/offers/history",
+    response_model=OfferSnapshotPage,
+    summary="A provider's offers over time",
+)
+async def offer_history(
+    name: str,
+    territory_id: Optional[int] = None,
+    rate_type: Optional[str] = None,
+    since: Optional[int] = Query(
+        default=None, description="Only offers scraped at or after this Unix time"
+    ),
+    limit: int = Query(default=50, ge=1, le=app_settings.API_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    cache: QueryCache = Depends(get_query_cache),
+) -> Response:
+    """List a provider's offers newest first.
+
+    Filtered on the (name, scrape_epoch) index.
+    """
+
+    async def load() -> OfferSnapshotPage:
+        sort_columns = [OfferSnapshot.scrape_epoch, OfferSnapshot.id]
+        stmt = select(OfferSnapshot).where(OfferSnapshot.name == name)
+        if territory_id is not None:
+            stmt = stmt.where(OfferSnapshot.territory_id == territory_id)
+        if rate_type:
+            stmt = stmt.where(OfferSnapshot.rate_type == rate_type)
+        if since is not None:
+            stmt = stmt.where(OfferSnapshot.scrape_epoch >= since)
+        if cursor:
+            stmt = stmt.where(
+                keyset_after(
+                    sort_columns, decode_cursor(cursor, size=2), descending=True
+                )
+            )
+        stmt = stmt.order_by(*[column.desc() for column in sort_columns])
+
+        rows, next_cursor = await fetch_page(
+            db=db,
+            stmt=stmt,
+            limit=limit,
+            sort_key=lambda row: [row.scrape_epoch, row.id],
+        )
+
+        return OfferSnapshotPage(
+            items=[OfferSnapshotOut.from_orm(row) for row in rows],
+            next_cursor=next_cursor,
+        )
+
+    return await cached_json(
+        cache=cache,
+        key=("history", name, territory_id, rate_type, since, limit, cursor),
+        loader=load,
+    )
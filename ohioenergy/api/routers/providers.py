@@ -0,0 +1,79 @@
+"""Provider lookup endpoints."""
+from typing import Optional
+
+from core.config import app_settings
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from models.provider_models import OhioenergyProvider
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.cache import QueryCache
+from api.database import get_async_db
+from api.dependencies import cached_json, get_query_cache
+from api.pagination import decode_cursor, fetch_page, keyset_after
+from api.schemas import ProviderOut, ProviderPage
+
+router = APIRouter(prefix="/providers", tags=["providers"])
+
+
+@router.get("", response_model=ProviderPage, summary="Look up providers")
+async def list_providers(
+    name: Optional[str] = Query(
+        default=None, description="Providers whose name starts with this"
+    ),
+    utility_type: Optional[str] = None,
+    territory_id: Optional[int] = None,
+    limit: int = Query(default=50, ge=1, le=app_settings.API_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    cache: QueryCache = Depends(get_query_cache),
+) -> Response:
+    """List stored provider offers, sorted by name."""
+
+    async def load() -> ProviderPage:
+        sort_columns = [OhioenergyProvider.name, OhioenergyProvider.id]
+        stmt = select(OhioenergyProvider)
+        if name:
+            ## Escape LIKE wildcards, so name is only matched as a prefix
+            prefix = name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            stmt = stmt.where(OhioenergyProvider.name.like(f"{prefix}%", escape="\\"))
+        if utility_type:
+            stmt = stmt.where(OhioenergyProvider.utility_type == utility_type)
+        if territory_id is not None:
+            stmt = stmt.where(OhioenergyProvider.territory_id == territory_id)
+        if cursor:
+            stmt = stmt.where(keyset_after(sort_columns, decode_cursor(cursor, size=2)))
+        stmt = stmt.order_by(*sort_columns)
+
+        rows, next_cursor = await fetch_page(
+            db=db, stmt=stmt, limit=limit, sort_key=lambda row: [row.name, row.id]
+        )
+
+        return ProviderPage(
+            items=[ProviderOut.from_orm(row) for row in rows],
+            next_cursor=next_cursor,
+        )
+
+    return await cached_json(
+        cache=cache,
+        key=("providers", name, utility_type, territory_id, limit, cursor),
+        loader=load,
+    )
+
+
+@router.get("/{provider_id}", response_model=ProviderOut, summary="Get a provider")
+async def get_provider(
+    provider_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    cache: QueryCache = Depends(get_query_cache),
+) -> Response:
+    """Return one stored provider offer, or a 404."""
+
+    async def load() -> ProviderOut:
+        provider = await db.get(OhioenergyProvider, provider_id)
+        if provider is None:
+            raise HTTPException(status_code=404, detail="Provider not found")
+
+        return ProviderOut.from_orm(provider)
+
+    return await cached_json(cache=cache, key=("provider", provider_id), loader=load)
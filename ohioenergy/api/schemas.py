@@ -0,0 +1,72 @@
+"""Response models for the query API."""
+from decimal import Decimal
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class OfferSnapshotOut(BaseModel):
+    """An offer snapshot row."""
+
+    id: int
+    scrape_epoch: int
+    utility_type: str
+    territory_id: Optional[int]
+    rate_code: Optional[int]
+    name: str
+    url: Optional[str]
+    rate_type: Optional[str]
+    price_cents: Optional[Decimal]
+    term_months: Optional[int]
+    early_term_fee: Optional[Decimal]
+    monthly_fee: Optional[Decimal]
+    percent_renewable: Optional[float]
+    intro_price: Optional[bool]
+    promo_offer: Optional[str]
+
+    class Config:
+        """Read fields from ORM rows."""
+
+        orm_mode = True
+
+
+class ProviderOut(BaseModel):
+    """A stored provider offer row, fields as scraped."""
+
+    id: str
+    utility_type: str
+    territory_id: Optional[int]
+    rate_code: Optional[int]
+    scrape_timestamp: str
+    name: str
+    address: str
+    phone: str
+    url: str
+    price: str
+    rate_type: str
+    percent_renewable: str
+    intro_price: str
+    term_length: str
+    early_term_fee: str
+    monthly_fee: str
+    promo_offer: str
+
+    class Config:
+        """Read fields from ORM rows."""
+
+        orm_mode = True
+
+
+class OfferSnapshotPage(BaseModel):
+    """One page of offer snapshots."""
+
+    items: list[OfferSnapshotOut]
+    ## Pass as cursor to get the next page. None on the last page
+    next_cursor: Optional[str]
+
+
+class ProviderPage(BaseModel):
+    """One page of provider offers."""
+
+    items: list[ProviderOut]
+    next_cursor: Optional[str]
@@ -0,0 +1,256 @@
+"""Backfill the providers table from the .cache/providers/ msgpack archive.
+
+Archive files are decoded in parallel by a process pool. The main process
+is the only database writer, saving rows in batches with save_providers().
+Each batch is committed along with a checkpoint for every file in it, so an
+interrupted backfill can be re-run & continues with the next unfinished file.
+
+Usage, from the ohioenergy/ app directory:
+
+    python backfill.py --date 2023-05-01 --workers 4
+    python backfill.py --rebuild
+"""
+import argparse
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any
+
+from arrow.parser import ParserError
+from core.config import logging_settings
+from core.database import get_engine, init_database
+from core.logging.logger import get_logger
+from lib.db_utils import is_valid_provider_row, provider_row_from_item, save_providers
+from lib.time_utils import epoch_from_ts
+from load_msgpack import default_cache_dir, iter_pack_files, iter_pack_records
+from models.backfill_models import BackfillCheckpoint
+from models.provider_models import OfferFingerprint, OhioenergyProvider
+from sqlalchemy import delete, insert, select
+
+log = get_logger(__name__, level=logging_settings.LOG_LEVEL)
+
+
+def decode_pack_file(
+    pack_file: str = None,
+) -> tuple[str, int, list[dict[str, Any]], int]:
+    """Decode an archive file into provider rows. Runs in a worker process.
+
+    Records missing a required column are skipped. The archived
+    scrape_epoch is kept, so fingerprints get the epoch the offer was
+    scraped at. Records archived before scrape_epoch was added get it from
+    their scrape_timestamp.
+
+    Returns a tuple of (file path, file size, rows, count of invalid records).
+    """
+    rows = []
+    invalid = 0
+
+    for record in iter_pack_records(pack_file):
+        if not record.get("scrape_epoch") and record.get("scrape_timestamp"):
+            try:
+                record["scrape_epoch"] = epoch_from_ts(record["scrape_timestamp"])
+            except ParserError:
+                invalid += 1
+                continue
+
+        row = provider_row_from_item(record)
+
+        if not is_valid_provider_row(row):
+            invalid += 1
+            continue
+
+        rows.append(row)
+
+    return pack_file, Path(pack_file).stat().st_size, rows, invalid
+
+
+def get_checkpoints() -> dict[str, int]:
+    """Return a dict of checkpointed file paths & their size when replayed."""
+    with get_engine().connect() as conn:
+        return {
+            file_path: file_size
+            for file_path, file_size in conn.execute(
+                select(BackfillCheckpoint.file_path, BackfillCheckpoint.file_size)
+            )
+        }
+
+
+def clear_providers() -> None:
+    """Delete providers, fingerprints & checkpoints before a rebuild."""
+    with get_engine().begin() as conn:
+        conn.execute(delete(OfferFingerprint.__table__))
+        conn.execute(delete(OhioenergyProvider.__table__))
+        conn.execute(delete(BackfillCheckpoint.__table__))
+
+
+def write_batch(
+    rows: list[dict[str, Any]] = None, files: list[tuple[str, int, int]] = None
+) -> tuple[int, int]:
+    """Save a batch of rows & checkpoint the files they came from in one transaction."""
+    completed_at = int(time.time())
+
+    with get_engine().begin() as conn:
+        inserted, unchanged = save_providers(rows=rows, conn=conn)
+
+        file_paths = [file_path for file_path, _, _ in files]
+        conn.execute(
+            delete(BackfillCheckpoint.__table__).where(
+                BackfillCheckpoint.file_path.in_(file_paths)
+            )
+        )
+        conn.execute(
+            insert(BackfillCheckpoint.__table__),
+            [
+                {
+                    "file_path": file_path,
+                    "file_size": file_size,
+                    "records": records,
+                    "completed_at": completed_at,
+                }
+                for file_path, file_size, records in files
+            ],
+        )
+
+    return inserted, unchanged
+
+
+def run_backfill(
+    cache_dir: str = default_cache_dir,
+    date: str = None,
+    hour: str = None,
+    workers: int = None,
+    batch_size: int = 5000,
+    rebuild: bool = False,
+) -> dict[str, int]:
+    """Replay archive files into the providers table.
+
+    Returns counts of files, records, invalid records, inserted & unchanged rows.
+    """
+    init_database()
+
+    if rebuild:
+        log.warning("Rebuilding providers table, existing rows will be deleted")
+        clear_providers()
+
+    checkpoints = get_checkpoints()
+
+    totals = {
+        "files": 0,
+        "skipped": 0,
+        "records": 0,
+        "invalid": 0,
+        "inserted": 0,
+        "unchanged": 0,
+    }
+
+    ## Skip files that were already replayed & haven't grown since
+    pending = []
+    for pack_file in iter_pack_files(cache_dir=cache_dir, date=date, hour=hour):
+        file_path = str(pack_file)
+        if checkpoints.get(file_path) == pack_file.stat().st_size:
+            totals["skipped"] += 1
+            continue
+
+        pending.append(file_path)
+
+    log.info(
+        f"Backfilling {len(pending)} file(s), skipping {totals['skipped']} checkpointed"
+    )
+
+    if not pending:
+        return totals
+
+    buffer_rows: list[dict[str, Any]] = []
+    buffer_files: list[tuple[str, int, int]] = []
+
+    def flush():
+        if not buffer_files:
+            return
+
+        inserted, unchanged = write_batch(rows=buffer_rows, files=buffer_files)
+        totals["inserted"] += inserted
+        totals["unchanged"] += unchanged
+        totals["files"] += len(buffer_files)
+
+        log.info(
+            f"Committed {len(buffer_files)} file(s): "
+            f"{inserted} inserted, {unchanged} unchanged"
+        )
+
+        buffer_rows.clear()
+        buffer_files.clear()
+
+    workers = workers or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        ## Keep a bounded number of files in flight, so decoded rows don't pile
+        #  up in memory faster than they can be written
+        max_in_flight = workers * 2
+        pending_iter = iter(pending)
+        in_flight = set()
+
+        while True:
+            while len(in_flight) < max_in_flight:
+                pack_file = next(pending_iter, None)
+                if pack_file is None:
+                    break
+                in_flight.add(executor.submit(decode_pack_file, pack_file))
+
+            if not in_flight:
+                break
+
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_path, file_size, rows, invalid = future.result()
+
+                if invalid:
+                    log.warning(f"Skipped {invalid} invalid record(s) in {file_path}")
+
+                buffer_rows.extend(rows)
+                buffer_files.append((file_path, file_size, len(rows)))
+                totals["records"] += len(rows)
+                totals["invalid"] += invalid
+
+            if len(buffer_rows) >= batch_size:
+                flush()
+
+    flush()
+
+    return totals
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Backfill the providers table from the msgpack archive."
+    )
+    parser.add_argument("--cache-dir", default=default_cache_dir)
+    parser.add_argument("--date", help="Only replay this date dir, i.e. 2023-05-01")
+    parser.add_argument("--hour", help="Only replay this hour dir, i.e. 09")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Decoder processes (default: CPUs)"
+    )
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Delete providers, fingerprints & checkpoints before replaying",
+    )
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    totals = run_backfill(
+        cache_dir=args.cache_dir,
+        date=args.date,
+        hour=args.hour,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        rebuild=args.rebuild,
+    )
+
+    log.info(f"Backfill complete: {totals}")
@@ -0,0 +1,132 @@
+"""Measure how long the crawler's modules take to import, with python -X importtime.
+
+Each run imports the modules in a fresh interpreter, in an empty working
+directory, & checks the import did not create any files or directories.
+
+Run from the ohioenergy/ app directory:
+
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --max-ms 1500 --top 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+app_dir = str(Path(__file__).resolve().parent.parent)
+
+default_modules = [
+    "ohioenergy.settings",
+    "ohioenergy.spiders.ohioenergyproviders",
+    "ohioenergy.middlewares",
+    "ohioenergy.pipelines",
+    "ohioenergy.extensions",
+]
+
+
+def parse_importtime(stderr: str = None) -> dict[str, tuple[int, int]]:
+    """Parse -X importtime output into {module: (self_us, cumulative_us)}."""
+    timings = {}
+
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+
+        self_us, cumulative_us, module = line[len("import time:") :].split("|")
+        timings[module.strip()] = (int(self_us), int(cumulative_us))
+
+    return timings
+
+
+def import_once(modules: list[str] = None) -> tuple[dict[str, tuple[int, int]], list]:
+    """Import modules in a new interpreter.
+
+    Returns the parsed importtime output & a list of paths the import created.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [app_dir] + [p for p in [env.get("PYTHONPATH")] if p]
+    )
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+            cwd=work_dir,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"Import failed:\n{proc.stderr[-2000:]}")
+
+        created = sorted(p.name for p in Path(work_dir).iterdir())
+
+    return parse_importtime(proc.stderr), created
+
+
+def run_benchmark(modules: list[str] = None, repeat: int = 5) -> dict:
+    """Import modules repeat times & return the median total & slowest modules."""
+    modules = modules or default_modules
+
+    totals = []
+    runs = []
+    created = set()
+    for _ in range(repeat):
+        timings, run_created = import_once(modules=modules)
+        runs.append(timings)
+        created.update(run_created)
+        totals.append(
+            sum(timings[module][1] for module in modules if module in timings)
+        )
+
+    ## Slowest modules by self time, from the median run
+    median_run = runs[totals.index(sorted(totals)[len(totals) // 2])]
+    slowest = sorted(median_run.items(), key=lambda kv: kv[1][0], reverse=True)
+
+    return {
+        "total_ms": statistics.median(totals) / 1000,
+        "slowest": [(module, self_us / 1000) for module, (self_us, _) in slowest],
+        "created": sorted(created),
+    }
+
+
+def main():
+    """Parse arguments, run the benchmark & print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--module",
+        action="append",
+        dest="modules",
+        help="Module to import, can be repeated (default: the crawler's modules)",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules to list")
+    parser.add_argument(
+        "--max-ms", type=float, help="Exit with an error if imports take longer"
+    )
+    args = parser.parse_args()
+
+    results = run_benchmark(modules=args.modules, repeat=args.repeat)
+
+    print(f"Import time (median of {args.repeat}): {results['total_ms']:.1f} ms")
+    print("Slowest modules (self time):")
+    for module, self_ms in results["slowest"][: args.top]:
+        print(f"  {self_ms:8.1f} ms  {module}")
+
+    failed = False
+    if results["created"]:
+        print(f"Import created files/directories: {', '.join(results['created'])}")
+        failed = True
+    if args.max_ms is not None and results["total_ms"] > args.max_ms:
+        print(f"Import time is over the {args.max_ms:.0f} ms limit")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
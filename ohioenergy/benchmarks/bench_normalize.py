@@ -0,0 +1,150 @@
+"""Time normalize_provider() on archived rows, with & without memoized parsers.
+
+Rows are read from the msgpack archive under --cache-dir/providers/. Without
+an archive, rows are parsed from synthetic comparison pages, one per
+--pages, like repeated scrapes of the same offers.
+
+Run from the ohioenergy/ app directory:
+
+    python -m benchmarks.bench_normalize --limit 200000
+    python -m benchmarks.bench_normalize --pages 500 --rows 50
+"""
+import argparse
+import timeit
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+
+from lib import convert_utils, normalize_utils
+from lib.normalize_utils import NormalizeReport, normalize_provider
+from lib.text_utils import parse_table_body
+from load_msgpack import default_cache_dir, iter_records
+
+from benchmarks.fixtures import build_response
+
+## Memoized helpers called by the parsers, looked up at call time
+cached_helpers = ["_first_number", "_parse_money_str", "_parse_percent_str"]
+
+
+def load_corpus(
+    cache_dir: str = default_cache_dir,
+    limit: int = 100000,
+    pages: int = 200,
+    rows: int = 50,
+) -> tuple[list[dict], str]:
+    """Return provider rows to normalize & where they came from."""
+    if Path(cache_dir, "providers").exists():
+        corpus = list(islice(iter_records(cache_dir=cache_dir), limit))
+        if corpus:
+            return corpus, f"archive in {cache_dir}"
+
+    page_rows = parse_table_body(build_response(rows=rows).xpath("//tbody"))
+
+    return page_rows * pages, f"{pages} synthetic page(s) of {rows} row(s)"
+
+
+def clear_parse_caches() -> None:
+    """Clear every memoized parser's cache, for a cold run."""
+    for name in cached_helpers:
+        getattr(convert_utils, name).cache_clear()
+
+    for _, normalizer in normalize_utils.field_normalizers.values():
+        if hasattr(normalizer, "cache_clear"):
+            normalizer.cache_clear()
+
+
+@contextmanager
+def uncached_parsers():
+    """Swap every memoized parser for the function it wraps."""
+    helpers = {name: getattr(convert_utils, name) for name in cached_helpers}
+    normalizers = dict(normalize_utils.field_normalizers)
+
+    try:
+        for name, helper in helpers.items():
+            setattr(convert_utils, name, helper.__wrapped__)
+
+        for field, (raw_field, normalizer) in normalizers.items():
+            normalize_utils.field_normalizers[field] = (
+                raw_field,
+                getattr(normalizer, "__wrapped__", normalizer),
+            )
+
+        yield
+    finally:
+        for name, helper in helpers.items():
+            setattr(convert_utils, name, helper)
+
+        normalize_utils.field_normalizers.update(normalizers)
+
+
+def normalize_all(corpus: list[dict] = None) -> list[dict]:
+    """Normalize every row in corpus."""
+    return [normalize_provider(row) for row in corpus]
+
+
+def run_benchmark(corpus: list[dict] = None, repeat: int = 5) -> dict:
+    """Time normalizing corpus uncached, memoized cold & memoized warm."""
+    with uncached_parsers():
+        expected = normalize_all(corpus)
+        uncached = min(
+            timeit.repeat(lambda: normalize_all(corpus), repeat=repeat, number=1)
+        )
+
+    clear_parse_caches()
+    cold = timeit.timeit(lambda: normalize_all(corpus), number=1)
+    warm = min(timeit.repeat(lambda: normalize_all(corpus), repeat=repeat, number=1))
+
+    if normalize_all(corpus) != expected:
+        raise AssertionError("Memoized normalizers differ from the uncached parsers")
+
+    report = NormalizeReport()
+    for row in corpus:
+        normalize_provider(row, report=report)
+
+    return {
+        "rows": len(corpus),
+        "uncached": uncached,
+        "cold": cold,
+        "warm": warm,
+        "speedup": uncached / warm,
+        "report": report.summary(),
+    }
+
+
+def main():
+    """Load a corpus & print timings & rejected values."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cache-dir", default=default_cache_dir)
+    parser.add_argument(
+        "--limit", type=int, default=100000, help="Archived rows to load"
+    )
+    parser.add_argument(
+        "--pages", type=int, default=200, help="Synthetic pages without an archive"
+    )
+    parser.add_argument("--rows", type=int, default=50, help="Rows per synthetic page")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus, source = load_corpus(
+        cache_dir=args.cache_dir, limit=args.limit, pages=args.pages, rows=args.rows
+    )
+    results = run_benchmark(corpus=corpus, repeat=args.repeat)
+
+    print(f"Rows normalized: {results['rows']} ({source})")
+    print(f"Uncached parsers:   {results['uncached'] * 1000:.1f} ms")
+    print(f"Memoized, cold:     {results['cold'] * 1000:.1f} ms")
+    print(f"Memoized, warm:     {results['warm'] * 1000:.1f} ms")
+    print(f"Speedup (warm):     {results['speedup']:.1f}x")
+
+    print("Rejected values per field:")
+    for field, counts in results["report"]["fields"].items():
+        print(
+            f"  {field:<18} {counts['rejected']:>7} rejected, "
+            f"{counts['empty']:>7} empty"
+        )
+        for raw, count in list(counts["rejected_values"].items())[:5]:
+            print(f"    {raw!r}: {count}")
+
+
+if __name__ == "__main__":
+    main()
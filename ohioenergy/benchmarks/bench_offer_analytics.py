@@ -0,0 +1,163 @@
+"""Time ranking a multi-year offer history with lib.analytics_utils.
+
+Builds a synthetic history, one scrape per page every --interval-hours, &
+times costing & ranking it at every usage level in one pass. A per-row
+Python loop is timed on a sample for comparison & must give the same costs.
+
+Run from the ohioenergy/ app directory (requires pdm install -G analytics):
+
+    python -m benchmarks.bench_offer_analytics --years 3
+    python -m benchmarks.bench_offer_analytics --years 1 --pages 24 --offers 30
+"""
+import argparse
+import time
+
+from lib import analytics_utils
+from lib.analytics_utils import (
+    default_early_exit_rate,
+    default_usage_grid,
+    effective_costs,
+    ensure_pandas,
+    rank_offers,
+)
+
+
+def build_history(
+    years: float = 3, pages: int = 12, offers: int = 20, interval_hours: float = 1
+):
+    """Synthetic offer frame, offers per page for every page & scrape."""
+    ensure_pandas()
+    np = analytics_utils.np
+    pd = analytics_utils.pd
+
+    rng = np.random.default_rng(42)
+    scrapes = int(years * 365 * 24 / interval_hours)
+    rows = scrapes * pages * offers
+
+    epochs = 1672531200 + (np.arange(scrapes) * interval_hours * 3600).astype("int64")
+    page_ids = np.arange(pages)
+
+    return pd.DataFrame(
+        {
+            "scrape_epoch": np.repeat(epochs, pages * offers),
+            "utility_type": np.where(
+                np.tile(np.repeat(page_ids, offers), scrapes) % 2,
+                "NaturalGas",
+                "Electric",
+            ),
+            "territory_id": np.tile(np.repeat(page_ids // 2 + 1, offers), scrapes),
+            "rate_code": np.ones(rows, dtype="int64"),
+            "name": np.tile(
+                [f"Provider {i} LLC" for i in range(offers)], scrapes * pages
+            ),
+            "rate_type": rng.choice(["Fixed", "Variable"], size=rows),
+            "price_cents": rng.uniform(4, 14, size=rows).round(2),
+            "term_months": rng.choice([0, 6, 12, 24, 36], size=rows).astype("float64"),
+            "early_term_fee": rng.choice([0, 25, 50, 100, 150], size=rows).astype(
+                "float64"
+            ),
+            "monthly_fee": rng.choice([0, 0, 4.99, 9.95], size=rows),
+            "percent_renewable": rng.uniform(0, 100, size=rows).round(),
+        }
+    )
+
+
+def python_costs(
+    frame=None,
+    usage: list[float] = None,
+    early_exit_rate: float = default_early_exit_rate,
+) -> list[list[float]]:
+    """Per-row loop equivalent of effective_costs(), for comparison."""
+    costs = []
+    for row in frame.itertuples(index=False):
+        fixed = 12 * (row.monthly_fee or 0)
+        if row.term_months and row.term_months > 0:
+            fixed += early_exit_rate * (row.early_term_fee or 0)
+        costs.append([12 * level * row.price_cents / 100 + fixed for level in usage])
+
+    return costs
+
+
+def run_benchmark(
+    years: float = 3,
+    pages: int = 12,
+    offers: int = 20,
+    interval_hours: float = 1,
+    sample: int = 20000,
+) -> dict:
+    """Rank a synthetic offer history & time the per-row loop on a sample.
+
+    Returns row counts & timings in seconds.
+    """
+    ensure_pandas()
+    np = analytics_utils.np
+
+    start = time.perf_counter()
+    frame = build_history(
+        years=years, pages=pages, offers=offers, interval_hours=interval_hours
+    )
+    built = time.perf_counter() - start
+
+    usage = default_usage_grid
+
+    sample_frame = frame.head(sample)
+    start = time.perf_counter()
+    expected = python_costs(sample_frame, usage=usage)
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    costs = effective_costs(sample_frame, usage=usage)
+    sample_seconds = time.perf_counter() - start
+    if not np.allclose(costs, np.asarray(expected)):
+        raise AssertionError("effective_costs() differs from the per-row loop")
+
+    start = time.perf_counter()
+    ranked = rank_offers(frame, usage=usage, default_prices={1: 7.5, 2: 8.0})
+    rank_seconds = time.perf_counter() - start
+
+    return {
+        "rows": len(frame),
+        "usage_levels": len(usage),
+        "build_seconds": built,
+        "rank_seconds": rank_seconds,
+        "sample_rows": len(sample_frame),
+        "sample_loop_seconds": loop_seconds,
+        "sample_vectorized_seconds": sample_seconds,
+        "loop_estimate_seconds": loop_seconds * len(frame) / len(sample_frame),
+        "ranked_columns": len(ranked.columns),
+    }
+
+
+def main():
+    """Run the benchmark with sizes from the command line & print results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--pages", type=int, default=12)
+    parser.add_argument("--offers", type=int, default=20, help="Offers per page")
+    parser.add_argument("--interval-hours", type=float, default=1)
+    parser.add_argument(
+        "--sample", type=int, default=20000, help="Rows to time the Python loop on"
+    )
+    args = parser.parse_args()
+
+    results = run_benchmark(
+        years=args.years,
+        pages=args.pages,
+        offers=args.offers,
+        interval_hours=args.interval_hours,
+        sample=args.sample,
+    )
+
+    print(
+        f"Ranked {results['rows']:,} offers at {results['usage_levels']} usage "
+        f"levels in {results['rank_seconds']:.2f}s"
+    )
+    print(
+        f"Per-row loop: {results['sample_loop_seconds']:.2f}s for "
+        f"{results['sample_rows']:,} rows, "
+        f"~{results['loop_estimate_seconds']:.0f}s estimated for every row"
+    )
+
+
+if __name__ == "__main__":
+    main()
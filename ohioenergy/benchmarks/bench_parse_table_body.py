@@ -0,0 +1,64 @@
+"""Compare parse_table_body() with the per-cell XPath parse_table_body_xpath().
+
+Run from the ohioenergy/ app directory:
+
+    python -m benchmarks.bench_parse_table_body --rows 500
+    python -m benchmarks.bench_parse_table_body --page html_out/saved_page.html
+"""
+import argparse
+import timeit
+
+from lib.text_utils import parse_table_body, parse_table_body_xpath
+
+from benchmarks.fixtures import build_response
+
+
+def get_tbody_select(response):
+    """Select the offers table body from a comparison page response."""
+    table = response.xpath("//table[@class='table-container persist-area']")
+
+    return table.xpath(".//tbody")
+
+
+def run_benchmark(rows: int = 500, page_file: str = None, repeat: int = 5) -> dict:
+    """Time both parsers on the same page & return the fastest runs."""
+    response = build_response(rows=rows, page_file=page_file)
+    tbody_select = get_tbody_select(response)
+
+    ## Both parsers must return the same providers
+    expected = parse_table_body_xpath(tbody_select)
+    actual = parse_table_body(tbody_select)
+    if actual != expected:
+        raise AssertionError("parse_table_body() output differs from XPath parser")
+
+    results = {"rows": len(actual)}
+    for name, func in [
+        ("xpath", parse_table_body_xpath),
+        ("lxml", parse_table_body),
+    ]:
+        timings = timeit.repeat(lambda: func(tbody_select), repeat=repeat, number=1)
+        results[name] = min(timings)
+
+    results["speedup"] = results["xpath"] / results["lxml"]
+
+    return results
+
+
+def main():
+    """Parse arguments, run the benchmark & print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500, help="Synthetic row count")
+    parser.add_argument("--page", help="Saved comparison page to parse instead")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = run_benchmark(rows=args.rows, page_file=args.page, repeat=args.repeat)
+
+    print(f"Rows parsed: {results['rows']}")
+    print(f"XPath parser: {results['xpath'] * 1000:.2f} ms")
+    print(f"lxml parser:  {results['lxml'] * 1000:.2f} ms")
+    print(f"Speedup:      {results['speedup']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
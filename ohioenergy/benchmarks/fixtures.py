@@ -0,0 +1,113 @@
+"""Synthetic comparison page fixtures for benchmarks.
+
+Pages match the markup parse_providers_table() expects from the Apples to
+Apples comparison page, with a configurable number of offer rows.
+"""
+import time
+from pathlib import Path
+
+from lib.normalize_utils import normalize_provider
+from lib.text_utils import parse_table_body
+from lib.time_utils import get_ts
+from ohioenergy.items import OhioenergyItem
+from scrapy.http import HtmlResponse
+
+THIS_DIR = Path(__file__).parent
+
+default_fixture_url = "https://energychoice.ohio.gov/ApplesToApplesComparision.aspx?Category=Electric&TerritoryId=6&RateCode=1"
+
+table_head = """<table class="table-container persist-area">
+<thead>
+<tr class="persist-header">
+<th><a id="ctl00_ContentPlaceHolder1_lstOffers_lnkRetailSupplier">
+Retail supplier</a></th>
+<th></th>
+<th><a id="ctl00_ContentPlaceHolder1_lstOffers_lnkPrice">$/kWh</a></th>
+<th>Rate<br/>Type</th>
+<th category="electric">Renewable<br/>Content</th>
+<th><abbr title="Introductory Price">Intro Price</abbr></th>
+<th>Term<br/>Length</th>
+<th>Early Termination<br/>Fee</th>
+<th>Monthly<br/>Fee</th>
+<th><abbr title="Promotional Offers">Promo Offers</abbr></th>
+</tr>
+</thead>
+<tbody>
+"""
+
+
+def build_offer_row(row_num: int = 1) -> str:
+    """Build one offer <tr>, values vary with row_num."""
+    rate_type = "Fixed" if row_num % 2 else "Variable"
+    intro_price = "Yes" if row_num % 3 == 0 else "No"
+    promo_offer = "$50 gift card" if row_num % 4 == 0 else "No"
+    address = f"<p>{row_num} Main St</p><p>Columbus, OH 43215</p>"
+    phone = f"<p>(800) 555-{row_num % 10000:04d}</p>"
+
+    return f"""<tr>
+<td>
+<span class="retail-title">Provider {row_num} LLC{address}{phone}</span>
+<p><a href="https://provider{row_num}.example.com">Website</a></p>
+<p><a href="#">Offer details</a></p>
+</td>
+<td><a href="#">Sign up</a></td>
+<td>0.0{5 + row_num % 4}{row_num % 10}9</td>
+<td>
+<img src="rate.png"/>{rate_type}</td>
+<td>{(row_num * 7) % 101}%</td>
+<td><p>{intro_price}</p></td>
+<td>{(row_num % 4 + 1) * 6} mo.</td>
+<td>${(row_num % 5) * 25}.00</td>
+<td>${row_num % 3}.{"99" if row_num % 2 else "00"}</td>
+<td><p>{promo_offer}</p></td>
+</tr>
+"""
+
+
+def build_comparison_page(rows: int = 100) -> str:
+    """Build a comparison page HTML string with the given number of offers."""
+    offer_rows = "".join(build_offer_row(row_num) for row_num in range(1, rows + 1))
+
+    return f"""<html>
+<body>
+<form>
+<input type="hidden" name="__VIEWSTATE" value="dDwtMTA4MTAyODc4Mjs7Pg==" />
+{table_head}{offer_rows}</tbody>
+</table>
+</form>
+</body>
+</html>
+"""
+
+
+def build_response(
+    rows: int = 100, page_file: str = None, url: str = default_fixture_url
+) -> HtmlResponse:
+    """Build an HtmlResponse from a saved page, or a synthetic page of N rows."""
+    if page_file:
+        body = Path(page_file).read_bytes()
+    else:
+        body = build_comparison_page(rows=rows).encode("utf-8")
+
+    return HtmlResponse(url=url, body=body, encoding="utf-8")
+
+
+def build_items(
+    rows: int = 100, territory_id: int = 6, rate_code: int = 1
+) -> list[OhioenergyItem]:
+    """Parse a synthetic page into OhioenergyItems, like the spider yields them."""
+    scrape_epoch = int(time.time())
+    items = []
+
+    for provider in parse_table_body(build_response(rows=rows).xpath("//tbody")):
+        provider.update(
+            utility_type="electric",
+            territory_id=territory_id,
+            rate_code=rate_code,
+            scrape_timestamp=get_ts(),
+            scrape_epoch=scrape_epoch,
+        )
+        provider["normalized"] = normalize_provider(provider)
+        items.append(OhioenergyItem(**provider))
+
+    return items
@@ -0,0 +1,82 @@
+"""Time a full offline crawl, main.py --replay, from start to exit.
+
+Each round runs main.py in a new interpreter & working directory, with a new
+database, so Scrapy's reactor starts fresh & nothing is skipped as unchanged.
+Interpreter & Scrapy startup are included in the time.
+"""
+import os
+import sqlite3
+import subprocess
+import sys
+from itertools import count
+from pathlib import Path
+
+import pytest
+from core.constants import category_territory_ids, default_rate_codes
+
+from benchmarks.fixtures import build_comparison_page
+
+app_dir = Path(__file__).resolve().parent.parent.parent
+
+page_rows = 50
+replay_multiply = 2
+rounds = 3
+
+expected_items = (
+    sum(len(ids) for ids in category_territory_ids.values())
+    * len(default_rate_codes)
+    * replay_multiply
+    * page_rows
+)
+
+
+@pytest.mark.benchmark(group="crawl")
+def bench_replay_crawl(benchmark, tmp_path):
+    """Time main.py --replay crawling one captured page, multiplied."""
+    fixtures_dir = tmp_path / "fixtures"
+    fixtures_dir.mkdir()
+    (fixtures_dir / "Electric_6_1.html").write_text(
+        build_comparison_page(rows=page_rows)
+    )
+    runs = count()
+
+    def new_run():
+        work_dir = tmp_path / f"run_{next(runs)}"
+        work_dir.mkdir()
+
+        return (work_dir,), {}
+
+    def crawl(work_dir: Path):
+        env = dict(os.environ)
+        env["SCRAPY_SETTINGS_MODULE"] = "ohioenergy.settings"
+
+        subprocess.run(
+            [
+                sys.executable,
+                str(app_dir / "main.py"),
+                "--replay",
+                str(fixtures_dir),
+                "--replay-multiply",
+                str(replay_multiply),
+                "--replay-db-uri",
+                f"sqlite:///{work_dir}/crawl.sqlite",
+            ],
+            cwd=work_dir,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+
+        return work_dir
+
+    benchmark.extra_info["items"] = expected_items
+    work_dir = benchmark.pedantic(crawl, setup=new_run, rounds=rounds)
+
+    db = sqlite3.connect(work_dir / "crawl.sqlite")
+    try:
+        (snapshots,) = db.execute("SELECT COUNT(*) FROM offer_snapshots").fetchone()
+    finally:
+        db.close()
+
+    assert snapshots == expected_items
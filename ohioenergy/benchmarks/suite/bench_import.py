@@ -0,0 +1,19 @@
+"""Import the crawler's modules in a new interpreter, which must not create files.
+
+Nothing is written on import, the log file & database are only created when
+first used.
+"""
+import pytest
+
+from benchmarks.bench_import_time import default_modules, import_once
+
+
+@pytest.mark.benchmark(group="import")
+def bench_import_crawler_modules(benchmark):
+    """Time importing the crawler modules & check it creates no files."""
+    timings, created = benchmark.pedantic(
+        import_once, args=(default_modules,), rounds=3
+    )
+
+    assert set(default_modules) <= set(timings)
+    assert created == []
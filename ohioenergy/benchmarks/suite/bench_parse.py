@@ -0,0 +1,29 @@
+"""Parse synthetic comparison pages of several sizes with parse_providers_table()."""
+import pytest
+from lib.text_utils import parse_providers_table
+
+from benchmarks.fixtures import build_response
+
+## Offer rows per page & rounds to time each size
+table_sizes = {
+    "small": (10, 200),
+    "medium": (100, 50),
+    "large": (1000, 10),
+}
+
+
+@pytest.mark.benchmark(group="parse_providers_table")
+@pytest.mark.parametrize("size", list(table_sizes))
+def bench_parse_providers_table(benchmark, size):
+    """Time parsing a fresh response of each size."""
+    rows, rounds = table_sizes[size]
+
+    ## A new response every round, parsel caches the parsed document
+    def new_response():
+        return (), {"scrapy_response": build_response(rows=rows)}
+
+    parsed = benchmark.pedantic(
+        parse_providers_table, setup=new_response, rounds=rounds, warmup_rounds=1
+    )
+
+    assert len(parsed["table_body"]) == rows
@@ -0,0 +1,53 @@
+"""Time OhioenergySavePipeline saving a page's worth of new offers per batch size."""
+from itertools import count
+
+import pytest
+from core.database import get_engine
+from models.provider_models import OhioenergyProvider
+from ohioenergy.pipelines import OhioenergySavePipeline
+from sqlalchemy import func, select
+
+from benchmarks.fixtures import build_items
+
+items_per_round = 1000
+batch_sizes = [10, 100, 500, 1000]
+rounds = 5
+
+## Each round saves offers for a territory not seen before, so every offer is
+#  inserted instead of only bumping last_seen
+territory_ids = count(100000)
+
+
+@pytest.mark.benchmark(group="OhioenergySavePipeline")
+@pytest.mark.parametrize("batch_size", batch_sizes)
+def bench_save_pipeline(benchmark, batch_size):
+    """Time saving new offers at each batch size."""
+    pipeline = OhioenergySavePipeline(batch_size=batch_size, flush_interval=0)
+    pipeline.open_spider(None)
+    round_territory_ids = []
+
+    def new_items():
+        round_territory_ids.append(next(territory_ids))
+
+        return (
+            build_items(rows=items_per_round, territory_id=round_territory_ids[-1]),
+        ), {}
+
+    def save(items):
+        for item in items:
+            pipeline.process_item(item, None)
+        pipeline.flush()
+
+    benchmark.extra_info["items_per_round"] = items_per_round
+    benchmark.pedantic(save, setup=new_items, rounds=rounds, warmup_rounds=1)
+    pipeline.close_spider(None)
+
+    ## Check the last round only, --benchmark-disable runs a single round
+    with get_engine().connect() as conn:
+        saved = conn.execute(
+            select(func.count())
+            .select_from(OhioenergyProvider)
+            .where(OhioenergyProvider.territory_id == round_territory_ids[-1])
+        ).scalar()
+
+    assert saved == items_per_round
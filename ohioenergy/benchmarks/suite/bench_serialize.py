@@ -0,0 +1,55 @@
+"""Round trip pages & provider records through msgpack files."""
+from itertools import count
+
+import pytest
+from itemadapter import ItemAdapter
+from lib.msgpack_utils import serialize
+from lib.segment_log import SegmentLogWriter, iter_segments
+from load_msgpack import load_msgpackb
+from scrapy.utils.python import to_unicode
+
+from benchmarks.fixtures import build_comparison_page, build_items
+
+page_rows = 100
+segment_records = 5000
+
+
+@pytest.mark.benchmark(group="msgpack")
+def bench_serialize_page_round_trip(benchmark, tmp_path):
+    """serialize() a page body to a msgpack file, then load_msgpackb() it."""
+    page = build_comparison_page(rows=page_rows)
+
+    def round_trip():
+        serialize(
+            input=page,
+            cache_dir=str(tmp_path),
+            output_dir="pages",
+            filename="page.msgpack",
+        )
+
+        return load_msgpackb(tmp_path / "pages" / "page.msgpack")
+
+    loaded = benchmark(round_trip)
+
+    assert to_unicode(loaded) == page
+
+
+@pytest.mark.benchmark(group="msgpack")
+def bench_segment_log_round_trip(benchmark, tmp_path):
+    """Append provider records to a segment log, then stream them back."""
+    records = [ItemAdapter(item).asdict() for item in build_items(rows=page_rows)]
+    records = (records * (segment_records // len(records) + 1))[:segment_records]
+    runs = count()
+
+    def round_trip():
+        log_dir = tmp_path / f"run_{next(runs)}"
+        with SegmentLogWriter(log_dir=str(log_dir), prefix="providers") as writer:
+            for record in records:
+                writer.append(record)
+
+        return sum(1 for _ in iter_segments(log_dir))
+
+    benchmark.extra_info["records"] = segment_records
+    loaded = benchmark.pedantic(round_trip, rounds=10, warmup_rounds=1)
+
+    assert loaded == segment_records
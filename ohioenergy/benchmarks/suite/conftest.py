@@ -0,0 +1,16 @@
+"""Shared setup for the benchmark suite.
+
+Benchmarks write to a throwaway SQLite database, never the configured DB_URI.
+"""
+import os
+import shutil
+import tempfile
+
+## Set before core.database is imported & reads DB_URI
+bench_dir = tempfile.mkdtemp(prefix="ohioenergy-bench-")
+os.environ["DB_URI"] = f"sqlite:///{bench_dir}/bench.sqlite"
+
+
+def pytest_sessionfinish(session, exitstatus):
+    """Remove the throwaway database."""
+    shutil.rmtree(bench_dir, ignore_errors=True)
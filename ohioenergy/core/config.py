@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Optional
 
 from pydantic import BaseModel, BaseSettings, Field
 
@@ -20,16 +21,49 @@ class LoggingSettings(BaseSettings):
         env_file = f"{THIS_DIR}/env_files/logging.env"
 
 
+class DatabaseSettings(BaseSettings):
+    """Database connection, pool, instrumentation & SQLite tuning settings."""
+
+    DB_URI: Optional[str] = Field(default=None, env="DB_URI")
+    DB_READONLY_URI: Optional[str] = Field(default=None, env="DB_READONLY_URI")
+    DB_ECHO: bool = Field(default=False, env="DB_ECHO")
+    DB_INSTRUMENT: bool = Field(default=False, env="DB_INSTRUMENT")
+    DB_SLOW_QUERY_MS: Optional[float] = Field(default=None, env="DB_SLOW_QUERY_MS")
+    DB_POOL_SIZE: int = Field(default=5, env="DB_POOL_SIZE")
+    DB_MAX_OVERFLOW: int = Field(default=10, env="DB_MAX_OVERFLOW")
+    DB_POOL_TIMEOUT: int = Field(default=30, env="DB_POOL_TIMEOUT")
+    DB_SQLITE_BUSY_TIMEOUT_MS: int = Field(
+        default=5000, env="DB_SQLITE_BUSY_TIMEOUT_MS"
+    )
+    DB_SQLITE_SYNCHRONOUS: str = Field(default="NORMAL", env="DB_SQLITE_SYNCHRONOUS")
+    DB_SQLITE_MMAP_SIZE: int = Field(
+        default=256 * 1024 * 1024, env="DB_SQLITE_MMAP_SIZE"
+    )
+    DB_SQLITE_CACHE_SIZE_KB: int = Field(
+        default=64 * 1024, env="DB_SQLITE_CACHE_SIZE_KB"
+    )
+
+    class Config:
+        """Read settings from env_files/database.env."""
+
+        env_file = f"{THIS_DIR}/env_files/database.env"
+
+
 class AppSettings(BaseSettings):
     APP_TITLE: str = Field(default="Default FastAPI App Title", env="APP_TITLE")
     APP_DESCRIPTION: str = Field(
         default="Default FastAPI app description", env="APP_DESCRIPTION"
     )
     APP_VERSION: str = Field(default="0.0.1", env="APP_VERSION")
+    API_CACHE_TTL: float = Field(default=300, env="API_CACHE_TTL")
+    API_CACHE_MAX_ENTRIES: int = Field(default=1024, env="API_CACHE_MAX_ENTRIES")
+    API_CRAWL_CHECK_INTERVAL: float = Field(default=5, env="API_CRAWL_CHECK_INTERVAL")
+    API_MAX_PAGE_SIZE: int = Field(default=500, env="API_MAX_PAGE_SIZE")
 
     class Config:
         env_file = f"{THIS_DIR}/env_files/.env"
 
 
 logging_settings = LoggingSettings()
+database_settings = DatabaseSettings()
 app_settings = AppSettings()
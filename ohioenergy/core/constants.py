@@ -1 +1,22 @@
 base_scrap_url = "https://energychoice.ohio.gov"
+
+## Apples to Apples comparison page. Category, TerritoryId & RateCode are
+#  passed as query params, i.e. ?Category=Electric&TerritoryId=6&RateCode=1
+comparison_page_path = "ApplesToApplesComparision.aspx"
+comparison_page_url = f"{base_scrap_url}/{comparison_page_path}"
+
+## Map the site's Category query param to the utility_type stored on items
+utility_categories = {
+    "Electric": "electric",
+    "NaturalGas": "natural_gas",
+}
+
+## TerritoryId values for each Category. Electric & natural gas territories
+#  are numbered separately on the site, gas IDs start after the electric IDs.
+category_territory_ids = {
+    "Electric": [1, 2, 3, 4, 5, 6, 7],
+    "NaturalGas": [8, 9, 10, 11],
+}
+
+## RateCode values. 1 is residential, 2 is commercial
+default_rate_codes = [1, 2]
@@ -1,9 +1,17 @@
+"""Engines, sessions & schema setup for the configured database."""
+import importlib
+import threading
 import uuid
+from functools import lru_cache
 from pathlib import Path
 from typing import Union
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy import URL, Engine, create_engine, event, inspect, make_url, text
+from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from core.config import database_settings
+from core.instrumentation import instrument_engine
 
 in_memory_db = "sqlite+pysqlite:///:memory:"
 
@@ -11,26 +19,253 @@ default_db_dir = "db"
 default_db_filename = "providers.sqlite"
 default_db_path = f"{default_db_dir}/{default_db_filename}"
 default_db_uri = f"sqlite+pysqlite:///{default_db_path}"
+## Read-only connections to the same file, for query clients
+default_readonly_db_uri = f"sqlite+pysqlite:///file:{default_db_path}?mode=ro&uri=true"
+
+## Set DB_URI in database.env to use another database, i.e. PostgreSQL
+SQLALCHEMY_DATABASE_URI = database_settings.DB_URI or default_db_uri
+
+if database_settings.DB_READONLY_URI:
+    SQLALCHEMY_READONLY_DATABASE_URI = database_settings.DB_READONLY_URI
+elif SQLALCHEMY_DATABASE_URI == default_db_uri:
+    SQLALCHEMY_READONLY_DATABASE_URI = default_readonly_db_uri
+else:
+    SQLALCHEMY_READONLY_DATABASE_URI = SQLALCHEMY_DATABASE_URI
+
+## Modules declaring tables on Base, imported by init_database() so
+#  create_all() sees every table
+model_modules = [
+    "models.provider_models",
+    "models.snapshot_models",
+    "models.page_models",
+    "models.backfill_models",
+    "models.crawl_models",
+]
+
+
+def is_sqlite_uri(uri: Union[str, URL] = None) -> bool:
+    """Check if a database URI is for a SQLite database."""
+    if not uri:
+        raise ValueError("Missing uri")
+
+    return make_url(uri).get_backend_name() == "sqlite"
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record, readonly: bool = False):
+    """Tune each new SQLite connection.
+
+    WAL lets read-only clients query while the crawler writes. busy_timeout
+    makes a connection wait for a lock instead of failing with "database
+    is locked".
+    """
+    cursor = dbapi_connection.cursor()
+
+    cursor.execute(f"PRAGMA busy_timeout={database_settings.DB_SQLITE_BUSY_TIMEOUT_MS}")
+    ## journal_mode is stored in the database file, only the writer can set it
+    if not readonly:
+        cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={database_settings.DB_SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={database_settings.DB_SQLITE_MMAP_SIZE}")
+    ## Negative cache_size is in KiB instead of pages
+    cursor.execute(f"PRAGMA cache_size=-{database_settings.DB_SQLITE_CACHE_SIZE_KB}")
+    if readonly:
+        cursor.execute("PRAGMA query_only=ON")
+
+    cursor.close()
+
+
+def set_sqlite_readonly_pragmas(dbapi_connection, connection_record):
+    """Set the SQLite pragmas for a read-only connection."""
+    set_sqlite_pragmas(dbapi_connection, connection_record, readonly=True)
+
+
+def build_engine(uri: Union[str, URL] = None, readonly: bool = False) -> Engine:
+    """Create an engine for uri, with the options its backend needs.
+
+    SQLite connections get check_same_thread=False & the pragmas from
+    set_sqlite_pragmas(). PostgreSQL read-only engines open every
+    transaction as READ ONLY.
+    """
+    if not uri:
+        raise ValueError("Missing uri")
+
+    engine_kwargs = {"echo": database_settings.DB_ECHO}
+
+    ## Only QueuePool takes sizing options, SQLite :memory: databases use a
+    #  SingletonThreadPool & aiosqlite ones a StaticPool, which reject them
+    url = make_url(uri)
+    if issubclass(url.get_dialect().get_pool_class(url), QueuePool):
+        engine_kwargs.update(
+            pool_size=database_settings.DB_POOL_SIZE,
+            max_overflow=database_settings.DB_MAX_OVERFLOW,
+            pool_timeout=database_settings.DB_POOL_TIMEOUT,
+        )
+
+    sqlite = is_sqlite_uri(uri)
+    if sqlite:
+        ## connect_args only necessary for SQLite database
+        engine_kwargs["connect_args"] = {"check_same_thread": False}
+    elif readonly and url.get_backend_name() == "postgresql":
+        engine_kwargs["execution_options"] = {"postgresql_readonly": True}
+
+    _engine = create_engine(uri, **engine_kwargs)
+
+    if sqlite:
+        event.listen(
+            _engine,
+            "connect",
+            set_sqlite_readonly_pragmas if readonly else set_sqlite_pragmas,
+        )
+
+    return _engine
+
+
+@lru_cache(maxsize=1)
+def get_engine() -> Engine:
+    """Return the engine for SQLALCHEMY_DATABASE_URI, created on first call.
+
+    Creates the db/ directory when using the default SQLite database.
+    """
+    if SQLALCHEMY_DATABASE_URI == default_db_uri:
+        Path(default_db_dir).mkdir(parents=True, exist_ok=True)
+
+    _engine = build_engine(SQLALCHEMY_DATABASE_URI)
+
+    ## Opt-in statement timing, see core.instrumentation
+    if database_settings.DB_INSTRUMENT:
+        instrument_engine(_engine, slow_query_ms=database_settings.DB_SLOW_QUERY_MS)
+
+    return _engine
+
+
+## Sessions are bound to an engine when created, see get_db()
+SessionLocal = sessionmaker()
+
+
+@lru_cache(maxsize=1)
+def get_readonly_engine() -> Engine:
+    """Return an engine with read-only connections to the providers database.
 
-if not Path(default_db_dir).exists():
-    Path(default_db_dir).mkdir(parents=True, exist_ok=True)
+    Created on first call. Connections can't write, so query clients never
+    hold a write lock the crawler has to wait on. Set DB_READONLY_URI to
+    send read-only queries to another database, i.e. a replica.
+    """
+    readonly_engine = build_engine(SQLALCHEMY_READONLY_DATABASE_URI, readonly=True)
 
-SQLALCHEMY_DATABASE_URI = default_db_uri
+    return readonly_engine
 
-## connect_args only necessary for SQLite database
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URI, echo=True, connect_args={"check_same_thread": False}
-)
 
-SessionLocal = Session(bind=engine)
+def use_database(uri: Union[str, URL] = None) -> None:
+    """Point get_engine() & get_readonly_engine() at another database.
+
+    For runs that must not touch the configured DB_URI, i.e. replays. Call
+    before the database is used, engines already created are disposed.
+    """
+    global SQLALCHEMY_DATABASE_URI, SQLALCHEMY_READONLY_DATABASE_URI
+
+    if not uri:
+        raise ValueError("Missing uri")
+
+    for cached_engine in (get_engine, get_readonly_engine):
+        if cached_engine.cache_info().currsize:
+            cached_engine().dispose()
+        cached_engine.cache_clear()
+
+    SQLALCHEMY_DATABASE_URI = uri
+    SQLALCHEMY_READONLY_DATABASE_URI = uri
 
 
 class Base(DeclarativeBase):
     pass
 
 
-def get_db(engine=engine) -> Session:
-    db = SessionLocal()
+def add_missing_columns(engine: Engine = None) -> list[str]:
+    """Add model columns that are missing from existing tables.
+
+    create_all() only creates missing tables, so columns added to a model
+    after its table was created, i.e. providers.territory_id, are added with
+    ALTER TABLE, along with their indexes. Safe to call more than once.
+
+    Returns the added columns as "table.column".
+    """
+    if engine is None:
+        raise ValueError("Missing engine")
+
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    preparer = engine.dialect.identifier_preparer
+
+    added = []
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+            added_columns = set()
+
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+
+                ## Rows already in the table would have no value for it
+                if not column.nullable:
+                    raise RuntimeError(
+                        f"Can't add NOT NULL column {table.name}.{column.name} "
+                        "to an existing table"
+                    )
+
+                table_name = preparer.format_table(table)
+                column_name = preparer.format_column(column)
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(
+                    text(
+                        f"ALTER TABLE {table_name} "
+                        f"ADD COLUMN {column_name} {column_type}"
+                    )
+                )
+                added_columns.add(column.name)
+                added.append(f"{table.name}.{column.name}")
+
+            for index in table.indexes:
+                if any(column.name in added_columns for column in index.columns):
+                    index.create(conn, checkfirst=True)
+
+    return added
+
+
+_init_lock = threading.Lock()
+_initialized_engines: set[Engine] = set()
+
+
+def init_database(engine: Engine = None) -> Engine:
+    """Create any missing tables & columns. Safe to call more than once.
+
+    Call once at startup, i.e. from main.py or a pipeline's open_spider(),
+    before reading or writing. Tables are only created on the first call
+    for each engine.
+
+    Returns the initialized engine.
+    """
+    engine = engine or get_engine()
+
+    with _init_lock:
+        if engine in _initialized_engines:
+            return engine
+
+        for module_name in model_modules:
+            importlib.import_module(module_name)
+
+        Base.metadata.create_all(engine)
+        add_missing_columns(engine)
+        _initialized_engines.add(engine)
+
+    return engine
+
+
+def get_db(engine: Engine = None) -> Session:
+    """Yield a session on engine or the default engine, closing it after."""
+    db = SessionLocal(bind=engine or get_engine())
     try:
         yield db
     except Exception as exc:
@@ -41,6 +276,20 @@ def get_db(engine=engine) -> Session:
         db.close()
 
 
+def get_readonly_db() -> Session:
+    """Yield a session on the read-only engine, closing it after."""
+    db = Session(bind=get_readonly_engine())
+    try:
+        yield db
+    except Exception as exc:
+        raise Exception(
+            "Unhandled exception getting read-only DB connection. "
+            f"Exception details: {exc}"
+        )
+    finally:
+        db.close()
+
+
 def generate_uuid() -> uuid.UUID:
     """Generate a UUID. Return string if string=True."""
     _uuid = uuid.uuid4()
@@ -0,0 +1,285 @@
+"""Database statement stats & latency histograms for crawls & benchmarks."""
+import bisect
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator
+
+from sqlalchemy import Engine, event
+
+from core.config import logging_settings
+from core.logging.logger import get_logger
+
+log = get_logger(__name__, level=logging_settings.LOG_LEVEL)
+
+## Match the table an INSERT/UPDATE/DELETE statement writes to
+write_statement_pattern = re.compile(
+    r"^\s*(?:INSERT\s+(?:OR\s+\w+\s+)?INTO|UPDATE|DELETE\s+FROM)\s+[\"`]?(\w+)",
+    re.IGNORECASE,
+)
+
+
+## Histogram bucket upper bounds, in milliseconds
+default_latency_buckets_ms = [
+    1,
+    2.5,
+    5,
+    10,
+    25,
+    50,
+    100,
+    250,
+    500,
+    1000,
+    2500,
+    5000,
+    10000,
+    30000,
+]
+
+
+class LatencyHistogram:
+    """Bucketed latency histogram, with exact count, sum, min & max."""
+
+    def __init__(self, buckets_ms: list[float] = None):
+        """Use buckets_ms as the bucket upper bounds, or the default buckets."""
+        self.buckets_ms = sorted(buckets_ms or default_latency_buckets_ms)
+        ## One count per bucket, plus one for values over the last bound
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.min_ms = None
+        self.max_ms = None
+
+    def observe(self, duration_ms: float = 0) -> None:
+        """Record a duration, in milliseconds."""
+        self.counts[bisect.bisect_left(self.buckets_ms, duration_ms)] += 1
+        self.count += 1
+        self.sum_ms += duration_ms
+        self.min_ms = (
+            duration_ms if self.min_ms is None else min(self.min_ms, duration_ms)
+        )
+        self.max_ms = (
+            duration_ms if self.max_ms is None else max(self.max_ms, duration_ms)
+        )
+
+    def percentile(self, pct: float = 95) -> float:
+        """Estimate a percentile as the upper bound of the bucket it falls in."""
+        if not self.count:
+            return 0.0
+
+        target = self.count * pct / 100
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets_ms, self.counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return min(bound, self.max_ms)
+
+        return self.max_ms
+
+    def summary(self) -> dict:
+        """Return count, sum, min, max, mean, p50, p95 & bucket counts."""
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum_ms, 3),
+            "min_ms": round(self.min_ms or 0, 3),
+            "max_ms": round(self.max_ms or 0, 3),
+            "mean_ms": round(self.sum_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50), 3),
+            "p95_ms": round(self.percentile(95), 3),
+            "buckets": {
+                **{
+                    f"le_{bound:g}": count
+                    for bound, count in zip(self.buckets_ms, self.counts)
+                },
+                "le_inf": self.counts[-1],
+            },
+        }
+
+
+class QueryStats:
+    """Aggregate statement counts, latency & rows written per table.
+
+    Latency is kept in a LatencyHistogram, so memory stays constant over a
+    long crawl. p95_ms is estimated from its buckets.
+    """
+
+    def __init__(self, slow_query_ms: float = None):
+        """Log statements slower than slow_query_ms, when set."""
+        self.slow_query_ms = slow_query_ms
+
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear all counts, i.e. at the start of a crawl."""
+        with self._lock:
+            self.statements = 0
+            self.latency = LatencyHistogram()
+            self.rows_written: Counter = Counter()
+            self.slow_queries = 0
+
+    def record(self, statement: str = None, duration: float = 0, rowcount: int = -1):
+        """Record a statement's duration, in seconds, & the rows it wrote."""
+        duration_ms = duration * 1000
+
+        with self._lock:
+            self.statements += 1
+            self.latency.observe(duration_ms)
+
+            match = write_statement_pattern.match(statement or "")
+            if match and rowcount and rowcount > 0:
+                self.rows_written[match.group(1)] += rowcount
+
+        if self.slow_query_ms is not None and duration_ms >= self.slow_query_ms:
+            with self._lock:
+                self.slow_queries += 1
+
+            log.warning(
+                f"Slow query ({duration_ms:.1f} ms): "
+                f"{' '.join(statement.split())[:500]}"
+            )
+
+    def summary(self) -> dict:
+        """Return statement count, total, p95 & max latency, & rows written."""
+        with self._lock:
+            return {
+                "statements": self.statements,
+                "total_ms": round(self.latency.sum_ms, 3),
+                "p95_ms": round(self.latency.percentile(95), 3),
+                "max_ms": round(self.latency.max_ms or 0, 3),
+                "slow_queries": self.slow_queries,
+                "rows_written": dict(self.rows_written),
+            }
+
+
+query_stats = QueryStats()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+
+    duration = time.perf_counter() - start_times.pop()
+    query_stats.record(statement=statement, duration=duration, rowcount=cursor.rowcount)
+
+
+def instrument_engine(engine: Engine = None, slow_query_ms: float = None) -> None:
+    """Attach timing event listeners to an engine. Safe to call more than once.
+
+    Statements are recorded on the module's query_stats. Statements slower
+    than slow_query_ms are logged as a warning.
+    """
+    if engine is None:
+        raise ValueError("Missing engine")
+
+    if slow_query_ms is not None:
+        query_stats.slow_query_ms = slow_query_ms
+
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class LatencyStats:
+    """Latency histograms per stage, i.e. download, parse, pipeline or flush.
+
+    Stage names are "/" separated, i.e. "pipeline/OhioenergySavePipeline".
+    Observers added with add_observer() are called with (stage, seconds)
+    for every recorded duration, i.e. to export them as metrics.
+    """
+
+    def __init__(self, buckets_ms: list[float] = None):
+        """Use buckets_ms for every stage's histogram, or the default buckets."""
+        self.buckets_ms = buckets_ms
+        self.observers: list[Callable[[str, float], None]] = []
+
+        self._lock = threading.Lock()
+        self.reset()
+
+    def add_observer(self, observer: Callable[[str, float], None] = None) -> None:
+        """Call observer with (stage, seconds) for every recorded duration."""
+        if observer is None:
+            raise ValueError("Missing observer")
+
+        with self._lock:
+            if observer not in self.observers:
+                self.observers.append(observer)
+
+    def remove_observer(self, observer: Callable[[str, float], None] = None) -> None:
+        """Stop calling observer."""
+        with self._lock:
+            if observer in self.observers:
+                self.observers.remove(observer)
+
+    def reset(self):
+        """Drop every stage's histogram, i.e. at the start of a crawl."""
+        with self._lock:
+            self.histograms: dict[str, LatencyHistogram] = {}
+
+    def observe(self, stage: str = None, duration: float = 0) -> None:
+        """Record a duration for a stage, in seconds."""
+        if not stage:
+            raise ValueError("Missing stage")
+
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = LatencyHistogram(self.buckets_ms)
+
+            histogram.observe(duration * 1000)
+            observers = list(self.observers)
+
+        for observer in observers:
+            observer(stage, duration)
+
+    @contextmanager
+    def timed(self, stage: str = None):
+        """Time the body of a with block & record it for stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage=stage, duration=time.perf_counter() - start)
+
+    def timed_iter(self, iterable: Iterable = None, stage: str = None) -> Iterator:
+        """Yield from iterable, recording the total time spent producing items.
+
+        Time spent by the consumer between items is not counted.
+        """
+        elapsed = 0.0
+        iterator = iter(iterable)
+
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    value = next(iterator)
+                except StopIteration:
+                    elapsed += time.perf_counter() - start
+                    break
+
+                elapsed += time.perf_counter() - start
+                yield value
+        finally:
+            self.observe(stage=stage, duration=elapsed)
+
+    def summary(self) -> dict:
+        """Return each stage's histogram summary, by stage name."""
+        with self._lock:
+            return {
+                stage: histogram.summary()
+                for stage, histogram in sorted(self.histograms.items())
+            }
+
+
+latency_stats = LatencyStats()
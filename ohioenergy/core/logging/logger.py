@@ -1,7 +1,14 @@
+"""Process-wide logging through one queue, to the console & a rotating log file."""
+import atexit
 import logging
+import multiprocessing
+import multiprocessing.queues
+import os
+import queue
 import sys
+import threading
 import time
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 from typing import Any, Union
 
@@ -75,7 +82,7 @@ class FileLogger(BaseLogger):
         default=logging.Formatter(fmt=default_file_fmt, datefmt=default_date_fmt)
     )
     rotate_when: str = Field(default="midnight")
-    max_bytes: int = 10 * 1024
+    max_bytes: int = 10 * 1024 * 1024
     backup_count: int = 3
 
 
@@ -88,11 +95,28 @@ def get_console_handler():
     return console_handler
 
 
+class LazyRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that creates its log file on the first record.
+
+    The log file & its directory are only created once a record is logged,
+    so importing a module that logs creates no files.
+    """
+
+    def __init__(self, filename: str, **kwargs):
+        """Open filename lazily, on the first record."""
+        super().__init__(filename, delay=True, **kwargs)
+
+    def _open(self):
+        ensure_log_file(self.baseFilename)
+
+        return super()._open()
+
+
 def get_file_handler():
     file_config = FileLogger(log_file=default_log_file)
 
     ## If using TimedRotatingFileHandler, replace maxBytes & backupCount with: when=file_config.ROTATE_WHEN,
-    file_handler = RotatingFileHandler(
+    file_handler = LazyRotatingFileHandler(
         file_config.log_file,
         maxBytes=file_config.max_bytes,
         backupCount=file_config.backup_count,
@@ -102,13 +126,118 @@ def get_file_handler():
     return file_handler
 
 
-def get_logger(logger_name, level="INFO"):
-    ensure_log_file()
+class LogQueueHandler(QueueHandler):
+    """QueueHandler that also works with a multiprocessing.SimpleQueue."""
+
+    def enqueue(self, record: logging.LogRecord):
+        """Put the record on the queue, SimpleQueue has no put_nowait()."""
+        self.queue.put(record)
+
+
+## One queue, handler & listener are shared by every logger in the process.
+#  Loggers only put records on the queue, the listener's thread writes them
+#  to the console & log file, so logging never blocks on disk I/O.
+_log_queue: queue.SimpleQueue | None = None
+_queue_handler: QueueHandler | None = None
+_queue_listener: QueueListener | None = None
+_setup_lock = threading.Lock()
+
+## Forked children don't open the log file, they send records back through
+#  a pipe & the parent's forwarder thread puts them on its own queue
+_child_log_queue: multiprocessing.queues.SimpleQueue | None = None
+_log_forwarder: threading.Thread | None = None
+
+
+def _start_queue_listener():
+    global _log_queue, _queue_listener
+
+    _log_queue = queue.SimpleQueue()
+    _queue_handler.queue = _log_queue
+
+    _queue_listener = QueueListener(
+        _log_queue,
+        get_console_handler(),
+        get_file_handler(),
+        respect_handler_level=True,
+    )
+    _queue_listener.start()
+
+
+def _forward_child_records():
+    while True:
+        record = _child_log_queue.get()
+        if record is None:
+            break
+
+        _log_queue.put(record)
+
 
+def _start_child_forwarder():
+    global _child_log_queue, _log_forwarder
+
+    ## Already set up, or this is a forked child whose records go to its parent
+    if _queue_handler is None or _child_log_queue is not None:
+        return
+
+    _child_log_queue = multiprocessing.get_context("fork").SimpleQueue()
+    _log_forwarder = threading.Thread(
+        target=_forward_child_records, name="log-forwarder", daemon=True
+    )
+    _log_forwarder.start()
+
+
+def _restart_after_fork():
+    global _queue_listener, _log_forwarder
+
+    ## Several processes rotating the same file would clobber each other &
+    #  atexit doesn't run in pool workers, so the child only sends records to
+    #  the parent's listener
+    if _queue_handler is not None:
+        _queue_handler.queue = _child_log_queue
+        _queue_listener = None
+        _log_forwarder = None
+
+
+def stop_queue_logging():
+    """Stop the listener, flushing queued records to the console & log file."""
+    global _queue_listener, _log_forwarder
+
+    if _log_forwarder is not None:
+        _child_log_queue.put(None)
+        _log_forwarder.join()
+        _log_forwarder = None
+
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+def get_queue_handler() -> QueueHandler:
+    """Return the process's shared QueueHandler, starting its listener on first call."""
+    global _queue_handler
+
+    with _setup_lock:
+        if _queue_handler is None:
+            _queue_handler = LogQueueHandler(None)
+            _start_queue_listener()
+
+            atexit.register(stop_queue_logging)
+            os.register_at_fork(
+                before=_start_child_forwarder, after_in_child=_restart_after_fork
+            )
+
+    return _queue_handler
+
+
+def get_logger(logger_name, level="INFO"):
+    """Return a logger that writes through the shared queue handler."""
     logger = logging.getLogger(logger_name)
     logger.setLevel(level.upper())
-    logger.addHandler(get_console_handler())
-    logger.addHandler(get_file_handler())
+
+    ## Only attach the shared handler once, repeat calls return the same logger
+    queue_handler = get_queue_handler()
+    if queue_handler not in logger.handlers:
+        logger.addHandler(queue_handler)
 
     ## Propagate error up to parent
     logger.propagate = False
@@ -0,0 +1,353 @@
+"""Rank offers by effective annual cost with numpy & pandas."""
+from typing import Any, Sequence
+
+from core.config import logging_settings
+from core.database import get_engine
+from core.logging.logger import get_logger
+from models.snapshot_models import OfferSnapshot
+from sqlalchemy import Engine, select
+
+from lib import parquet_utils
+from lib.db_utils import snapshot_row_from_item
+from lib.parquet_utils import default_snapshot_dir
+
+log = get_logger(__name__, level=logging_settings.LOG_LEVEL)
+
+## numpy & pandas are optional, install with: pdm install -G analytics. They
+#  are slow to import, so they're only imported by ensure_pandas() on first use
+np = None
+pd = None
+
+## Monthly usage levels to cost offers at, in kWh (or ccf for natural gas)
+default_usage_grid = list(range(500, 3001, 250))
+
+## Expected share of customers leaving a fixed term contract early in a year,
+#  the early termination fee is weighted by it in the effective annual cost
+default_early_exit_rate = 0.1
+
+## Offers are ranked against the other offers on the same comparison page
+default_rank_keys = ["utility_type", "territory_id", "rate_code", "scrape_epoch"]
+
+offer_columns = [
+    "scrape_epoch",
+    "utility_type",
+    "territory_id",
+    "rate_code",
+    "name",
+    "rate_type",
+    "price_cents",
+    "term_months",
+    "early_term_fee",
+    "monthly_fee",
+    "percent_renewable",
+]
+numeric_columns = [
+    "price_cents",
+    "term_months",
+    "early_term_fee",
+    "monthly_fee",
+    "percent_renewable",
+]
+
+
+def ensure_pandas():
+    """Import numpy & pandas on first call.
+
+    Raise ImportError if they're not installed.
+    """
+    global np, pd
+
+    if pd is not None:
+        return
+
+    try:
+        import numpy
+        import pandas
+    except ImportError:
+        raise ImportError(
+            "numpy & pandas are required for offer analytics. "
+            "Install with: pdm install -G analytics"
+        )
+
+    np = numpy
+    pd = pandas
+
+
+def to_offer_frame(frame: "pd.DataFrame" = None) -> "pd.DataFrame":
+    """Keep offer_columns & store numeric columns as float64.
+
+    Decimal & string columns are converted once here, so every calculation
+    after runs on contiguous float arrays.
+    """
+    ensure_pandas()
+
+    frame = frame.reindex(columns=offer_columns)
+    for col in numeric_columns:
+        frame[col] = pd.to_numeric(frame[col], errors="coerce").astype("float64")
+
+    return frame.reset_index(drop=True)
+
+
+def offers_frame(rows: Sequence[Any] = None) -> "pd.DataFrame":
+    """Build an offer frame from scraped rows.
+
+    Accepts provider dicts from parse_table_body() or scraped items, which
+    are typed with snapshot_row_from_item(), or rows already typed for the
+    offer_snapshots table.
+    """
+    if rows is None:
+        raise ValueError("Missing rows")
+
+    ensure_pandas()
+
+    typed_rows = [
+        row if "price_cents" in row else snapshot_row_from_item(row) for row in rows
+    ]
+
+    return to_offer_frame(pd.DataFrame.from_records(typed_rows))
+
+
+def read_snapshot_frame(
+    root_dir: str = default_snapshot_dir, start_date: str = None, end_date: str = None
+) -> "pd.DataFrame":
+    """Read Parquet snapshots into an offer frame.
+
+    start_date & end_date are inclusive YYYY-MM-DD strings, see
+    read_snapshots(). Decimal columns are cast to float64 in Arrow before
+    converting, instead of building a Decimal object per value.
+    """
+    ensure_pandas()
+
+    table = parquet_utils.read_snapshots(
+        root_dir=root_dir,
+        start_date=start_date,
+        end_date=end_date,
+        columns=offer_columns,
+    )
+    for col in ["price_cents", "early_term_fee", "monthly_fee"]:
+        index = table.schema.get_field_index(col)
+        table = table.set_column(
+            index, col, table.column(col).cast(parquet_utils.pa.float64())
+        )
+
+    return to_offer_frame(table.to_pandas())
+
+
+def read_snapshot_frame_from_db(
+    since_epoch: int = None, until_epoch: int = None, engine: Engine = None
+) -> "pd.DataFrame":
+    """Read offer_snapshots rows into an offer frame.
+
+    Only rows scraped at or after since_epoch & before until_epoch are read,
+    when they're set.
+    """
+    ensure_pandas()
+
+    stmt = select(*[OfferSnapshot.__table__.c[col] for col in offer_columns])
+    if since_epoch is not None:
+        stmt = stmt.where(OfferSnapshot.scrape_epoch >= since_epoch)
+    if until_epoch is not None:
+        stmt = stmt.where(OfferSnapshot.scrape_epoch < until_epoch)
+
+    with (engine or get_engine()).connect() as conn:
+        frame = pd.read_sql(stmt, conn, coerce_float=True)
+
+    return to_offer_frame(frame)
+
+
+def latest_offers(
+    frame: "pd.DataFrame" = None, keys: list[str] = None
+) -> "pd.DataFrame":
+    """Keep only each comparison page's latest scrape."""
+    ensure_pandas()
+
+    keys = keys or ["utility_type", "territory_id", "rate_code"]
+    latest_epoch = frame.groupby(keys, sort=False, dropna=False)[
+        "scrape_epoch"
+    ].transform("max")
+
+    return frame[frame["scrape_epoch"] == latest_epoch].reset_index(drop=True)
+
+
+def effective_costs(
+    frame: "pd.DataFrame" = None,
+    usage: Sequence[float] = None,
+    early_exit_rate: float = default_early_exit_rate,
+) -> "np.ndarray":
+    """Effective annual cost of every offer at every usage level, in dollars.
+
+    Returns an array of shape (offers, usage levels):
+
+        12 * (usage * price + monthly fee) + early_exit_rate * early term fee
+
+    The early termination fee only counts for offers with a fixed term.
+    Offers without a price are NaN.
+    """
+    ensure_pandas()
+
+    usage_grid = np.asarray(usage or default_usage_grid, dtype="float64")
+
+    price = frame["price_cents"].to_numpy(dtype="float64") / 100
+    monthly_fee = np.nan_to_num(frame["monthly_fee"].to_numpy(dtype="float64"))
+    early_term_fee = np.nan_to_num(frame["early_term_fee"].to_numpy(dtype="float64"))
+    has_term = np.nan_to_num(frame["term_months"].to_numpy(dtype="float64")) > 0
+
+    fixed_costs = 12 * monthly_fee + np.where(
+        has_term, early_exit_rate * early_term_fee, 0.0
+    )
+
+    return 12 * np.outer(price, usage_grid) + fixed_costs[:, None]
+
+
+def group_min_ranks(
+    values: "np.ndarray" = None, group_ids: "np.ndarray" = None
+) -> "np.ndarray":
+    """Rank each column of values within groups, cheapest first.
+
+    Same result as pandas' groupby().rank(method="min"): ties share the
+    lowest rank & NaN values are not ranked.
+
+    Groups are padded into the rows of a (groups, largest group) matrix, so
+    each column is ranked with one sort along short rows instead of a sort
+    of every value. Falls back to sorting on (group, value) when group sizes
+    are too uneven to pad.
+    """
+    ensure_pandas()
+
+    rows, columns = values.shape
+    ## One contiguous array per column, ranked one column at a time
+    column_values = np.ascontiguousarray(values.T)
+    ranks = np.full((columns, rows), np.nan)
+    if rows == 0:
+        return ranks.T
+
+    ## Row order with groups contiguous, & each group's start & size
+    order = np.argsort(group_ids, kind="stable")
+    sorted_groups = group_ids[order]
+    group_starts = np.flatnonzero(
+        np.concatenate([[True], sorted_groups[1:] != sorted_groups[:-1]])
+    )
+    group_sizes = np.diff(np.append(group_starts, rows))
+    groups = len(group_starts)
+    width = group_sizes.max()
+
+    if groups * width <= 4 * rows:
+        ## Each row's slot in the flattened (groups, width) matrix
+        slots = np.empty(rows, dtype="int64")
+        slots[order] = np.repeat(np.arange(groups) * width, group_sizes) + (
+            np.arange(rows) - np.repeat(group_starts, group_sizes)
+        )
+        run_columns = np.arange(width)
+
+        for col in range(columns):
+            ## Padding sorts after every real value & is never read back
+            padded = np.full(groups * width, np.inf)
+            padded[slots] = column_values[col]
+            padded = padded.reshape(groups, width)
+
+            sort_index = np.argsort(padded, axis=1)
+            sorted_values = np.take_along_axis(padded, sort_index, axis=1)
+
+            ## Tied values get the rank of the first value in their run
+            new_run = np.ones(sorted_values.shape, dtype=bool)
+            new_run[:, 1:] = sorted_values[:, 1:] != sorted_values[:, :-1]
+            run_starts = np.maximum.accumulate(
+                np.where(new_run, run_columns, 0), axis=1
+            )
+
+            padded_ranks = np.empty(padded.shape)
+            np.put_along_axis(padded_ranks, sort_index, run_starts + 1, axis=1)
+            ranks[col] = padded_ranks.ravel()[slots]
+    else:
+        row_index = np.arange(rows)
+        group_start_rows = np.repeat(group_starts, group_sizes)
+
+        for col in range(columns):
+            col_order = np.lexsort((column_values[col], group_ids))
+            sorted_values = column_values[col][col_order]
+
+            new_run = np.ones(rows, dtype=bool)
+            new_run[1:] = sorted_values[1:] != sorted_values[:-1]
+            new_run[group_starts] = True
+            run_starts = np.maximum.accumulate(np.where(new_run, row_index, 0))
+
+            ## Rows are sorted by group in both orders, so group_start_rows
+            #  lines up with col_order
+            ranks[col][col_order] = run_starts - group_start_rows + 1
+
+    ranks[np.isnan(column_values)] = np.nan
+
+    return ranks.T
+
+
+def rank_offers(
+    frame: "pd.DataFrame" = None,
+    usage: Sequence[float] = None,
+    default_prices: dict[int, float] = None,
+    early_exit_rate: float = default_early_exit_rate,
+    keys: list[str] = None,
+) -> "pd.DataFrame":
+    """Cost, rank & savings of every offer at every usage level.
+
+    Returns frame with cost_<usage>, rank_<usage> & savings_<usage> columns
+    added. Rank 1 is the cheapest offer among rows sharing keys (by default,
+    the same comparison page scrape).
+
+    default_prices maps territory_id to the utility's default price in cents,
+    its "price to compare". Savings are the utility's annual cost at that
+    price minus the offer's, NaN for territories without a default price.
+    """
+    if frame is None:
+        raise ValueError("Missing frame")
+
+    ensure_pandas()
+
+    usage = list(usage or default_usage_grid)
+    keys = keys or default_rank_keys
+
+    costs = effective_costs(frame, usage=usage, early_exit_rate=early_exit_rate)
+    cost_columns = [f"cost_{level:g}" for level in usage]
+    ## copy=False wraps the arrays instead of copying them into each frame
+    cost_frame = pd.DataFrame(
+        costs, columns=cost_columns, index=frame.index, copy=False
+    )
+
+    ## Rank on one integer group id instead of the key columns
+    group_ids = frame.groupby(keys, sort=False, dropna=False).ngroup().to_numpy()
+    rank_frame = pd.DataFrame(
+        group_min_ranks(costs, group_ids),
+        columns=[f"rank_{level:g}" for level in usage],
+        index=frame.index,
+        copy=False,
+    )
+
+    default_price = (
+        frame["territory_id"].map(default_prices or {}).to_numpy(dtype="float64")
+    )
+    savings = 12 * np.outer(default_price / 100, np.asarray(usage, "float64"))
+    savings -= costs
+    savings_frame = pd.DataFrame(
+        savings,
+        columns=[f"savings_{level:g}" for level in usage],
+        index=frame.index,
+        copy=False,
+    )
+
+    return pd.concat([frame, cost_frame, rank_frame, savings_frame], axis=1)
+
+
+def best_offers(
+    ranked: "pd.DataFrame" = None, usage: float = 1000, top: int = 1
+) -> "pd.DataFrame":
+    """Offers ranked top or better at a usage level, cheapest first per group."""
+    ensure_pandas()
+
+    rank_col = f"rank_{usage:g}"
+    if rank_col not in ranked.columns:
+        raise ValueError(f"Usage level {usage} was not ranked")
+
+    best = ranked[ranked[rank_col] <= top]
+
+    return best.sort_values(
+        ["utility_type", "territory_id", "rate_code", "scrape_epoch", rank_col]
+    ).reset_index(drop=True)
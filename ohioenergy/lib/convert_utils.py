@@ -0,0 +1,117 @@
+"""Parse scraped price, money, percent, yes/no & term strings into typed values."""
+import re
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Union
+
+## Match the first number in a string, i.e. "$1,150.00" -> "1,150.00"
+number_pattern = re.compile(r"\d[\d,]*(?:\.\d+)?|\.\d+")
+
+## The same handful of fee, term & percent strings repeat on every page, so
+#  string parsers are memoized. Results are immutable (int, Decimal, float,
+#  bool or None) & safe to share
+parse_cache_size = 4096
+
+yes_values = frozenset(["yes", "y", "true"])
+no_values = frozenset(["no", "n", "false"])
+
+cent = Decimal("0.01")
+ten_thousandth = Decimal("0.0001")
+
+
+@lru_cache(maxsize=parse_cache_size)
+def _first_number(value: str = None) -> str | None:
+    if value is None:
+        return None
+
+    match = number_pattern.search(str(value))
+    if not match:
+        return None
+
+    return match.group(0).replace(",", "")
+
+
+@lru_cache(maxsize=parse_cache_size)
+def parse_term_months(term_length: str = None) -> int | None:
+    """Parse a term length string, i.e. "12 mo.", into a count of months."""
+    number = _first_number(term_length)
+    if number is None:
+        return None
+
+    return int(Decimal(number))
+
+
+@lru_cache(maxsize=parse_cache_size)
+def _parse_money_str(money: str = None) -> Decimal | None:
+    number = _first_number(money)
+    if number is None:
+        return None
+
+    try:
+        return Decimal(number).quantize(cent)
+    except InvalidOperation:
+        return None
+
+
+def parse_money(money: Union[str, int, float, None] = None) -> Decimal | None:
+    """Parse a fee string, i.e. "$150.00", into a Decimal."""
+    if isinstance(money, (int, float, Decimal)):
+        return Decimal(str(money))
+
+    if money is None:
+        return None
+
+    return _parse_money_str(str(money))
+
+
+@lru_cache(maxsize=parse_cache_size)
+def _parse_percent_str(percent: str = None) -> float | None:
+    number = _first_number(percent)
+    if number is None:
+        return None
+
+    return float(number)
+
+
+def parse_percent(percent: Union[str, int, float, None] = None) -> float | None:
+    """Parse a percentage string, i.e. "100%", into a float."""
+    if isinstance(percent, (int, float, Decimal)):
+        return float(percent)
+
+    if percent is None:
+        return None
+
+    return _parse_percent_str(str(percent))
+
+
+@lru_cache(maxsize=parse_cache_size)
+def parse_yes_no(value: str = None) -> bool | None:
+    """Parse a "Yes"/"No" column into a bool."""
+    if value is None:
+        return None
+
+    value = str(value).strip().lower()
+    if value in yes_values:
+        return True
+    if value in no_values:
+        return False
+
+    return None
+
+
+@lru_cache(maxsize=parse_cache_size, typed=True)
+def price_to_cents(
+    price: Union[str, int, float, Decimal, None] = None
+) -> Decimal | None:
+    """Convert a parsed price into a Decimal count of cents.
+
+    parse_table_body() already multiplies the $/kWh price by 100, this
+    only converts the float to a Decimal without float noise.
+    """
+    if price is None or price == "":
+        return None
+
+    try:
+        return Decimal(str(price)).quantize(ten_thousandth)
+    except InvalidOperation:
+        return None
@@ -0,0 +1,126 @@
+"""Re-run crawls on a schedule from one long-running process."""
+import random
+import time
+from typing import Any
+
+from core.config import logging_settings
+from core.logging.logger import get_logger
+from scrapy.crawler import CrawlerRunner
+from twisted.internet import defer, reactor
+from twisted.internet.base import DelayedCall
+
+log = get_logger(__name__, level=logging_settings.LOG_LEVEL)
+
+
+class CrawlScheduler:
+    """Re-run a spider every interval seconds on one long-running reactor.
+
+    Runs start interval seconds apart, plus or minus up to jitter seconds.
+    A run that is due while the previous run of the same spider is still
+    going is skipped, so runs never overlap.
+
+    The process & its database engine, with its connection pool, stay up
+    between runs. Each run creates a new crawler, so Scrapy's downloader &
+    its HTTP connections are not reused.
+    """
+
+    def __init__(
+        self,
+        runner: CrawlerRunner = None,
+        spider_cls: type = None,
+        interval: float = 3600,
+        jitter: float = 0,
+        spider_kwargs: dict[str, Any] = None,
+    ):
+        """Check the schedule. Nothing runs until start() is called."""
+        if runner is None:
+            raise ValueError("Missing runner")
+        if spider_cls is None:
+            raise ValueError("Missing spider_cls")
+        if interval <= 0:
+            raise ValueError(f"Invalid interval: {interval}. Must be greater than 0")
+
+        self.runner = runner
+        self.spider_cls = spider_cls
+        self.interval = interval
+        self.jitter = max(0, min(jitter, interval))
+        self.spider_kwargs = spider_kwargs or {}
+
+        self.running: set[str] = set()
+        self.runs = 0
+        self.skipped = 0
+        self.next_call: DelayedCall | None = None
+        self.stopping = False
+
+    def next_delay(self) -> float:
+        """Seconds until the next run, interval plus or minus up to jitter."""
+        return max(0, self.interval + random.uniform(-self.jitter, self.jitter))
+
+    def start(self, now: bool = True) -> None:
+        """Schedule the first run, immediately or after one interval."""
+        self.stopping = False
+        self.schedule(0 if now else self.next_delay())
+
+    def schedule(self, delay: float = 0) -> None:
+        """Call tick() after delay seconds."""
+        self.next_call = reactor.callLater(delay, self.tick)
+
+    def tick(self) -> None:
+        """Start a run if the spider is idle & schedule the next one."""
+        if self.stopping:
+            return
+
+        ## Schedule from when the run was due, not when it finishes, so a
+        #  slow run doesn't push every later run back
+        delay = self.next_delay()
+        self.schedule(delay)
+
+        spider_name = self.spider_cls.name
+        if spider_name in self.running:
+            self.skipped += 1
+            log.warning(
+                f"Previous {spider_name} crawl is still running, skipping this run. "
+                f"Next run in {delay:.0f}s"
+            )
+            return
+
+        self.run_crawl()
+        log.info(f"Next {spider_name} crawl in {delay:.0f}s")
+
+    def run_crawl(self) -> defer.Deferred:
+        """Start a crawl, returning a Deferred that fires when it finishes."""
+        spider_name = self.spider_cls.name
+        self.running.add(spider_name)
+        self.runs += 1
+        started = time.monotonic()
+
+        log.info(f"Starting {spider_name} crawl #{self.runs}")
+
+        def finished(result):
+            self.running.discard(spider_name)
+            elapsed = time.monotonic() - started
+            log.info(f"Finished {spider_name} crawl #{self.runs} in {elapsed:.1f}s")
+
+            return result
+
+        def failed(failure):
+            ## Log & keep the daemon running, the next run may succeed
+            log.error(
+                f"Unhandled exception in {spider_name} crawl #{self.runs}. "
+                f"Exception details: {failure.getTraceback()}"
+            )
+
+        deferred = self.runner.crawl(self.spider_cls, **self.spider_kwargs)
+        deferred.addBoth(finished)
+        deferred.addErrback(failed)
+
+        return deferred
+
+    def stop(self) -> defer.Deferred:
+        """Cancel the next run & stop any running crawls."""
+        self.stopping = True
+
+        if self.next_call is not None and self.next_call.active():
+            self.next_call.cancel()
+
+        return self.runner.stop()
@@ -0,0 +1,577 @@
+"""Read & write helpers for the providers, snapshot, page & crawl tables."""
+import time
+import uuid
+from contextlib import nullcontext
+from typing import Any
+
+from core.config import logging_settings
+from core.database import generate_uuid_str, get_engine
+from core.logging.logger import get_logger
+from itemadapter import ItemAdapter
+from models.crawl_models import CrawlRun
+from models.page_models import PageHash, PageValidator
+from models.provider_models import OfferFingerprint, OhioenergyProvider
+from models.snapshot_models import OfferSnapshot
+from sqlalchemy import (
+    Connection,
+    Engine,
+    Table,
+    bindparam,
+    delete,
+    insert,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from lib.hash_utils import offer_fingerprint, offer_key
+from lib.normalize_utils import normalize_provider
+
+log = get_logger(__name__, level=logging_settings.LOG_LEVEL)
+
+provider_columns = OhioenergyProvider.__table__.columns.keys()
+provider_required_columns = [
+    col.name for col in OhioenergyProvider.__table__.columns if not col.nullable
+]
+
+
+def provider_row_from_item(item: Any = None) -> dict[str, Any]:
+    """Convert a scraped item/dict into a row for the providers table.
+
+    Keys that are not columns on the providers table are dropped, missing
+    columns are set to None so every row in a batch has the same keys.
+    """
+    if not item:
+        raise ValueError("Missing item data")
+
+    item_dict = ItemAdapter(item).asdict()
+
+    row = {col: item_dict.get(col) for col in provider_columns}
+
+    if not row["id"]:
+        row["id"] = generate_uuid_str()
+
+    if not row["scrape_epoch"]:
+        row["scrape_epoch"] = int(time.time())
+
+    return row
+
+
+def is_valid_provider_row(row: dict[str, Any] = None) -> bool:
+    """Check a provider row has a value for every non-nullable column."""
+    if not row:
+        return False
+
+    return all(row.get(col) is not None for col in provider_required_columns)
+
+
+def snapshot_row_from_item(item: Any = None) -> dict[str, Any]:
+    """Convert a scraped item/dict into a typed row for the offer_snapshots table."""
+    if not item:
+        raise ValueError("Missing item data")
+
+    item_dict = ItemAdapter(item).asdict()
+
+    ## Items from the spider are already normalized at parse time
+    normalized = item_dict.get("normalized") or normalize_provider(item_dict)
+
+    row = {
+        "scrape_epoch": item_dict.get("scrape_epoch") or int(time.time()),
+        "utility_type": item_dict.get("utility_type"),
+        "territory_id": item_dict.get("territory_id"),
+        "rate_code": item_dict.get("rate_code"),
+        "name": item_dict.get("name"),
+        "url": item_dict.get("url"),
+        "rate_type": item_dict.get("rate_type"),
+        "price_cents": normalized["price_cents"],
+        "term_months": normalized["term_months"],
+        "early_term_fee": normalized["early_term_fee"],
+        "monthly_fee": normalized["monthly_fee"],
+        "percent_renewable": normalized["percent_renewable"],
+        "intro_price": normalized["intro_price"],
+        "promo_offer": item_dict.get("promo_offer"),
+    }
+
+    return row
+
+
+def copy_rows(
+    conn: Connection = None, table: Table = None, rows: list[dict[str, Any]] = None
+) -> int:
+    """Stream rows into a PostgreSQL table with COPY FROM STDIN.
+
+    Rows are copied into a temporary staging table, then merged into the
+    target table with one INSERT ... SELECT. Rows that conflict with an
+    existing key are skipped. The staging table is created in pg_temp with
+    a unique name, so it can't shadow or drop a real table, and is dropped
+    when the transaction commits.
+
+    Requires the psycopg (3) driver, i.e. a postgresql+psycopg:// DB_URI.
+
+    Returns the count of rows merged into table.
+    """
+    if conn is None:
+        raise ValueError("Missing conn")
+    if table is None:
+        raise ValueError("Missing table")
+
+    if not rows:
+        return 0
+
+    preparer = conn.dialect.identifier_preparer
+    columns = list(rows[0].keys())
+    column_list = ", ".join(preparer.quote(col) for col in columns)
+    target = preparer.format_table(table)
+    staging = "pg_temp." + preparer.quote(
+        f"staging_{table.name}_{uuid.uuid4().hex[:8]}"
+    )
+
+    ## The staging table has the target's column types, without its constraints
+    conn.exec_driver_sql(
+        f"CREATE TEMP TABLE {staging} ON COMMIT DROP "
+        f"AS SELECT {column_list} FROM {target} WITH NO DATA"
+    )
+
+    cursor = conn.connection.driver_connection.cursor()
+    try:
+        with cursor.copy(f"COPY {staging} ({column_list}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row([row.get(col) for col in columns])
+    finally:
+        cursor.close()
+
+    result = conn.exec_driver_sql(
+        f"INSERT INTO {target} ({column_list}) "
+        f"SELECT {column_list} FROM {staging} ON CONFLICT DO NOTHING"
+    )
+
+    return result.rowcount
+
+
+def insert_rows(
+    conn: Connection = None, table: Table = None, rows: list[dict[str, Any]] = None
+) -> int:
+    """Insert rows with the fastest method the connection's backend supports.
+
+    PostgreSQL connections using the psycopg driver stream rows with
+    copy_rows(). Other backends send one executemany() INSERT.
+
+    Returns the count of rows inserted.
+    """
+    if conn is None:
+        raise ValueError("Missing conn")
+    if table is None:
+        raise ValueError("Missing table")
+
+    if not rows:
+        return 0
+
+    if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg":
+        return copy_rows(conn=conn, table=table, rows=rows)
+
+    conn.execute(insert(table), rows)
+
+    return len(rows)
+
+
+def bulk_insert(
+    table: Table = None, rows: list[dict[str, Any]] = None, engine: Engine = None
+) -> int:
+    """Insert a batch of rows in a single transaction.
+
+    Rows are sent with insert_rows() in a single commit instead of one
+    per row. Returns the count of rows inserted.
+    """
+    if table is None:
+        raise ValueError("Missing table")
+
+    if not rows:
+        return 0
+
+    try:
+        with (engine or get_engine()).begin() as conn:
+            inserted = insert_rows(conn=conn, table=table, rows=rows)
+    except IntegrityError as integrity_exc:
+        log.error(
+            f"Integrity error inserting {len(rows)} row(s) into {table.name}. "
+            f"Exception details: {integrity_exc}"
+        )
+        raise
+    except Exception as exc:
+        raise Exception(
+            f"Unhandled exception inserting {len(rows)} row(s) into {table.name}. "
+            f"Exception details: {exc}"
+        )
+
+    return inserted
+
+
+def bulk_insert_providers(
+    rows: list[dict[str, Any]] = None, engine: Engine = None
+) -> int:
+    """Bulk insert rows built by provider_row_from_item()."""
+    return bulk_insert(table=OhioenergyProvider.__table__, rows=rows, engine=engine)
+
+
+def save_providers(
+    rows: list[dict[str, Any]] = None,
+    engine: Engine = None,
+    chunk_size: int = 500,
+    conn: Connection = None,
+) -> tuple[int, int]:
+    """Save provider rows, skipping offers that have not changed.
+
+    Each row is fingerprinted with offer_fingerprint() & compared with the
+    latest version of its offer, found by offer_key(). A row that matches
+    the latest version, or a version that was current at the row's
+    scrape_epoch, is unchanged & only bumps that fingerprint's last_seen &
+    seen_count. Any other row is a new version & is inserted as a providers
+    row, so an offer that changes A -> B -> A stores 3 versions.
+
+    Rows are applied in scrape_epoch order. Re-saving rows with an epoch
+    that is already covered by a fingerprint's first_seen/last_seen doesn't
+    bump seen_count, so a replay of the same rows is a no-op.
+
+    New rows are written with insert_rows(), which uses COPY on PostgreSQL.
+
+    Pass conn to save inside a transaction the caller already started.
+
+    Returns a tuple of (count inserted, count unchanged).
+    """
+    if not rows:
+        return 0, 0
+
+    ## Dedupe within the batch, the first row with a fingerprint & epoch is kept
+    batch: dict[tuple[str, int], tuple[str, dict[str, Any]]] = {}
+    for row in rows:
+        epoch = row.get("scrape_epoch") or int(time.time())
+        batch.setdefault((offer_fingerprint(row), epoch), (offer_key(row), row))
+
+    fingerprints = list({fingerprint for fingerprint, _ in batch})
+    keys = list({key for key, _ in batch.values()})
+
+    transaction = (
+        nullcontext(conn) if conn is not None else (engine or get_engine()).begin()
+    )
+
+    try:
+        with transaction as conn:
+            known: dict[str, dict[str, Any]] = {}
+            for i in range(0, max(len(fingerprints), len(keys)), chunk_size):
+                for existing in conn.execute(
+                    select(OfferFingerprint.__table__).where(
+                        or_(
+                            OfferFingerprint.fingerprint.in_(
+                                fingerprints[i : i + chunk_size]
+                            ),
+                            OfferFingerprint.offer_key.in_(keys[i : i + chunk_size]),
+                        )
+                    )
+                ).mappings():
+                    known[existing["fingerprint"]] = dict(existing)
+
+            ## Fingerprints stored before offer_key was added
+            changed = set()
+            for (fingerprint, _), (key, _) in batch.items():
+                record = known.get(fingerprint)
+                if record is not None and record["offer_key"] != key:
+                    record["offer_key"] = key
+                    changed.add(fingerprint)
+
+            versions: dict[str, set[str]] = {}
+            for record in known.values():
+                versions.setdefault(record["offer_key"], set()).add(
+                    record["fingerprint"]
+                )
+
+            new_rows = []
+            new_fingerprints = []
+            latest: dict[str, set[str]] = {}
+            current_epoch = None
+
+            for (fingerprint, epoch), (key, row) in sorted(
+                batch.items(), key=lambda entry: entry[0][1]
+            ):
+                ## Latest versions as of the rows before this epoch, so
+                #  offers that share a key & are seen together stay unchanged
+                if epoch != current_epoch:
+                    current_epoch = epoch
+                    latest.clear()
+
+                if key not in latest:
+                    key_records = [known[fp] for fp in versions.get(key, ())]
+                    latest_seen = max(
+                        (record["last_seen"] for record in key_records), default=None
+                    )
+                    latest[key] = {
+                        record["fingerprint"]
+                        for record in key_records
+                        if record["last_seen"] == latest_seen
+                    }
+
+                record = known.get(fingerprint)
+                if record is not None and (
+                    fingerprint in latest[key]
+                    or record["first_seen"] <= epoch <= record["last_seen"]
+                ):
+                    if epoch > record["last_seen"]:
+                        record["last_seen"] = epoch
+                    elif epoch < record["first_seen"]:
+                        record["first_seen"] = epoch
+                    else:
+                        continue
+
+                    record["seen_count"] += 1
+                    changed.add(fingerprint)
+                    continue
+
+                new_rows.append(row)
+
+                if record is None:
+                    known[fingerprint] = {
+                        "fingerprint": fingerprint,
+                        "offer_key": key,
+                        "provider_id": row["id"],
+                        "first_seen": epoch,
+                        "last_seen": epoch,
+                        "seen_count": 1,
+                    }
+                    versions.setdefault(key, set()).add(fingerprint)
+                    new_fingerprints.append(fingerprint)
+                    continue
+
+                ## A fingerprint seen before an offer changed & then changed
+                #  back, point it at the new version
+                record["provider_id"] = row["id"]
+                record["first_seen"] = min(record["first_seen"], epoch)
+                record["last_seen"] = max(record["last_seen"], epoch)
+                record["seen_count"] += 1
+                changed.add(fingerprint)
+
+            if new_rows:
+                insert_rows(
+                    conn=conn, table=OhioenergyProvider.__table__, rows=new_rows
+                )
+                insert_rows(
+                    conn=conn,
+                    table=OfferFingerprint.__table__,
+                    rows=[known[fingerprint] for fingerprint in new_fingerprints],
+                )
+
+            changed.difference_update(new_fingerprints)
+            if changed:
+                fingerprint_table = OfferFingerprint.__table__
+                conn.execute(
+                    update(fingerprint_table)
+                    .where(
+                        fingerprint_table.c.fingerprint == bindparam("b_fingerprint")
+                    )
+                    .values(
+                        offer_key=bindparam("b_offer_key"),
+                        provider_id=bindparam("b_provider_id"),
+                        first_seen=bindparam("b_first_seen"),
+                        last_seen=bindparam("b_last_seen"),
+                        seen_count=bindparam("b_seen_count"),
+                    ),
+                    [
+                        {f"b_{col}": value for col, value in known[fingerprint].items()}
+                        for fingerprint in changed
+                    ],
+                )
+    except IntegrityError as integrity_exc:
+        log.error(
+            f"Integrity error saving {len(rows)} provider(s). "
+            f"Exception details: {integrity_exc}"
+        )
+        raise
+    except Exception as exc:
+        raise Exception(
+            f"Unhandled exception saving {len(rows)} provider(s). "
+            f"Exception details: {exc}"
+        )
+
+    return len(new_rows), len(rows) - len(new_rows)
+
+
+def bulk_insert_snapshots(
+    rows: list[dict[str, Any]] = None, engine: Engine = None
+) -> int:
+    """Bulk insert rows built by snapshot_row_from_item()."""
+    return bulk_insert(table=OfferSnapshot.__table__, rows=rows, engine=engine)
+
+
+def cheapest_offers(
+    territory_id: int = None,
+    rate_type: str = "Fixed",
+    days: int = 90,
+    limit: int = 10,
+    engine: Engine = None,
+) -> list[OfferSnapshot]:
+    """Return the cheapest offers seen in a territory over the last N days.
+
+    The (territory_id, rate_type, scrape_epoch, price_cents) index finds the
+    rows: an equality seek on territory_id & rate_type, then a range scan
+    on scrape_epoch. The range breaks the index's price_cents order, so the
+    matching rows are still sorted on price_cents before the limit.
+    """
+    if territory_id is None:
+        raise ValueError("Missing territory_id")
+
+    since_epoch = int(time.time()) - (days * 86400)
+
+    stmt = (
+        select(OfferSnapshot)
+        .where(
+            OfferSnapshot.territory_id == territory_id,
+            OfferSnapshot.rate_type == rate_type,
+            OfferSnapshot.scrape_epoch >= since_epoch,
+            OfferSnapshot.price_cents.is_not(None),
+        )
+        .order_by(OfferSnapshot.price_cents)
+        .limit(limit)
+    )
+
+    with Session(engine or get_engine()) as sess:
+        return list(sess.scalars(stmt))
+
+
+def get_page_hash(url: str = None, engine: Engine = None) -> PageHash | None:
+    """Return the stored PageHash for a URL, or None if it has not been crawled."""
+    if not url:
+        raise ValueError("Missing url")
+
+    with Session(engine or get_engine()) as sess:
+        return sess.get(PageHash, url)
+
+
+def record_page_hash(
+    url: str = None,
+    body_hash: str = None,
+    normalized_hash: str = None,
+    changed: bool = True,
+    engine: Engine = None,
+) -> None:
+    """Store a page's hashes after it has been parsed.
+
+    With changed=False, only the last_seen heartbeat & unchanged_count are
+    updated.
+    """
+    if not url:
+        raise ValueError("Missing url")
+
+    seen_epoch = int(time.time())
+
+    with Session(engine or get_engine()) as sess:
+        page = sess.get(PageHash, url)
+
+        if page is None:
+            page = PageHash(
+                url=url,
+                body_hash=body_hash,
+                normalized_hash=normalized_hash,
+                last_changed=seen_epoch,
+                last_seen=seen_epoch,
+                unchanged_count=0,
+            )
+            sess.add(page)
+        elif changed:
+            page.body_hash = body_hash
+            page.normalized_hash = normalized_hash
+            page.last_changed = seen_epoch
+            page.last_seen = seen_epoch
+            page.unchanged_count = 0
+        else:
+            page.last_seen = seen_epoch
+            page.unchanged_count += 1
+
+        sess.commit()
+
+
+def get_page_validator(url: str = None, engine: Engine = None) -> PageValidator | None:
+    """Return the stored ETag/Last-Modified validators for a URL, if any."""
+    if not url:
+        raise ValueError("Missing url")
+
+    with Session(engine or get_engine()) as sess:
+        return sess.get(PageValidator, url)
+
+
+def record_page_validator(
+    url: str = None,
+    etag: str = None,
+    last_modified: str = None,
+    not_modified: bool = False,
+    engine: Engine = None,
+) -> None:
+    """Store the validators a page was served with.
+
+    With not_modified=True (the server answered 304), the stored validators
+    are kept & only last_checked & not_modified_count are updated.
+    """
+    if not url:
+        raise ValueError("Missing url")
+
+    checked_epoch = int(time.time())
+
+    with Session(engine or get_engine()) as sess:
+        validator = sess.get(PageValidator, url)
+
+        if validator is None:
+            if not_modified:
+                return
+
+            validator = PageValidator(
+                url=url,
+                etag=etag,
+                last_modified=last_modified,
+                last_checked=checked_epoch,
+                not_modified_count=0,
+            )
+            sess.add(validator)
+        elif not_modified:
+            validator.last_checked = checked_epoch
+            validator.not_modified_count += 1
+        else:
+            validator.etag = etag
+            validator.last_modified = last_modified
+            validator.last_checked = checked_epoch
+            validator.not_modified_count = 0
+
+        sess.commit()
+
+
+def delete_page_validator(url: str = None, engine: Engine = None) -> None:
+    """Forget a page's validators, so it's fully downloaded next time."""
+    if not url:
+        raise ValueError("Missing url")
+
+    with Session(engine or get_engine()) as sess:
+        sess.execute(delete(PageValidator).where(PageValidator.url == url))
+        sess.commit()
+
+
+def record_crawl_run(
+    spider: str = None,
+    started_at: int = None,
+    reason: str = None,
+    items_scraped: int = 0,
+    engine: Engine = None,
+) -> int:
+    """Record a finished crawl. Returns the new crawl_runs row's id."""
+    if not spider:
+        raise ValueError("Missing spider")
+
+    with Session(engine or get_engine()) as sess:
+        crawl_run = CrawlRun(
+            spider=spider,
+            started_at=started_at,
+            finished_at=int(time.time()),
+            reason=reason,
+            items_scraped=items_scraped,
+        )
+        sess.add(crawl_run)
+        sess.commit()
+
+        return crawl_run.id
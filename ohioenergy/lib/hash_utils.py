@@ -0,0 +1,104 @@
+"""Fingerprints of offers & scraped pages, used to skip unchanged data."""
+import hashlib
+import re
+from typing import Any
+
+## Offer fields included in an offer's fingerprint. id & scrape_timestamp
+#  change on every scrape & are left out.
+fingerprint_fields = [
+    "utility_type",
+    "territory_id",
+    "rate_code",
+    "name",
+    "address",
+    "phone",
+    "url",
+    "price",
+    "rate_type",
+    "percent_renewable",
+    "intro_price",
+    "term_length",
+    "early_term_fee",
+    "monthly_fee",
+    "promo_offer",
+]
+
+## Fields that identify an offer across versions. An offer whose key stays
+#  the same but whose fingerprint changes is a new version of that offer.
+offer_key_fields = [
+    "utility_type",
+    "territory_id",
+    "rate_code",
+    "name",
+    "rate_type",
+    "term_length",
+]
+
+
+def normalize_field(value: Any = None) -> str:
+    """Normalize a field value for fingerprinting.
+
+    Collapses whitespace & lowercases strings, so cosmetic changes on the
+    page don't look like a changed offer.
+    """
+    if value is None:
+        return ""
+
+    return " ".join(str(value).split()).lower()
+
+
+def offer_fingerprint(offer: dict[str, Any] = None) -> str:
+    """Return a sha256 hex digest of an offer's normalized fields."""
+    if not offer:
+        raise ValueError("Missing offer data")
+
+    normalized = "\x1f".join(
+        normalize_field(offer.get(field)) for field in fingerprint_fields
+    )
+
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def offer_key(offer: dict[str, Any] = None) -> str:
+    """Return a sha256 hex digest of the fields that identify an offer."""
+    if not offer:
+        raise ValueError("Missing offer data")
+
+    normalized = "\x1f".join(
+        normalize_field(offer.get(field)) for field in offer_key_fields
+    )
+
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+## ASP.NET state fields change on every request, even when the offers don't
+aspnet_state_pattern = re.compile(
+    rb'(<input[^>]*name="__(?:VIEWSTATE|VIEWSTATEGENERATOR|EVENTVALIDATION|PREVIOUSPAGE)"[^>]*value=")[^"]*(")',
+    re.IGNORECASE,
+)
+whitespace_pattern = re.compile(rb"\s+")
+
+
+def normalize_page_body(body: bytes = None) -> bytes:
+    """Strip per-request ASP.NET state & collapse whitespace in a page body."""
+    if body is None:
+        raise ValueError("Missing page body")
+
+    body = aspnet_state_pattern.sub(rb"\1\2", body)
+    body = whitespace_pattern.sub(b" ", body)
+
+    return body.strip()
+
+
+def page_hash(body: bytes = None, normalize: bool = False) -> str:
+    """Return a sha256 hex digest of a page body.
+
+    With normalize=True the body is passed through normalize_page_body() first.
+    """
+    if body is None:
+        raise ValueError("Missing page body")
+
+    if normalize:
+        body = normalize_page_body(body)
+
+    return hashlib.sha256(body).hexdigest()
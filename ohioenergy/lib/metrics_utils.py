@@ -0,0 +1,156 @@
+"""Prometheus metrics for crawls, served over HTTP by the Twisted reactor."""
+import threading
+from functools import lru_cache
+
+from core.config import logging_settings
+from core.instrumentation import default_latency_buckets_ms
+from core.logging.logger import get_logger
+
+log = get_logger(__name__, level=logging_settings.LOG_LEVEL)
+
+## prometheus_client is optional, install with: pdm install -G metrics. It's
+#  only imported by ensure_prometheus_client() on first use
+prometheus_client = None
+
+default_metrics_host = "127.0.0.1"
+default_metrics_port = 9410
+
+## Histogram buckets in seconds, matching core.instrumentation's latency buckets
+latency_buckets_seconds = [bound / 1000 for bound in default_latency_buckets_ms]
+
+_server_lock = threading.Lock()
+_metrics_server = None
+
+
+def ensure_prometheus_client():
+    """Import prometheus_client on first call.
+
+    Raise ImportError if it's not installed.
+    """
+    global prometheus_client
+
+    if prometheus_client is not None:
+        return
+
+    try:
+        import prometheus_client as _prometheus_client
+    except ImportError:
+        raise ImportError(
+            "prometheus_client is required for the metrics endpoint. "
+            "Install with: pdm install -G metrics"
+        )
+
+    prometheus_client = _prometheus_client
+
+
+class CrawlMetrics:
+    """Prometheus counters, histograms & gauges for crawls in this process."""
+
+    def __init__(self, registry=None):
+        """Register the crawl metrics on registry, or the default registry."""
+        ensure_prometheus_client()
+
+        self.registry = registry or prometheus_client.REGISTRY
+
+        self.items_scraped = prometheus_client.Counter(
+            "ohioenergy_items_scraped",
+            "Items that passed every pipeline",
+            ["spider"],
+            registry=self.registry,
+        )
+        self.items_dropped = prometheus_client.Counter(
+            "ohioenergy_items_dropped",
+            "Items dropped by a pipeline",
+            ["spider"],
+            registry=self.registry,
+        )
+        self.responses = prometheus_client.Counter(
+            "ohioenergy_responses",
+            "Responses received, by HTTP status",
+            ["spider", "status"],
+            registry=self.registry,
+        )
+        self.errors = prometheus_client.Counter(
+            "ohioenergy_errors",
+            "Errors by kind: download, spider or item",
+            ["spider", "kind"],
+            registry=self.registry,
+        )
+        self.download_latency = prometheus_client.Histogram(
+            "ohioenergy_download_latency_seconds",
+            "Time from sending a request to receiving its response headers",
+            ["spider"],
+            buckets=latency_buckets_seconds,
+            registry=self.registry,
+        )
+        self.stage_latency = prometheus_client.Histogram(
+            "ohioenergy_stage_latency_seconds",
+            "Latency of parsing, pipelines & batch writes, by stage",
+            ["stage"],
+            buckets=latency_buckets_seconds,
+            registry=self.registry,
+        )
+        self.queue_depth = prometheus_client.Gauge(
+            "ohioenergy_scheduler_queue_depth",
+            "Requests waiting in the scheduler",
+            ["spider"],
+            registry=self.registry,
+        )
+        self.active_requests = prometheus_client.Gauge(
+            "ohioenergy_active_requests",
+            "Requests being downloaded",
+            ["spider"],
+            registry=self.registry,
+        )
+        self.crawl_finished = prometheus_client.Gauge(
+            "ohioenergy_crawl_finished_timestamp_seconds",
+            "Unix time the last crawl finished",
+            ["spider", "reason"],
+            registry=self.registry,
+        )
+
+    def observe_stage(self, stage: str = None, duration: float = 0) -> None:
+        """Observer for core.instrumentation's latency_stats."""
+        self.stage_latency.labels(stage=stage).observe(duration)
+
+
+@lru_cache(maxsize=1)
+def get_crawl_metrics() -> CrawlMetrics:
+    """Return the process's CrawlMetrics, registered on the default registry.
+
+    Metrics can only be registered once, so crawls run one after another
+    in the same process share them.
+    """
+    return CrawlMetrics()
+
+
+def start_metrics_server(
+    port: int = default_metrics_port, host: str = default_metrics_host, registry=None
+):
+    """Serve metrics at http://<host>:<port>/metrics from the Twisted reactor.
+
+    Only the first call listens, later calls return the same listening port,
+    so the endpoint stays up between scheduled crawls.
+    """
+    global _metrics_server
+
+    ensure_prometheus_client()
+
+    from prometheus_client.twisted import MetricsResource
+    from twisted.internet import reactor
+    from twisted.web.resource import Resource
+    from twisted.web.server import Site
+
+    with _server_lock:
+        if _metrics_server is not None:
+            return _metrics_server
+
+        root = Resource()
+        root.putChild(
+            b"metrics", MetricsResource(registry=registry or prometheus_client.REGISTRY)
+        )
+
+        _metrics_server = reactor.listenTCP(port, Site(root), interface=host)
+        log.info(f"Serving metrics at http://{host}:{port}/metrics")
+
+    return _metrics_server
@@ -14,8 +14,11 @@ def serialize(
     input: str | bytes = None,
     cache_dir: str = default_cache_dir,
     output_dir: str = None,
-    filename: str = f"{get_ts()}_unnamed_serialize.msgpack",
+    filename: str = None,
 ):
+    if not filename:
+        filename = f"{get_ts()}_unnamed_serialize.msgpack"
+
     ensure_dir(dir_path=f"{cache_dir}/{output_dir}")
 
     if not output_dir:
@@ -0,0 +1,116 @@
+"""Normalize scraped provider strings into typed offer fields."""
+from collections import Counter
+from typing import Any, Callable
+
+from core.config import logging_settings
+from core.logging.logger import get_logger
+
+from lib.convert_utils import (
+    parse_money,
+    parse_percent,
+    parse_term_months,
+    parse_yes_no,
+    price_to_cents,
+)
+
+log = get_logger(__name__, level=logging_settings.LOG_LEVEL)
+
+## Typed field name -> (raw provider field, normalizer). Typed names match the
+#  offer_snapshots columns
+field_normalizers: dict[str, tuple[str, Callable[[Any], Any]]] = {
+    "price_cents": ("price", price_to_cents),
+    "term_months": ("term_length", parse_term_months),
+    "early_term_fee": ("early_term_fee", parse_money),
+    "monthly_fee": ("monthly_fee", parse_money),
+    "percent_renewable": ("percent_renewable", parse_percent),
+    "intro_price": ("intro_price", parse_yes_no),
+}
+
+## Distinct rejected values kept per field, for the report
+default_max_samples = 20
+
+
+class NormalizeReport:
+    """Count normalized, empty & rejected values per field.
+
+    A value is rejected when it's not empty but its normalizer returns None,
+    i.e. a term length of "Varies". The most common rejected raw values are
+    kept per field, to show what a normalizer is missing.
+    """
+
+    def __init__(self, max_samples: int = default_max_samples):
+        """Keep up to max_samples distinct rejected values per field."""
+        self.max_samples = max_samples
+
+        self.rows = 0
+        self.normalized: Counter = Counter()
+        self.empty: Counter = Counter()
+        self.rejected: Counter = Counter()
+        self.rejected_values: dict[str, Counter] = {}
+
+    def record(self, field: str = None, raw: Any = None, value: Any = None) -> None:
+        """Count a field's raw value as normalized, empty or rejected."""
+        if value is not None:
+            self.normalized[field] += 1
+        elif raw is None or raw == "":
+            self.empty[field] += 1
+        else:
+            self.rejected[field] += 1
+
+            samples = self.rejected_values.setdefault(field, Counter())
+            ## Only count values already kept once the sample is full
+            if raw in samples or len(samples) < self.max_samples:
+                samples[raw] += 1
+
+    def summary(self) -> dict:
+        """Return the per-field counts & rejected values, most common first."""
+        return {
+            "rows": self.rows,
+            "fields": {
+                field: {
+                    "normalized": self.normalized[field],
+                    "empty": self.empty[field],
+                    "rejected": self.rejected[field],
+                    "rejected_values": dict(
+                        self.rejected_values.get(field, Counter()).most_common()
+                    ),
+                }
+                for field in field_normalizers
+            },
+        }
+
+    def log_rejects(self) -> None:
+        """Log a warning per field with rejected values."""
+        for field, rejected in self.rejected.items():
+            samples = self.rejected_values.get(field, Counter()).most_common(5)
+            log.warning(
+                f"Rejected {rejected} {field} value(s) of {self.rows} row(s). "
+                f"Most common: {samples}"
+            )
+
+
+def normalize_provider(
+    provider: dict[str, Any] = None, report: NormalizeReport = None
+) -> dict[str, Any]:
+    """Parse a provider's price, term, fee, renewable & intro price strings.
+
+    Returns a dict of typed values keyed like the offer_snapshots columns,
+    None for values that couldn't be parsed. Pass a NormalizeReport to count
+    empty & rejected values.
+    """
+    if provider is None:
+        raise ValueError("Missing provider")
+
+    normalized = {}
+    for field, (raw_field, normalizer) in field_normalizers.items():
+        raw = provider.get(raw_field)
+        value = normalizer(raw) if raw is not None else None
+        normalized[field] = value
+
+        if report is not None:
+            report.record(field=field, raw=raw, value=value)
+
+    if report is not None:
+        report.rows += 1
+
+    return normalized
@@ -0,0 +1,140 @@
+"""Write & read typed offer snapshots as Parquet, partitioned by scrape date."""
+from pathlib import Path
+from typing import Any
+
+import arrow
+from core.config import logging_settings
+from core.logging.logger import get_logger
+
+log = get_logger(__name__, level=logging_settings.LOG_LEVEL)
+
+## pyarrow is optional, install with: pdm install -G analytics. It is slow to
+#  import, so it's only imported by ensure_pyarrow() on first use
+pa = None
+ds = None
+pq = None
+
+default_snapshot_dir = ".cache/snapshots"
+
+
+def ensure_pyarrow():
+    """Import pyarrow on first call. Raise ImportError if it's not installed."""
+    global pa, ds, pq
+
+    if pa is not None:
+        return
+
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError(
+            "pyarrow is required for Parquet snapshots. "
+            "Install with: pdm install -G analytics"
+        )
+
+    pa = pyarrow
+    ds = pyarrow.dataset
+    pq = pyarrow.parquet
+
+
+def get_snapshot_schema() -> "pa.Schema":
+    """Arrow schema matching the offer_snapshots table."""
+    ensure_pyarrow()
+
+    return pa.schema(
+        [
+            ("scrape_epoch", pa.int64()),
+            ("utility_type", pa.string()),
+            ("territory_id", pa.int32()),
+            ("rate_code", pa.int32()),
+            ("name", pa.string()),
+            ("url", pa.string()),
+            ("rate_type", pa.string()),
+            ("price_cents", pa.decimal128(10, 4)),
+            ("term_months", pa.int32()),
+            ("early_term_fee", pa.decimal128(10, 2)),
+            ("monthly_fee", pa.decimal128(10, 2)),
+            ("percent_renewable", pa.float64()),
+            ("intro_price", pa.bool_()),
+            ("promo_offer", pa.string()),
+        ]
+    )
+
+
+def get_snapshot_partitioning() -> "ds.Partitioning":
+    """Return the hive partitioning used for snapshot Parquet files."""
+    ensure_pyarrow()
+
+    return ds.partitioning(pa.schema([("scrape_date", pa.string())]), flavor="hive")
+
+
+class SnapshotParquetWriter:
+    """Append typed snapshot rows to Parquet files partitioned by scrape date.
+
+    Each write() adds a new file under <root_dir>/scrape_date=YYYY-MM-DD/,
+    existing files are never rewritten.
+    """
+
+    def __init__(self, root_dir: str = default_snapshot_dir, run_id: str = None):
+        """Check pyarrow is installed & set up the writer."""
+        ensure_pyarrow()
+
+        self.root_dir = root_dir
+        self.run_id = run_id or arrow.now().format("YYYYMMDDTHHmmss")
+        self.schema = get_snapshot_schema()
+        self.seq = 0
+
+    def write(self, rows: list[dict[str, Any]] = None) -> int:
+        """Write rows to one file per scrape date. Returns count of rows written."""
+        if not rows:
+            return 0
+
+        partitions: dict[str, list[dict[str, Any]]] = {}
+        for row in rows:
+            scrape_date = (
+                arrow.get(row["scrape_epoch"]).to("local").format("YYYY-MM-DD")
+            )
+            partitions.setdefault(scrape_date, []).append(row)
+
+        for scrape_date, partition_rows in partitions.items():
+            partition_dir = Path(self.root_dir) / f"scrape_date={scrape_date}"
+            partition_dir.mkdir(parents=True, exist_ok=True)
+
+            output_file = partition_dir / f"{self.run_id}-{self.seq:05d}.parquet"
+            self.seq += 1
+
+            table = pa.Table.from_pylist(partition_rows, schema=self.schema)
+            pq.write_table(table, output_file)
+
+            log.debug(f"Wrote {table.num_rows} snapshot(s) to {output_file}")
+
+        return len(rows)
+
+
+def read_snapshots(
+    root_dir: str = default_snapshot_dir,
+    start_date: str = None,
+    end_date: str = None,
+    columns: list[str] = None,
+) -> "pa.Table":
+    """Read snapshot Parquet files into an Arrow table.
+
+    start_date & end_date are inclusive YYYY-MM-DD strings, partitions outside
+    the range are skipped without being opened.
+    """
+    ensure_pyarrow()
+
+    dataset = ds.dataset(
+        root_dir, format="parquet", partitioning=get_snapshot_partitioning()
+    )
+
+    _filter = None
+    if start_date:
+        _filter = ds.field("scrape_date") >= start_date
+    if end_date:
+        end_filter = ds.field("scrape_date") <= end_date
+        _filter = end_filter if _filter is None else _filter & end_filter
+
+    return dataset.to_table(columns=columns, filter=_filter)
@@ -0,0 +1,204 @@
+"""Length-prefixed msgpack segment logs for archiving scraped items."""
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Iterator
+
+import arrow
+import msgpack
+from core.config import logging_settings
+from core.logging.logger import get_logger
+
+log = get_logger(__name__, level=logging_settings.LOG_LEVEL)
+
+## Each record is a 4-byte big-endian length, followed by a msgpack map
+length_prefix = struct.Struct(">I")
+
+segment_suffix = ".seg"
+default_segment_max_bytes = 64 * 1024 * 1024
+## never: leave flushing to the OS
+#  close: fsync when a segment is rotated or closed
+#  always: fsync after every record
+valid_fsync_policies = ["never", "close", "always"]
+
+
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, Decimal):
+        return str(obj)
+
+    raise TypeError(f"Cannot serialize object of type {type(obj)}")
+
+
+def pack_record(record: dict[str, Any] = None) -> bytes:
+    """Pack a record into a length-prefixed msgpack map."""
+    packed = msgpack.packb(record, default=_msgpack_default, use_bin_type=True)
+
+    return length_prefix.pack(len(packed)) + packed
+
+
+class SegmentLogWriter:
+    """Append records to rolling, length-prefixed msgpack segment files.
+
+    Records are appended to one open segment file. When a segment reaches
+    max_segment_bytes, it is closed & a new one is started. Segment files
+    are named <prefix>_<run_id>_<seq>.seg.
+    """
+
+    def __init__(
+        self,
+        log_dir: str = None,
+        prefix: str = "segment",
+        run_id: str = None,
+        max_segment_bytes: int = default_segment_max_bytes,
+        fsync_policy: str = "close",
+    ):
+        """Check the settings. No file is opened until the first append()."""
+        if not log_dir:
+            raise ValueError("Missing log_dir")
+
+        if fsync_policy not in valid_fsync_policies:
+            raise ValueError(
+                f"Invalid fsync policy: {fsync_policy}. "
+                f"Must be one of {valid_fsync_policies}"
+            )
+
+        self.log_dir = Path(log_dir)
+        self.prefix = prefix
+        self.run_id = run_id or arrow.now().format("YYYYMMDDTHHmmss")
+        self.max_segment_bytes = max_segment_bytes
+        self.fsync_policy = fsync_policy
+
+        self.seq = 0
+        self.segment_file = None
+        self.segment_path: Path | None = None
+        self.segment_bytes = 0
+        self.records_written = 0
+
+    def __enter__(self):
+        """Return the writer, closing it when the with block exits."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Close the open segment."""
+        self.close()
+
+    def _open_segment(self):
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+
+        self.segment_path = (
+            self.log_dir / f"{self.prefix}_{self.run_id}_{self.seq:05d}{segment_suffix}"
+        )
+        self.segment_file = open(self.segment_path, "ab")
+        self.segment_bytes = self.segment_path.stat().st_size
+        self.seq += 1
+
+        log.debug(f"Opened segment: {self.segment_path}")
+
+    def _close_segment(self):
+        if self.segment_file is None:
+            return
+
+        self.segment_file.flush()
+        if self.fsync_policy in ["close", "always"]:
+            os.fsync(self.segment_file.fileno())
+
+        self.segment_file.close()
+        self.segment_file = None
+
+    def append(self, record: dict[str, Any] = None) -> None:
+        """Append a record to the current segment, rotating it when full."""
+        if record is None:
+            raise ValueError("Missing record")
+
+        packed = pack_record(record)
+
+        if self.segment_file is not None and (
+            self.segment_bytes + len(packed) > self.max_segment_bytes
+        ):
+            self._close_segment()
+
+        if self.segment_file is None:
+            self._open_segment()
+
+        self.segment_file.write(packed)
+        self.segment_bytes += len(packed)
+        self.records_written += 1
+
+        if self.fsync_policy == "always":
+            self.segment_file.flush()
+            os.fsync(self.segment_file.fileno())
+
+    def close(self) -> None:
+        """Close the open segment, fsyncing it unless fsync_policy is "never"."""
+        self._close_segment()
+
+
+@contextmanager
+def mmap_file(file_path: str | Path = None) -> Iterator[mmap.mmap | None]:
+    """Memory-map a file read-only. Yields None for an empty file."""
+    if not file_path:
+        raise ValueError("Missing file_path")
+
+    with open(file_path, "rb") as f:
+        ## mmap can't map a zero-length file
+        if os.fstat(f.fileno()).st_size == 0:
+            yield None
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+
+def iter_segment(segment_path: str | Path = None) -> Iterator[dict[str, Any]]:
+    """Stream records back out of a segment file.
+
+    The segment is memory-mapped & each record's length prefix is read, then
+    exactly that many bytes are decoded with msgpack.unpackb(), so only the
+    record being decoded is held in memory. A truncated record at the end of
+    the file, i.e. from a crash mid-write, is skipped with a warning. So is a
+    record whose bytes don't decode to exactly one msgpack object.
+    """
+    if not segment_path:
+        raise ValueError("Missing segment_path")
+
+    with mmap_file(segment_path) as mm:
+        if mm is None:
+            return
+
+        offset = 0
+        while offset < len(mm):
+            prefix = mm[offset : offset + length_prefix.size]
+            if len(prefix) < length_prefix.size:
+                log.warning(f"Truncated record length in segment: {segment_path}")
+                break
+
+            (length,) = length_prefix.unpack(prefix)
+            offset += length_prefix.size
+
+            packed = mm[offset : offset + length]
+            if len(packed) < length:
+                log.warning(f"Truncated record in segment: {segment_path}")
+                break
+
+            offset += length
+
+            ## ExtraData when the object ends before the record length does
+            try:
+                yield msgpack.unpackb(packed, raw=False)
+            except (msgpack.ExtraData, msgpack.OutOfData, ValueError) as exc:
+                log.warning(
+                    f"Skipping malformed record at byte {offset - length} "
+                    f"in segment: {segment_path}: {exc}"
+                )
+
+
+def iter_segments(log_dir: str | Path = None) -> Iterator[dict[str, Any]]:
+    """Stream records from every segment file under a directory, in name order."""
+    if not log_dir:
+        raise ValueError("Missing log_dir")
+
+    for segment_path in sorted(Path(log_dir).rglob(f"*{segment_suffix}")):
+        yield from iter_segment(segment_path)
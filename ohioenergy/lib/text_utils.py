@@ -1,18 +1,16 @@
-from core.config import logging_settings
-from core.logging.logger import get_logger
-
-log = get_logger(__name__, level=logging_settings.LOG_LEVEL)
-
 from decimal import Decimal
-from typing import Union
+from typing import Iterator, Union
 
+from core.config import logging_settings
+from core.logging.logger import get_logger
+from lxml.html import HtmlElement
 from scrapy.http.response.html import HtmlResponse
 from scrapy.selector.unified import SelectorList
 
-from lib.file_utils import ensure_dir
+log = get_logger(__name__, level=logging_settings.LOG_LEVEL)
 
+## Debug HTML dumps are written here, create it with ensure_dir() before writing
 html_output_dir = "html_out"
-ensure_dir(html_output_dir)
 
 
 def clean_word_list(scrapy_text: SelectorList = None) -> str:
@@ -93,13 +91,16 @@ def extract_table_header_names(scrapy_thead_text: SelectorList = None) -> list[s
     return table_header_cols
 
 
-def parse_table_body(scrapy_tbody_text: SelectorList):
-    """Parse table body.
+def parse_table_body_xpath(scrapy_tbody_text: SelectorList):
+    """Parse table body with one XPath query per cell.
 
     Providers are organized into an HTML table. Columns are extracted
     separately, by the extract_table_header_names() function.
 
     Creates a list of providers & returns to script that called this func.
+
+    Kept as a reference implementation for parse_table_body(), which
+    returns the same providers in a single pass over each row.
     """
     ## Select table rows
     tbody_provider_trs_select = scrapy_tbody_text.xpath(".//tr")
@@ -228,17 +229,120 @@ def parse_table_body(scrapy_tbody_text: SelectorList):
     return providers
 
 
-def parse_providers_table(
-    scrapy_response: HtmlResponse,
-) -> dict[str, Union[str, Decimal, float, None]]:
-    """Parse response into table content.
+def _text_nodes(element: HtmlElement) -> list[str]:
+    """Return an element's direct text nodes, the same as XPath text()."""
+    texts = []
 
-    Accepts a Scrapy HtmlResponse object, the raw HTML from the scrape.
+    if element.text is not None:
+        texts.append(element.text)
+
+    for child in element:
+        if child.tail is not None:
+            texts.append(child.tail)
+
+    return texts
+
+
+def _is_first_p(element: HtmlElement) -> bool:
+    """Check if element is the first <p> child of its parent, the same as XPath p[1]."""
+    if element.tag != "p":
+        return False
+
+    return next(element.itersiblings("p", preceding=True), None) is None
+
+
+def parse_provider_row(provider_tr: HtmlElement) -> dict[str, Union[str, float]]:
+    """Parse a provider <tr> into a provider dict.
+
+    Walks the row's <td> children once, filling in each column as it is
+    reached instead of running a separate XPath query per column.
+    """
+    tds = [td for td in provider_tr if td.tag == "td"]
+
+    name_parts = []
+    contact_parts = []
+    url_parts = []
+
+    ## Name, contact details & URL can be anywhere in the row's <td> tags
+    for td in tds:
+        for element in td.iter():
+            if element.tag == "span" and element.get("class") == "retail-title":
+                name_parts.extend(_text_nodes(element))
+
+                for span_child in element:
+                    if span_child.tag == "p":
+                        contact_parts.extend(_text_nodes(span_child))
+
+            elif _is_first_p(element):
+                for p_child in element:
+                    if p_child.tag == "a" and p_child.get("href") is not None:
+                        url_parts.append(p_child.get("href"))
+
+    ## Remaining columns are at fixed <td> positions
+    price_td, rate_type_td, renewable_td, intro_price_td = tds[2:6]
+    term_length_td, early_term_fee_td, monthly_fee_td, promo_offers_td = tds[6:10]
+
+    price_content = " ".join(_text_nodes(price_td)).strip().replace(",", ".")
+
+    intro_price_parts = []
+    for p in intro_price_td:
+        if p.tag == "p":
+            intro_price_parts.extend(_text_nodes(p))
+
+    promo_offers_parts = []
+    for p in promo_offers_td:
+        if p.tag == "p":
+            promo_offers_parts.extend(_text_nodes(p))
+
+    _provider = {
+        "name": " ".join(name_parts),
+        "address": " ".join(contact_parts[0:-1]),
+        "phone": contact_parts[-1],
+        "url": " ".join(url_parts).strip(),
+        "price": float(Decimal(price_content) * 100),
+        "rate_type": _text_nodes(rate_type_td)[1].strip(),
+        "percent_renewable": " ".join(_text_nodes(renewable_td)).strip(),
+        "intro_price": " ".join(intro_price_parts).strip(),
+        "term_length": " ".join(_text_nodes(term_length_td)).strip(),
+        "early_term_fee": " ".join(_text_nodes(early_term_fee_td)).strip(),
+        "monthly_fee": " ".join(_text_nodes(monthly_fee_td)).strip(),
+        "promo_offer": " ".join(promo_offers_parts).strip(),
+    }
+
+    return _provider
+
+
+def iter_table_body(
+    scrapy_tbody_text: SelectorList,
+) -> Iterator[dict[str, Union[str, float]]]:
+    """Parse table body, yielding each provider as its row is parsed.
+
+    Each <tr> is parsed with parse_provider_row() directly on the lxml
+    tree, yielding the same providers as parse_table_body_xpath().
+    """
+    for tbody_select in scrapy_tbody_text:
+        for provider_tr in tbody_select.root.iter("tr"):
+            yield parse_provider_row(provider_tr)
+
+
+def parse_table_body(scrapy_tbody_text: SelectorList):
+    """Parse table body.
+
+    Providers are organized into an HTML table. Columns are extracted
+    separately, by the extract_table_header_names() function.
+
+    Creates a list of providers & returns to script that called this func.
+    Use iter_table_body() to get providers one at a time instead.
+    """
+    return list(iter_table_body(scrapy_tbody_text))
 
-    Extracts the HTML table from the page, and parses content out by passing
-    pieces of extracted HTML to different functions.
 
-    Returns a list of Provider dict objects.
+def select_providers_table(
+    scrapy_response: HtmlResponse,
+) -> tuple[SelectorList, SelectorList]:
+    """Select the providers table's column names <tr> & <tbody>.
+
+    Returns a tuple of (thead column names selector, tbody selector).
     """
     #########################
     # Pre-defined Selectors #
@@ -289,11 +393,6 @@ def parse_providers_table(
     #     output_file=thead_col_names_select_html_path,
     # )
 
-    table_headers_content = extract_table_header_names(
-        scrapy_thead_text=thead_col_names_select
-    )
-    # log.debug(f"Table Header Column Names: {table_headers}")
-
     #############################
     # Table Body <tbody> scrape #
     #############################
@@ -308,6 +407,43 @@ def parse_providers_table(
     #     scrapy_text=table_body, output_file=table_body_html_path
     # )
 
+    return thead_col_names_select, table_body_select
+
+
+def iter_providers_table(
+    scrapy_response: HtmlResponse,
+) -> Iterator[dict[str, Union[str, float]]]:
+    """Parse response, yielding each provider as its table row is parsed.
+
+    Accepts a Scrapy HtmlResponse object, the raw HTML from the scrape.
+    Only one provider dict is held at a time, so items can be passed to
+    pipelines while the rest of the table is still being parsed.
+    """
+    _, table_body_select = select_providers_table(scrapy_response)
+
+    yield from iter_table_body(scrapy_tbody_text=table_body_select)
+
+
+def parse_providers_table(
+    scrapy_response: HtmlResponse,
+) -> dict[str, Union[str, Decimal, float, None]]:
+    """Parse response into table content.
+
+    Accepts a Scrapy HtmlResponse object, the raw HTML from the scrape.
+
+    Extracts the HTML table from the page, and parses content out by passing
+    pieces of extracted HTML to different functions.
+
+    Returns a list of Provider dict objects. Use iter_providers_table() to
+    stream providers instead of building the full list.
+    """
+    thead_col_names_select, table_body_select = select_providers_table(scrapy_response)
+
+    table_headers_content = extract_table_header_names(
+        scrapy_thead_text=thead_col_names_select
+    )
+    # log.debug(f"Table Header Column Names: {table_headers}")
+
     table_body_content = parse_table_body(scrapy_tbody_text=table_body_select)
 
     return_obj = {
@@ -19,3 +19,15 @@ def get_hour(fmt: str = "HH") -> arrow.Arrow:
     hour = arrow.now().format(fmt=fmt)
 
     return hour
+
+
+def epoch_from_ts(ts: str = None) -> int:
+    """Convert a get_ts() timestamp to a unix epoch.
+
+    The default format puts the month where the minutes belong, so only the
+    date & hour are parsed. The epoch is accurate to the hour.
+    """
+    if not ts:
+        raise ValueError("Missing timestamp")
+
+    return arrow.get(ts[:13], "YYYY-MM-DD_HH", tzinfo="local").int_timestamp
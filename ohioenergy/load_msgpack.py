@@ -1,13 +1,19 @@
+"""Stream archived provider records from the .cache/providers/ msgpack archive."""
+import argparse
+import json
 from decimal import Decimal
 from pathlib import Path
-from typing import Union
+from typing import Any, Iterator, Union
 
 import msgpack
 from core.config import logging_settings
 from core.logging.logger import get_logger
+from lib.segment_log import iter_segment, mmap_file, segment_suffix
 
 log = get_logger(__name__, level=logging_settings.LOG_LEVEL)
 
+default_cache_dir = ".cache"
+
 
 def loop_dir(
     _path: Path = None, packs_list: list = None
@@ -28,7 +34,8 @@ def loop_dir(
     return packs_list
 
 
-def get_packs(cache_dir: str = ".cache") -> list[str]:
+def get_packs(cache_dir: str = default_cache_dir) -> list[str]:
+    """Return the paths of every file under cache_dir."""
     packs_list = []
 
     packs = loop_dir(_path=Path(cache_dir), packs_list=packs_list)
@@ -39,7 +46,7 @@ def get_packs(cache_dir: str = ".cache") -> list[str]:
 def load_msgpackb(file: Path = None):
     log.info(f"Loading file: {file}")
 
-    with open(file, "rb+") as f:
+    with open(file, "rb") as f:
         contents = f.read()
         f.close()
 
@@ -48,18 +55,94 @@ def load_msgpackb(file: Path = None):
     return contents_load
 
 
-if __name__ == "__main__":
-    packs = get_packs()
-    # log.debug(f"Packs: {packs}")
+def iter_pack_files(
+    cache_dir: str = default_cache_dir, date: str = None, hour: str = None
+) -> Iterator[Path]:
+    """Yield segment & pack files under <cache_dir>/providers/<date>/<hour>/.
+
+    date (YYYY-MM-DD) & hour (HH) limit which directories are walked.
+    Files are yielded in date, hour & name order.
+    """
+    providers_dir = Path(cache_dir) / "providers"
+    if not providers_dir.exists():
+        log.warning(f"Providers cache does not exist: {providers_dir}")
+        return
+
+    if date:
+        date_dirs = [providers_dir / date]
+    else:
+        date_dirs = sorted(d for d in providers_dir.iterdir() if d.is_dir())
+
+    for date_dir in date_dirs:
+        if not date_dir.is_dir():
+            continue
+
+        ## Older pack files were written directly to the date dir, without an hour dir
+        search_dir = date_dir / hour if hour else date_dir
+        if not search_dir.is_dir():
+            continue
+
+        for pack_file in sorted(search_dir.rglob("*")):
+            if pack_file.is_file() and pack_file.suffix in [segment_suffix, ".msgpack"]:
+                yield pack_file
+
+
+def iter_pack_records(pack_file: Path = None) -> Iterator[dict[str, Any]]:
+    """Yield records from a segment or pack file without reading it into memory.
+
+    Segment files are read with iter_segment(). Older .msgpack files are
+    memory-mapped & decoded with a msgpack.Unpacker. They hold a JSON
+    string, which is decoded to a dict.
+    """
+    if not pack_file:
+        raise ValueError("Missing pack_file")
+
+    if Path(pack_file).suffix == segment_suffix:
+        yield from iter_segment(pack_file)
+        return
 
-    loaded = []
+    with mmap_file(pack_file) as mm:
+        if mm is None:
+            return
+
+        for record in msgpack.Unpacker(file_like=mm, raw=False):
+            if isinstance(record, str):
+                record = json.loads(record)
+
+            yield record
+
+
+def iter_records(
+    cache_dir: str = default_cache_dir, date: str = None, hour: str = None
+) -> Iterator[dict[str, Any]]:
+    """Stream every record in the providers cache, optionally filtered by date/hour."""
+    for pack_file in iter_pack_files(cache_dir=cache_dir, date=date, hour=hour):
+        log.debug(f"Loading file: {pack_file}")
+
+        yield from iter_pack_records(pack_file)
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Stream records from the msgpack cache."
+    )
+    parser.add_argument("--cache-dir", default=default_cache_dir)
+    parser.add_argument("--date", help="Only load this date dir, i.e. 2023-05-01")
+    parser.add_argument("--hour", help="Only load this hour dir, i.e. 09")
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
 
-    for pack in packs:
-        _load = load_msgpackb(file=pack)
-        loaded.append(_load)
+    loaded_count = 0
 
-    for _load in loaded:
-        log.debug(f"Loaded pack type: {type(_load)}")
-        log.debug(f"Contents: {_load}")
+    for record in iter_records(
+        cache_dir=args.cache_dir, date=args.date, hour=args.hour
+    ):
+        log.debug(f"Contents: {record}")
+        loaded_count += 1
 
-    log.info(f"Loaded {len(loaded)} packs.")
+    log.info(f"Loaded {loaded_count} records.")
@@ -1,16 +1,36 @@
 """Spider controller.
 
-The main script imports spiders and runs them with CrawlerProcess.
+The main script imports spiders and runs them with CrawlerRunner.
+
+Run once, or as a daemon that re-runs the crawl every interval seconds on
+one reactor. The process & its database engine stay up between runs, each
+run gets a new Scrapy downloader & HTTP connections:
+
+    python main.py
+    python main.py --daemon --interval 3600 --jitter 300
+
+Replay captured pages (.html files, msgpack dumps or the SQLite HTTP cache)
+without the network, i.e. to measure the pipelines' throughput:
+
+    python main.py --replay fixtures/ --replay-multiply 50
+
+Replays write to a new temporary SQLite database, never DB_URI, unless
+--replay-db-uri is given.
 """
+import argparse
+import tempfile
+from pathlib import Path
+
 import stackprinter
 
 stackprinter.set_excepthook(style="darkbg2")
 
 import scrapy
 from core.config import logging_settings
-from core.database import Base, SessionLocal, engine, get_db
+from core.database import init_database, use_database
 from core.logging.logger import default_fmt, get_logger
-from models import provider_models
+from lib.crawl_scheduler import CrawlScheduler
+from ohioenergy.replay import load_fixtures, replay_settings, replay_summary
 from scrapy.crawler import CrawlerRunner
 from scrapy.utils.log import configure_logging
 from scrapy.utils.project import get_project_settings
@@ -22,19 +42,125 @@ log = get_logger(__name__, level=logging_settings.LOG_LEVEL)
 ## Import spiders
 from ohioenergy.spiders.ohioenergyproviders import OhioenergyprovidersSpider
 
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Run the Ohio energy crawlers.")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep running & re-run the crawl every --interval seconds",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=None,
+        help="Seconds between crawls in daemon mode (default: CRAWL_INTERVAL)",
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=None,
+        help=(
+            "Randomly start each crawl up to this many seconds early or late "
+            "(default: CRAWL_JITTER)"
+        ),
+    )
+
+    parser.add_argument(
+        "--replay",
+        metavar="DIR",
+        default=None,
+        help="Serve captured pages from DIR instead of crawling the site",
+    )
+    parser.add_argument(
+        "--replay-multiply",
+        type=int,
+        default=1,
+        help="Crawl each territory as this many copies when replaying (default: 1)",
+    )
+    parser.add_argument(
+        "--replay-db-uri",
+        metavar="URI",
+        default=None,
+        help=(
+            "Save replayed items to this database "
+            "(default: a new temporary SQLite database)"
+        ),
+    )
+
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
+
     log_settings = configure_logging({"LOG_FORMAT": default_fmt})
     settings = get_project_settings()
 
+    if args.replay:
+        ## Fail before crawling when there's nothing to replay
+        if not len(load_fixtures(args.replay)):
+            raise ValueError(f"No replay fixtures found in {args.replay}")
+
+        ## Replayed pages are fake data, keep them out of the configured
+        #  database & .cache/
+        replay_output_dir = tempfile.mkdtemp(prefix="ohioenergy-replay-")
+        replay_db_uri = (
+            args.replay_db_uri
+            or f"sqlite+pysqlite:///{Path(replay_output_dir) / 'replay.sqlite'}"
+        )
+        use_database(replay_db_uri)
+        log.info(f"Replaying into {replay_db_uri}, output in {replay_output_dir}")
+
+        settings.setdict(
+            replay_settings(
+                replay_dir=args.replay,
+                multiply=args.replay_multiply,
+                output_dir=replay_output_dir,
+            ),
+            priority="cmdline",
+        )
+
+    ## Create the database & any missing tables before crawling
+    init_database()
+
     ## Create runner for crawlers
     runner = CrawlerRunner(settings)
-    runner.crawl(OhioenergyprovidersSpider)
 
-    ## Join spiders
-    deferred = runner.join()
+    if args.daemon:
+        scheduler = CrawlScheduler(
+            runner=runner,
+            spider_cls=OhioenergyprovidersSpider,
+            interval=(
+                args.interval
+                if args.interval is not None
+                else settings.getfloat("CRAWL_INTERVAL", 3600)
+            ),
+            jitter=(
+                args.jitter
+                if args.jitter is not None
+                else settings.getfloat("CRAWL_JITTER", 0)
+            ),
+        )
+        scheduler.start()
+
+        ## Stop running crawls cleanly on Ctrl+C/SIGTERM
+        reactor.addSystemEventTrigger("before", "shutdown", scheduler.stop)
+    else:
+        crawler = runner.create_crawler(OhioenergyprovidersSpider)
+        crawled = runner.crawl(crawler)
+
+        if args.replay:
+            crawled.addCallback(
+                lambda _: log.info(replay_summary(crawler.stats.get_stats()))
+            )
+
+        ## Join spiders
+        deferred = runner.join()
 
-    ## Add runners and a twisted reactor.stop() to runner
-    deferred.addBoth(lambda _: reactor.stop())
+        ## Add runners and a twisted reactor.stop() to runner
+        deferred.addBoth(lambda _: reactor.stop())
 
     ## Run crawlers
     reactor.run()
@@ -0,0 +1,27 @@
+"""Checkpoints of archive files replayed by backfill.py."""
+from core.database import Base
+from sqlalchemy import BigInteger, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class BackfillCheckpoint(Base):
+    """A msgpack archive file that has been replayed into the database.
+
+    Written in the same transaction as the file's rows, so an interrupted
+    backfill resumes from the first file without a checkpoint.
+    """
+
+    __tablename__ = "backfill_checkpoints"
+
+    file_path: Mapped[str] = mapped_column(String(512), primary_key=True)
+    file_size: Mapped[int] = mapped_column(BigInteger)
+    records: Mapped[int]
+    completed_at: Mapped[int] = mapped_column(BigInteger)
+
+    def __repr__(self) -> str:
+        """Return a debug representation of the checkpoint."""
+        return (
+            f"BackfillCheckpoint(file_path={self.file_path!r}, "
+            f"file_size={self.file_size!r}, records={self.records!r}, "
+            f"completed_at={self.completed_at!r})"
+        )
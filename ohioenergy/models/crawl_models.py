@@ -0,0 +1,30 @@
+"""Finished crawl runs, polled by query clients."""
+from typing import Optional
+
+from core.database import Base
+from sqlalchemy import BigInteger, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class CrawlRun(Base):
+    """A finished crawl, written after its pipelines have flushed every item.
+
+    Query clients poll the latest id to know when cached results are stale.
+    """
+
+    __tablename__ = "crawl_runs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    spider: Mapped[str] = mapped_column(String(64))
+    started_at: Mapped[Optional[int]] = mapped_column(BigInteger)
+    finished_at: Mapped[int] = mapped_column(BigInteger, index=True)
+    reason: Mapped[Optional[str]] = mapped_column(String(64))
+    items_scraped: Mapped[int] = mapped_column(default=0)
+
+    def __repr__(self) -> str:
+        """Return a debug representation of the crawl run."""
+        return (
+            f"CrawlRun(id={self.id!r}, spider={self.spider!r}, "
+            f"started_at={self.started_at!r}, finished_at={self.finished_at!r}, "
+            f"reason={self.reason!r}, items_scraped={self.items_scraped!r})"
+        )
@@ -0,0 +1,56 @@
+"""Per-URL page hashes & HTTP validators, used to skip unchanged pages."""
+from typing import Optional
+
+from core.database import Base
+from sqlalchemy import BigInteger, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class PageHash(Base):
+    """Last seen body hash of a crawled page.
+
+    Used to skip parsing pages that have not changed since the last crawl.
+    """
+
+    __tablename__ = "page_hashes"
+
+    url: Mapped[str] = mapped_column(String(512), primary_key=True)
+    body_hash: Mapped[str] = mapped_column(String(64))
+    normalized_hash: Mapped[str] = mapped_column(String(64))
+    last_changed: Mapped[int] = mapped_column(BigInteger)
+    last_seen: Mapped[int] = mapped_column(BigInteger)
+    unchanged_count: Mapped[int] = mapped_column(default=0)
+
+    def __repr__(self) -> str:
+        """Return a debug representation of the page hash."""
+        return (
+            f"PageHash(url={self.url!r}, body_hash={self.body_hash!r}, "
+            f"normalized_hash={self.normalized_hash!r}, "
+            f"last_changed={self.last_changed!r}, last_seen={self.last_seen!r}, "
+            f"unchanged_count={self.unchanged_count!r})"
+        )
+
+
+class PageValidator(Base):
+    """HTTP cache validators a page was last served with.
+
+    Sent back as If-None-Match/If-Modified-Since, so unchanged pages are
+    answered with a 304 instead of the full page.
+    """
+
+    __tablename__ = "page_validators"
+
+    url: Mapped[str] = mapped_column(String(512), primary_key=True)
+    etag: Mapped[Optional[str]] = mapped_column(String(256))
+    last_modified: Mapped[Optional[str]] = mapped_column(String(64))
+    last_checked: Mapped[int] = mapped_column(BigInteger)
+    not_modified_count: Mapped[int] = mapped_column(default=0)
+
+    def __repr__(self) -> str:
+        """Return a debug representation of the page validator."""
+        return (
+            f"PageValidator(url={self.url!r}, etag={self.etag!r}, "
+            f"last_modified={self.last_modified!r}, "
+            f"last_checked={self.last_checked!r}, "
+            f"not_modified_count={self.not_modified_count!r})"
+        )
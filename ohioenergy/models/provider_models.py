@@ -1,7 +1,7 @@
 from typing import List, Optional
 
-from core.database import Base, engine, generate_uuid, generate_uuid_str
-from sqlalchemy import Float, ForeignKey, String
+from core.database import Base, generate_uuid, generate_uuid_str
+from sqlalchemy import BigInteger, Float, ForeignKey, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 
@@ -13,7 +13,10 @@ class OhioenergyProvider(Base):
         String(36), primary_key=True, default=generate_uuid_str
     )
     utility_type: Mapped[str] = mapped_column(index=True)
+    territory_id: Mapped[Optional[int]] = mapped_column(index=True)
+    rate_code: Mapped[Optional[int]]
     scrape_timestamp: Mapped[str] = mapped_column()
+    scrape_epoch: Mapped[Optional[int]] = mapped_column(BigInteger)
     name: Mapped[str] = mapped_column(index=True)
     address: Mapped[str]
     phone: Mapped[str]
@@ -29,8 +32,45 @@ class OhioenergyProvider(Base):
     promo_offer: Mapped[str]
 
     def __repr__(self) -> str:
-        return f"Provider(id={self.id!r}, utility_type={self.utility_type!r}, scrape_timestamp={self.scrape_timestamp!r}, name={self.name!r}, address={self.address!r}, phone={self.phone!r}, url={self.url!r}, price={self.price!r}, rate_type={self.rate_type!r}, percent_renewable={self.percent_renewable!r}, intro_price={self.intro_price!r}, term_length={self.term_length!r}, early_term_fee={self.early_term_fee!r}, monthly_fee={self.monthly_fee!r}, promo_offer={self.promo_offer!r})"
+        """Return a debug representation of the provider."""
+        return (
+            f"Provider(id={self.id!r}, utility_type={self.utility_type!r}, "
+            f"territory_id={self.territory_id!r}, rate_code={self.rate_code!r}, "
+            f"scrape_timestamp={self.scrape_timestamp!r}, "
+            f"scrape_epoch={self.scrape_epoch!r}, name={self.name!r}, "
+            f"address={self.address!r}, phone={self.phone!r}, url={self.url!r}, "
+            f"price={self.price!r}, rate_type={self.rate_type!r}, "
+            f"percent_renewable={self.percent_renewable!r}, "
+            f"intro_price={self.intro_price!r}, term_length={self.term_length!r}, "
+            f"early_term_fee={self.early_term_fee!r}, "
+            f"monthly_fee={self.monthly_fee!r}, promo_offer={self.promo_offer!r})"
+        )
 
 
-## Create table metadata
-Base.metadata.create_all(engine)
+class OfferFingerprint(Base):
+    """Fingerprint of an offer's normalized fields.
+
+    A new providers row is only inserted when an offer's fingerprint differs
+    from the latest version of the offer, found by offer_key. Unchanged
+    offers only bump last_seen & seen_count.
+    """
+
+    __tablename__ = "offer_fingerprints"
+
+    fingerprint: Mapped[str] = mapped_column(String(64), primary_key=True)
+    offer_key: Mapped[Optional[str]] = mapped_column(String(64), index=True)
+    provider_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("providers.id"), index=True
+    )
+    first_seen: Mapped[int] = mapped_column(BigInteger)
+    last_seen: Mapped[int] = mapped_column(BigInteger, index=True)
+    seen_count: Mapped[int] = mapped_column(default=1)
+
+    def __repr__(self) -> str:
+        """Return a debug representation of the fingerprint."""
+        return (
+            f"OfferFingerprint(fingerprint={self.fingerprint!r}, "
+            f"offer_key={self.offer_key!r}, provider_id={self.provider_id!r}, "
+            f"first_seen={self.first_seen!r}, last_seen={self.last_seen!r}, "
+            f"seen_count={self.seen_count!r})"
+        )
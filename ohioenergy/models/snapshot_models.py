@@ -0,0 +1,59 @@
+"""Typed offer snapshots, one row per offer per scrape."""
+from decimal import Decimal
+from typing import Optional
+
+from core.database import Base
+from sqlalchemy import BigInteger, Index, Integer, Numeric, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class OfferSnapshot(Base):
+    """Typed copy of an offer, one row per offer per scrape.
+
+    Numeric columns are stored as numbers instead of the strings on the
+    comparison page, so price history can be range-queried off indexes.
+    """
+
+    __tablename__ = "offer_snapshots"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    scrape_epoch: Mapped[int] = mapped_column(BigInteger, index=True)
+    utility_type: Mapped[str] = mapped_column(String(16))
+    territory_id: Mapped[Optional[int]]
+    rate_code: Mapped[Optional[int]]
+    name: Mapped[str]
+    url: Mapped[Optional[str]]
+    rate_type: Mapped[Optional[str]] = mapped_column(String(32))
+    price_cents: Mapped[Optional[Decimal]] = mapped_column(Numeric(10, 4))
+    term_months: Mapped[Optional[int]]
+    early_term_fee: Mapped[Optional[Decimal]] = mapped_column(Numeric(10, 2))
+    monthly_fee: Mapped[Optional[Decimal]] = mapped_column(Numeric(10, 2))
+    percent_renewable: Mapped[Optional[float]]
+    intro_price: Mapped[Optional[bool]]
+    promo_offer: Mapped[Optional[str]]
+
+    __table_args__ = (
+        ## Finds "cheapest <rate type> offer in territory X over the last N days",
+        #  the epoch range means matches are sorted on price_cents after
+        Index(
+            "ix_offer_snapshots_territory_rate_epoch_price",
+            "territory_id",
+            "rate_type",
+            "scrape_epoch",
+            "price_cents",
+        ),
+        Index("ix_offer_snapshots_name_epoch", "name", "scrape_epoch"),
+    )
+
+    def __repr__(self) -> str:
+        """Return a debug representation of the snapshot."""
+        return (
+            f"OfferSnapshot(id={self.id!r}, scrape_epoch={self.scrape_epoch!r}, "
+            f"utility_type={self.utility_type!r}, territory_id={self.territory_id!r}, "
+            f"rate_code={self.rate_code!r}, name={self.name!r}, "
+            f"rate_type={self.rate_type!r}, price_cents={self.price_cents!r}, "
+            f"term_months={self.term_months!r}, "
+            f"early_term_fee={self.early_term_fee!r}, "
+            f"monthly_fee={self.monthly_fee!r}, "
+            f"percent_renewable={self.percent_renewable!r})"
+        )
@@ -0,0 +1,354 @@
+# Define here your extensions
+#
+# See documentation in:
+# https://docs.scrapy.org/en/latest/topics/extensions.html
+"""Crawl extensions for database stats, crawl runs, latency & metrics."""
+
+import json
+import time
+from pathlib import Path
+
+from core.config import database_settings
+from core.database import get_engine, init_database
+from core.instrumentation import instrument_engine, latency_stats, query_stats
+from lib.db_utils import record_crawl_run
+from lib.metrics_utils import (
+    default_metrics_host,
+    default_metrics_port,
+    ensure_prometheus_client,
+    get_crawl_metrics,
+    start_metrics_server,
+)
+from lib.time_utils import get_ts
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import task
+
+default_latency_stats_dir = ".cache/stats"
+
+
+class OhioenergyDbStatsExtension:
+    """Time database statements during a crawl & log one summary at the end.
+
+    Enable with DB_STATS_ENABLED, or DB_INSTRUMENT=true in database.env.
+    Statements slower than DB_SLOW_QUERY_MS are logged as they happen.
+    The summary is also added to the crawl's stats under db/.
+    """
+
+    def __init__(self, stats=None, slow_query_ms: float = None):
+        """Add the summary to stats, logging statements slower than slow_query_ms."""
+        self.stats = stats
+        self.slow_query_ms = slow_query_ms
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """Build the extension, unless DB_STATS_ENABLED is off."""
+        if not crawler.settings.getbool(
+            "DB_STATS_ENABLED", database_settings.DB_INSTRUMENT
+        ):
+            raise NotConfigured
+
+        slow_query_ms = crawler.settings.getfloat(
+            "DB_SLOW_QUERY_MS", database_settings.DB_SLOW_QUERY_MS or 0
+        )
+
+        ext = cls(stats=crawler.stats, slow_query_ms=slow_query_ms or None)
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+
+        return ext
+
+    def spider_opened(self, spider):
+        """Instrument the engine & reset the query stats."""
+        instrument_engine(get_engine(), slow_query_ms=self.slow_query_ms)
+        query_stats.reset()
+
+    def spider_closed(self, spider, reason):
+        """Add the query stats summary to the crawl stats & log it."""
+        summary = query_stats.summary()
+
+        for key, value in summary.items():
+            if key == "rows_written":
+                for table, rows in value.items():
+                    self.stats.set_value(f"db/rows_written/{table}", rows)
+            else:
+                self.stats.set_value(f"db/{key}", value)
+
+        spider.logger.info(f"Database stats: {summary}")
+
+
+class OhioenergyCrawlRunExtension:
+    """Record each finished crawl in the crawl_runs table.
+
+    spider_closed is sent after every pipeline's close_spider(), so the row
+    is only written once the crawl's items are in the database. The query
+    API clears its cached results when it sees a new row.
+    """
+
+    def __init__(self, stats=None):
+        """Count items_scraped from the crawl's stats."""
+        self.stats = stats
+
+        self.started_at = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """Connect spider_opened & spider_closed, unless CRAWL_RUNS_ENABLED is off."""
+        if not crawler.settings.getbool("CRAWL_RUNS_ENABLED", True):
+            raise NotConfigured
+
+        ext = cls(stats=crawler.stats)
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+
+        return ext
+
+    def spider_opened(self, spider):
+        """Create missing tables & note when the crawl started."""
+        init_database()
+        self.started_at = int(time.time())
+
+    def spider_closed(self, spider, reason):
+        """Record the crawl run once its pipelines have closed."""
+        crawl_run_id = record_crawl_run(
+            spider=spider.name,
+            started_at=self.started_at,
+            reason=reason,
+            items_scraped=self.stats.get_value("item_scraped_count", 0),
+        )
+
+        spider.logger.info(f"Recorded crawl run #{crawl_run_id} ({reason})")
+
+
+class OhioenergyLatencyStatsExtension:
+    """Record per-stage latency histograms & dump them as JSON when the spider closes.
+
+    Stages are recorded on core.instrumentation's latency_stats:
+
+    - download: each response's download latency, also kept per URL
+    - parse/parse_providers_table: time spent parsing the providers table
+    - pipeline/<name>: each pipeline's process_item()
+    - flush/<name>: each buffered pipeline's batch write
+
+    Each stage's count, p50, p95 & max are added to the crawl's stats under
+    latency/. The histograms, per-URL downloads & crawl stats are written to
+    LATENCY_STATS_DIR/<spider>_<timestamp>.json, to compare between runs.
+    """
+
+    def __init__(self, stats=None, stats_dir: str = default_latency_stats_dir):
+        """Write reports under stats_dir, or only add stats when it's empty."""
+        self.stats = stats
+        self.stats_dir = stats_dir
+
+        self.downloads: list[dict] = []
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """Build the extension, unless LATENCY_STATS_ENABLED is off."""
+        if not crawler.settings.getbool("LATENCY_STATS_ENABLED", True):
+            raise NotConfigured
+
+        ext = cls(
+            stats=crawler.stats,
+            stats_dir=crawler.settings.get(
+                "LATENCY_STATS_DIR", default_latency_stats_dir
+            ),
+        )
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.response_received, signal=signals.response_received)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+
+        return ext
+
+    def spider_opened(self, spider):
+        """Reset the histograms & download list."""
+        latency_stats.reset()
+        self.downloads = []
+
+    def response_received(self, response, request, spider):
+        """Record a response's download latency & its page."""
+        download_latency = request.meta.get("download_latency")
+        if download_latency is None:
+            return
+
+        latency_stats.observe(stage="download", duration=download_latency)
+        self.downloads.append(
+            {
+                "url": response.url,
+                "status": response.status,
+                "latency_ms": round(download_latency * 1000, 3),
+                "utility_type": request.meta.get("utility_type"),
+                "territory_id": request.meta.get("territory_id"),
+                "rate_code": request.meta.get("rate_code"),
+            }
+        )
+
+    def spider_closed(self, spider, reason):
+        """Add each stage's latency to stats & write the JSON report."""
+        summary = latency_stats.summary()
+
+        for stage, histogram in summary.items():
+            for key in ["count", "p50_ms", "p95_ms", "max_ms"]:
+                self.stats.set_value(f"latency/{stage}/{key}", histogram[key])
+
+        if not self.stats_dir:
+            return
+
+        output_file = Path(self.stats_dir) / f"{spider.name}_{get_ts()}.json"
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+
+        report = {
+            "spider": spider.name,
+            "reason": reason,
+            "latency": summary,
+            ## Slowest pages first
+            "downloads": sorted(
+                self.downloads, key=lambda d: d["latency_ms"], reverse=True
+            ),
+            "stats": self.stats.get_stats(),
+        }
+
+        with open(output_file, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+
+        spider.logger.info(f"Latency stats written to {output_file}")
+
+
+class OhioenergyMetricsExtension:
+    """Expose crawl metrics for Prometheus at http://METRICS_HOST:METRICS_PORT/metrics.
+
+    Requires prometheus_client. The endpoint is served by the Twisted reactor
+    the crawl runs on & stays up between crawls run by the same process.
+
+    Counts items, responses & errors from Scrapy's signals, observes
+    download latency & every stage recorded on core.instrumentation's
+    latency_stats (parse, pipelines & batch writes), and samples the
+    scheduler's queue depth every METRICS_INTERVAL seconds.
+    """
+
+    def __init__(
+        self,
+        crawler=None,
+        host: str = default_metrics_host,
+        port: int = default_metrics_port,
+        interval: float = 5.0,
+    ):
+        """Serve metrics on host:port, sampling every interval seconds."""
+        self.crawler = crawler
+        self.host = host
+        self.port = port
+        self.interval = interval
+
+        self.metrics = None
+        self.spider_name = None
+        self.sample_loop: task.LoopingCall | None = None
+        self.download_exceptions = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """Build the extension when METRICS_ENABLED & prometheus_client is installed."""
+        if not crawler.settings.getbool("METRICS_ENABLED", False):
+            raise NotConfigured
+
+        try:
+            ensure_prometheus_client()
+        except ImportError as exc:
+            raise NotConfigured(str(exc))
+
+        ext = cls(
+            crawler=crawler,
+            host=crawler.settings.get("METRICS_HOST", default_metrics_host),
+            port=crawler.settings.getint("METRICS_PORT", default_metrics_port),
+            interval=crawler.settings.getfloat("METRICS_INTERVAL", 5.0),
+        )
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(ext.response_received, signal=signals.response_received)
+        crawler.signals.connect(ext.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(ext.item_dropped, signal=signals.item_dropped)
+        crawler.signals.connect(ext.item_error, signal=signals.item_error)
+        crawler.signals.connect(ext.spider_error, signal=signals.spider_error)
+
+        return ext
+
+    def spider_opened(self, spider):
+        """Start the metrics server, observing stages & sampling the queue."""
+        self.metrics = get_crawl_metrics()
+        self.spider_name = spider.name
+        self.download_exceptions = 0
+
+        start_metrics_server(port=self.port, host=self.host)
+        latency_stats.add_observer(self.observe_stage)
+
+        if self.interval > 0:
+            self.sample_loop = task.LoopingCall(self.sample)
+            self.sample_loop.start(self.interval, now=True)
+
+    def spider_closed(self, spider, reason):
+        """Stop sampling & record when the crawl finished."""
+        if self.sample_loop and self.sample_loop.running:
+            self.sample_loop.stop()
+
+        self.sample()
+        latency_stats.remove_observer(self.observe_stage)
+        self.metrics.crawl_finished.labels(spider=spider.name, reason=reason).set(
+            time.time()
+        )
+
+    def observe_stage(self, stage: str, duration: float):
+        """Observe a latency_stats stage on its metrics histogram."""
+        ## Download latency is observed on its own histogram in response_received
+        if stage == "download":
+            return
+
+        self.metrics.observe_stage(stage=stage, duration=duration)
+
+    def response_received(self, response, request, spider):
+        """Count a response by status & observe its download latency."""
+        self.metrics.responses.labels(spider=spider.name, status=response.status).inc()
+
+        download_latency = request.meta.get("download_latency")
+        if download_latency is not None:
+            self.metrics.download_latency.labels(spider=spider.name).observe(
+                download_latency
+            )
+
+    def item_scraped(self, item, response, spider):
+        """Count an item that passed every pipeline."""
+        self.metrics.items_scraped.labels(spider=spider.name).inc()
+
+    def item_dropped(self, item, response, exception, spider):
+        """Count an item dropped by a pipeline."""
+        self.metrics.items_dropped.labels(spider=spider.name).inc()
+
+    def item_error(self, item, response, spider, failure):
+        """Count an item error."""
+        self.metrics.errors.labels(spider=spider.name, kind="item").inc()
+
+    def spider_error(self, failure, response, spider):
+        """Count a spider callback error."""
+        self.metrics.errors.labels(spider=spider.name, kind="spider").inc()
+
+    def sample(self):
+        """Update queue gauges & count new download exceptions from the stats."""
+        engine = self.crawler.engine
+        if engine is not None:
+            ## The engine's slot was renamed to _slot in newer Scrapy versions
+            slot = getattr(engine, "_slot", None) or getattr(engine, "slot", None)
+            if slot is not None and slot.scheduler is not None:
+                self.metrics.queue_depth.labels(spider=self.spider_name).set(
+                    len(slot.scheduler)
+                )
+
+            self.metrics.active_requests.labels(spider=self.spider_name).set(
+                len(engine.downloader.active)
+            )
+
+        download_exceptions = self.crawler.stats.get_value(
+            "downloader/exception_count", 0
+        )
+        if download_exceptions > self.download_exceptions:
+            self.metrics.errors.labels(spider=self.spider_name, kind="download").inc(
+                download_exceptions - self.download_exceptions
+            )
+            self.download_exceptions = download_exceptions
@@ -0,0 +1,286 @@
+# HTTP cache storage backends
+#
+# See documentation in:
+# https://docs.scrapy.org/en/latest/topics/downloader-middleware.html#writing-your-own-storage-backend
+"""HTTP cache storage in SQLite, with deduplicated compressed bodies."""
+
+import hashlib
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+
+from core.config import logging_settings
+from core.logging.logger import get_logger
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
+from w3lib.http import headers_dict_to_raw, headers_raw_to_dict
+
+log = get_logger(__name__, level=logging_settings.LOG_LEVEL)
+
+## zstandard is optional, install with: pdm install -G compression. Bodies are
+#  compressed with zlib without it
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+default_cache_max_age = 7 * 24 * 60 * 60
+default_cache_max_bytes = 512 * 1024 * 1024
+
+cache_schema = """
+CREATE TABLE IF NOT EXISTS bodies (
+    digest TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS responses (
+    fingerprint TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers BLOB NOT NULL,
+    body_digest TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_responses_body_digest ON responses (body_digest);
+CREATE INDEX IF NOT EXISTS ix_responses_accessed_at ON responses (accessed_at);
+"""
+
+
+def decompress_body(
+    codec: str = None, data: bytes = None, decompressor=None
+) -> bytes | None:
+    """Decompress a stored body. Returns None when its codec isn't installed."""
+    if codec == "zstd":
+        if zstandard is None:
+            return None
+
+        return (decompressor or zstandard.ZstdDecompressor()).decompress(data)
+
+    return zlib.decompress(data)
+
+
+class SqliteCacheStorage:
+    """HTTP cache storage in one SQLite file per spider, with deduplicated bodies.
+
+    Response bodies are compressed (zstd, or zlib when zstandard is not
+    installed) & stored once per SHA-256 of the body, so identical pages
+    fetched from different URLs or at different times share one copy.
+
+    Entries older than HTTPCACHE_EXPIRATION_SECS are not served. When the
+    spider opens & closes, entries not read or written for
+    HTTPCACHE_SQLITE_MAX_AGE seconds are evicted, then the least recently
+    used entries are evicted until the stored bodies fit in
+    HTTPCACHE_SQLITE_MAX_BYTES. Set either to 0 to disable it.
+
+    Enable with:
+
+    HTTPCACHE_STORAGE = "ohioenergy.httpcache.SqliteCacheStorage"
+    """
+
+    def __init__(self, settings):
+        """Read cache location, expiry & size limits from settings."""
+        self.cache_dir = data_path(settings["HTTPCACHE_DIR"], createdir=True)
+        self.expiration_secs = settings.getint("HTTPCACHE_EXPIRATION_SECS")
+        self.max_age = settings.getint(
+            "HTTPCACHE_SQLITE_MAX_AGE", default_cache_max_age
+        )
+        self.max_bytes = settings.getint(
+            "HTTPCACHE_SQLITE_MAX_BYTES", default_cache_max_bytes
+        )
+        self.zstd_level = settings.getint("HTTPCACHE_ZSTD_LEVEL", 9)
+
+        self.db: sqlite3.Connection | None = None
+        self.fingerprinter = None
+
+        if zstandard is not None:
+            self.codec = "zstd"
+            self.compressor = zstandard.ZstdCompressor(level=self.zstd_level)
+            self.decompressor = zstandard.ZstdDecompressor()
+        else:
+            self.codec = "zlib"
+
+    def open_spider(self, spider):
+        """Open the spider's cache database & evict stale entries."""
+        db_path = Path(self.cache_dir, f"{spider.name}.sqlite")
+
+        ## Autocommit, transactions are started explicitly where needed
+        self.db = sqlite3.connect(str(db_path), isolation_level=None)
+        ## Lets evict() return freed pages to the filesystem, only takes
+        #  effect when the file is created
+        self.db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(cache_schema)
+
+        self.fingerprinter = spider.crawler.request_fingerprinter
+
+        log.debug(f"Using SQLite cache storage in {db_path} ({self.codec} bodies)")
+
+        self.evict()
+
+    def close_spider(self, spider):
+        """Evict stale entries & close the cache database."""
+        self.evict()
+        self.db.close()
+
+    def get_fingerprint(self, request) -> str:
+        """Return the hex fingerprint responses are cached under."""
+        return self.fingerprinter.fingerprint(request).hex()
+
+    def compress(self, body: bytes) -> bytes:
+        """Compress a body with the storage codec."""
+        if self.codec == "zstd":
+            return self.compressor.compress(body)
+
+        return zlib.compress(body, 6)
+
+    def decompress(self, codec: str, data: bytes) -> bytes | None:
+        """Decompress a body stored with codec, see decompress_body()."""
+        return decompress_body(
+            codec=codec, data=data, decompressor=getattr(self, "decompressor", None)
+        )
+
+    def retrieve_response(self, spider, request):
+        """Return response if present in cache, or None otherwise."""
+        fingerprint = self.get_fingerprint(request)
+
+        row = self.db.execute(
+            """
+            SELECT r.url, r.status, r.headers, r.stored_at, b.codec, b.data
+            FROM responses r JOIN bodies b ON b.digest = r.body_digest
+            WHERE r.fingerprint = ?
+            """,
+            (fingerprint,),
+        ).fetchone()
+        if row is None:
+            return None  # not cached
+
+        url, status, raw_headers, stored_at, codec, data = row
+        if 0 < self.expiration_secs < time.time() - stored_at:
+            return None  # expired
+
+        body = self.decompress(codec, data)
+        if body is None:
+            log.warning(f"Can't decompress cached {codec} body for {url}, skipping")
+            return None
+
+        self.db.execute(
+            "UPDATE responses SET accessed_at = ? WHERE fingerprint = ?",
+            (time.time(), fingerprint),
+        )
+
+        headers = Headers(headers_raw_to_dict(raw_headers))
+        respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+        request.meta["cache_timestamp"] = stored_at
+
+        return respcls(url=url, headers=headers, status=status, body=body)
+
+    def store_response(self, spider, request, response):
+        """Store the given response in the cache."""
+        fingerprint = self.get_fingerprint(request)
+        digest = hashlib.sha256(response.body).hexdigest()
+        now = time.time()
+
+        self.db.execute("BEGIN")
+        try:
+            ## Only compress bodies that aren't stored yet
+            exists = self.db.execute(
+                "SELECT 1 FROM bodies WHERE digest = ?", (digest,)
+            ).fetchone()
+            if not exists:
+                data = self.compress(response.body)
+                self.db.execute(
+                    "INSERT INTO bodies (digest, codec, size, stored_size, data)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (digest, self.codec, len(response.body), len(data), data),
+                )
+
+            self.db.execute(
+                """
+                INSERT OR REPLACE INTO responses
+                    (fingerprint, url, status, headers, body_digest,
+                     stored_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    fingerprint,
+                    response.url,
+                    response.status,
+                    headers_dict_to_raw(response.headers),
+                    digest,
+                    now,
+                    now,
+                ),
+            )
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+
+    def evict(self) -> None:
+        """Evict stale & least recently used entries, then unreferenced bodies."""
+        self.db.execute("BEGIN")
+        try:
+            evicted = 0
+            if self.max_age > 0:
+                evicted += self.db.execute(
+                    "DELETE FROM responses WHERE accessed_at < ?",
+                    (time.time() - self.max_age,),
+                ).rowcount
+
+            if self.max_bytes > 0:
+                evicted += self.evict_lru()
+
+            self.db.execute(
+                "DELETE FROM bodies"
+                " WHERE digest NOT IN (SELECT body_digest FROM responses)"
+            )
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+
+        if evicted:
+            self.db.execute("PRAGMA incremental_vacuum")
+            log.info(f"Evicted {evicted} cached response(s)")
+
+    def evict_lru(self) -> int:
+        """Evict least recently used responses until bodies fit in max_bytes."""
+        (stored_bytes,) = self.db.execute(
+            "SELECT COALESCE(SUM(stored_size), 0) FROM bodies"
+        ).fetchone()
+        if stored_bytes <= self.max_bytes:
+            return 0
+
+        ## Bytes freed by a response are only known once no other response
+        #  shares its body, so walk responses oldest first & count a body
+        #  when its last reference is evicted
+        refs = dict(
+            self.db.execute(
+                "SELECT body_digest, COUNT(*) FROM responses GROUP BY body_digest"
+            ).fetchall()
+        )
+        sizes = dict(self.db.execute("SELECT digest, stored_size FROM bodies"))
+
+        evict_fingerprints = []
+        for fingerprint, digest in self.db.execute(
+            "SELECT fingerprint, body_digest FROM responses ORDER BY accessed_at"
+        ).fetchall():
+            if stored_bytes <= self.max_bytes:
+                break
+
+            evict_fingerprints.append((fingerprint,))
+            refs[digest] -= 1
+            if refs[digest] == 0:
+                stored_bytes -= sizes.get(digest, 0)
+
+        self.db.executemany(
+            "DELETE FROM responses WHERE fingerprint = ?", evict_fingerprints
+        )
+
+        return len(evict_fingerprints)
@@ -10,7 +10,10 @@ class OhioenergyItem(scrapy.Item):
     # define the fields for your item here like:
     # table_id = scrapy.Field()
     utility_type = scrapy.Field()
+    territory_id = scrapy.Field()
+    rate_code = scrapy.Field()
     scrape_timestamp = scrapy.Field()
+    scrape_epoch = scrapy.Field()
     name = scrapy.Field()
     address = scrapy.Field()
     phone = scrapy.Field()
@@ -23,4 +26,6 @@ class OhioenergyItem(scrapy.Item):
     early_term_fee = scrapy.Field()
     monthly_fee = scrapy.Field()
     promo_offer = scrapy.Field()
+    ## Typed values from lib.normalize_utils.normalize_provider()
+    normalized = scrapy.Field()
     # pass
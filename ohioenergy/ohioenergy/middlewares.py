@@ -4,8 +4,23 @@
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
 # useful for handling different item types with a single interface
+from abc import ABC, abstractmethod
+
+from core.database import init_database
 from itemadapter import ItemAdapter, is_item
+from lib.db_utils import (
+    delete_page_validator,
+    get_page_hash,
+    get_page_validator,
+    record_page_hash,
+    record_page_validator,
+)
+from lib.hash_utils import page_hash
 from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.http.response.html import HtmlResponse
+
+from ohioenergy.signals import rows_dropped
 
 
 class OhioenergySpiderMiddleware:
@@ -55,37 +70,256 @@ class OhioenergySpiderMiddleware:
         spider.logger.info("Spider opened: %s" % spider.name)
 
 
-class OhioenergyDownloaderMiddleware:
-    # Not all methods need to be defined. If a method is not defined,
-    # scrapy acts as if the downloader middleware does not modify the
-    # passed objects.
+class OhioenergyPendingPageRecords(ABC):
+    """Base class for middlewares that store per-page records.
+
+    A page's record is stored once the page's items are saved. Records are
+    held in memory until spider_closed, which Scrapy sends after the item
+    pipelines' final flush. A page whose items fail (item_error,
+    spider_error) is never recorded, and nothing is recorded when a pipeline
+    closes with unwritten rows (rows_dropped). A crawl that crashes records
+    nothing, so the next crawl downloads & parses its pages again.
+    """
+
+    def __init__(self):
+        """Start a crawl with no pending, failed or dropped records."""
+        self.pending: dict[str, dict] = {}
+        self.failed_urls: set[str] = set()
+        self.dropped_rows = False
+
+    def connect_signals(self, crawler):
+        """Connect the signals that decide whether pending records are stored."""
+        crawler.signals.connect(self.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(self.item_error, signal=signals.item_error)
+        crawler.signals.connect(self.spider_error, signal=signals.spider_error)
+        crawler.signals.connect(self.rows_dropped, signal=rows_dropped)
+
+    @abstractmethod
+    def store_record(self, url: str, record: dict, spider):
+        """Store a page's record once its items are saved."""
+
+    def discard_record(self, url: str, spider):
+        """Undo a stored record for a page that failed. Does nothing by default."""
+        pass
+
+    def add_pending(self, url: str, **record):
+        """Hold a page's record until spider_closed, unless the page failed."""
+        if url not in self.failed_urls:
+            self.pending[url] = record
+
+    def page_failed(self, url: str, spider):
+        """Drop a failed page's pending record & any stored record."""
+        self.failed_urls.add(url)
+        self.pending.pop(url, None)
+        self.discard_record(url, spider)
+
+    def item_error(self, item, response, spider, failure):
+        """Handle item_error, failing the page the item came from."""
+        if response is not None:
+            self.page_failed(response.url, spider)
+
+    def spider_error(self, failure, response, spider):
+        """Handle spider_error, failing the page whose callback raised."""
+        self.page_failed(response.url, spider)
+
+    def rows_dropped(self, pipeline, rows):
+        """Handle rows_dropped, so no records are stored at spider_closed."""
+        self.dropped_rows = True
+
+    def spider_closed(self, spider):
+        """Store the pending records, unless a pipeline dropped rows."""
+        pending, self.pending = self.pending, {}
+
+        if self.dropped_rows:
+            spider.logger.warning(
+                f"{self.__class__.__name__} not storing {len(pending)} "
+                "page record(s), items were not saved"
+            )
+            return
+
+        for url, record in pending.items():
+            self.store_record(url, record, spider)
+
+
+class OhioenergyPageHashMiddleware(OhioenergyPendingPageRecords):
+    """Skip parsing pages that have not changed since the last crawl.
+
+    Hashes each response body & compares it with the hash stored in the
+    page_hashes table. When the page is byte-identical (or identical after
+    normalize_page_body() with PAGE_HASH_NORMALIZE), the spider callback is
+    never run, so nothing is parsed or sent to the pipelines. Only a
+    "seen unchanged" heartbeat is recorded.
+
+    The hash of a changed page is only stored once its items are saved, see
+    OhioenergyPendingPageRecords.
+    """
+
+    def __init__(self, stats=None, normalize: bool = True):
+        """Count skipped & changed pages in stats."""
+        super().__init__()
+
+        self.stats = stats
+        self.normalize = normalize
 
     @classmethod
     def from_crawler(cls, crawler):
-        # This method is used by Scrapy to create your spiders.
-        s = cls()
+        """Build the middleware, unless PAGE_HASH_ENABLED is off."""
+        if not crawler.settings.getbool("PAGE_HASH_ENABLED", True):
+            raise NotConfigured
+
+        mw = cls(
+            stats=crawler.stats,
+            normalize=crawler.settings.getbool("PAGE_HASH_NORMALIZE", True),
+        )
+        crawler.signals.connect(mw.spider_opened, signal=signals.spider_opened)
+        mw.connect_signals(crawler)
+
+        return mw
+
+    def spider_opened(self, spider):
+        """Create missing tables before the first page is checked."""
+        init_database()
+
+    def check_page(self, response, spider) -> dict | None:
+        """Return the page's hashes, or None when the page is unchanged.
+
+        When None is returned, the spider callback must be skipped.
+        """
+        if not isinstance(response, HtmlResponse) or response.status != 200:
+            return {}
+
+        body_hash = page_hash(response.body)
+        normalized_hash = (
+            page_hash(response.body, normalize=True) if self.normalize else body_hash
+        )
+
+        stored = get_page_hash(url=response.url)
+        if stored and (
+            stored.body_hash == body_hash
+            or (self.normalize and stored.normalized_hash == normalized_hash)
+        ):
+            record_page_hash(url=response.url, changed=False)
+            self.stats.inc_value("page_hash/unchanged")
+            spider.logger.info(f"Page unchanged, skipping parse: {response.url}")
+
+            return None
+
+        return {"body_hash": body_hash, "normalized_hash": normalized_hash}
+
+    def page_parsed(self, response, hashes: dict, spider):
+        """Hold a changed page's hashes until its items are saved."""
+        if not hashes:
+            return
+
+        ## Only store the new hash once the page has been fully parsed & its
+        #  items saved
+        self.add_pending(response.url, **hashes)
+        self.stats.inc_value("page_hash/changed")
+
+    def process_spider_output(self, response, result, spider):
+        """Skip the callback for unchanged pages, see check_page()."""
+        hashes = self.check_page(response, spider)
+        ## The callback's generator is never iterated, so it never runs
+        if hashes is None:
+            return
+
+        yield from result
+
+        self.page_parsed(response, hashes, spider)
+
+    async def process_spider_output_async(self, response, result, spider):
+        """Async version of process_spider_output(), for Scrapy 2.13+."""
+        hashes = self.check_page(response, spider)
+        if hashes is None:
+            return
+
+        async for r in result:
+            yield r
+
+        self.page_parsed(response, hashes, spider)
+
+    def store_record(self, url: str, record: dict, spider):
+        """Store a changed page's hashes."""
+        record_page_hash(url=url, changed=True, **record)
+
+
+class OhioenergyDownloaderMiddleware(OhioenergyPendingPageRecords):
+    """Send conditional GETs & skip pages the server reports as unchanged.
+
+    The ETag & Last-Modified headers of each 200 response are stored in the
+    page_validators table & sent back as If-None-Match & If-Modified-Since
+    the next time the URL is requested. When the server answers 304 Not
+    Modified, the request is dropped with IgnoreRequest, so nothing is
+    parsed or sent to the pipelines. Only a "checked, not modified"
+    heartbeat is recorded.
+
+    A page's validators are only stored once its items are saved, see
+    OhioenergyPendingPageRecords. When the page fails, its stored
+    validators are deleted so it is downloaded in full next time.
+
+    Disable with CONDITIONAL_GET_ENABLED = False, or per request with
+    meta={"dont_conditional_get": True}.
+    """
+
+    def __init__(self, stats=None):
+        """Count not modified & modified pages in stats."""
+        super().__init__()
+
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("CONDITIONAL_GET_ENABLED", True):
+            raise NotConfigured
+
+        s = cls(stats=crawler.stats)
         crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        s.connect_signals(crawler)
         return s
 
     def process_request(self, request, spider):
-        # Called for each request that goes through the downloader
-        # middleware.
+        if request.method != "GET" or request.meta.get("dont_conditional_get"):
+            return None
+
+        validator = get_page_validator(url=request.url)
+        if validator is None:
+            return None
+
+        if validator.etag:
+            request.headers.setdefault("If-None-Match", validator.etag)
+        if validator.last_modified:
+            request.headers.setdefault("If-Modified-Since", validator.last_modified)
 
-        # Must either:
-        # - return None: continue processing this request
-        # - or return a Response object
-        # - or return a Request object
-        # - or raise IgnoreRequest: process_exception() methods of
-        #   installed downloader middleware will be called
         return None
 
     def process_response(self, request, response, spider):
-        # Called with the response returned from the downloader.
+        if request.method != "GET" or request.meta.get("dont_conditional_get"):
+            return response
+
+        if response.status == 304:
+            record_page_validator(url=request.url, not_modified=True)
+            if get_page_hash(url=request.url):
+                record_page_hash(url=request.url, changed=False)
+
+            self.stats.inc_value("conditional_get/not_modified")
+            spider.logger.info(f"Page not modified, skipping parse: {request.url}")
+
+            raise IgnoreRequest(f"Not modified: {request.url}")
+
+        if response.status == 200:
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+
+            if etag or last_modified:
+                self.add_pending(
+                    request.url,
+                    etag=etag.decode("latin-1") if etag else None,
+                    last_modified=(
+                        last_modified.decode("latin-1") if last_modified else None
+                    ),
+                )
+                self.stats.inc_value("conditional_get/modified")
 
-        # Must either;
-        # - return a Response object
-        # - return a Request object
-        # - or raise IgnoreRequest
         return response
 
     def process_exception(self, request, exception, spider):
@@ -98,5 +332,15 @@ class OhioenergyDownloaderMiddleware:
         # - return a Request object: stops process_exception() chain
         pass
 
+    def store_record(self, url: str, record: dict, spider):
+        """Store a page's ETag & Last-Modified."""
+        record_page_validator(url=url, **record)
+
+    def discard_record(self, url: str, spider):
+        """Delete a failed page's validators."""
+        ## The page wasn't fully parsed or saved, download it in full next time
+        delete_page_validator(url=url)
+
     def spider_opened(self, spider):
+        init_database()
         spider.logger.info("Spider opened: %s" % spider.name)
@@ -5,37 +5,47 @@
 
 
 # useful for handling different item types with a single interface
-import json
+import time
+from abc import ABC, abstractmethod
 from decimal import Decimal
 from pathlib import Path
 from typing import Union
 
 import msgpack
 from core.config import logging_settings
-from core.database import SessionLocal, generate_uuid, generate_uuid_str
+from core.database import init_database
+from core.instrumentation import latency_stats
 from core.logging.logger import get_logger
 from itemadapter import ItemAdapter
+from lib.db_utils import (
+    bulk_insert_snapshots,
+    provider_row_from_item,
+    save_providers,
+    snapshot_row_from_item,
+)
+from lib.parquet_utils import SnapshotParquetWriter, default_snapshot_dir
+from lib.segment_log import SegmentLogWriter, default_segment_max_bytes
 from lib.time_utils import get_date, get_hour, get_ts
-from models import provider_models
 from scrapy.http.response.html import HtmlResponse
-from sqlalchemy.exc import IntegrityError
+from twisted.internet import task
 
 from ohioenergy.items import OhioenergyItem
+from ohioenergy.signals import rows_dropped
 
 log = get_logger(__name__, level=logging_settings.LOG_LEVEL)
 
 default_cache_dir = ".cache"
 
-if not Path(default_cache_dir).exists():
-    Path(default_cache_dir).mkdir(exist_ok=True, parents=True)
-
 
 def serialize(
     input: str | bytes = None,
     cache_dir: str = default_cache_dir,
     output_dir: str = None,
-    filename: str = f"{get_ts()}_illuminatingco_htmlbody_util.msgpack",
+    filename: str = None,
 ):
+    if not filename:
+        filename = f"{get_ts()}_illuminatingco_htmlbody_util.msgpack"
+
     if not Path(cache_dir).exists():
         Path(cache_dir).mkdir(parents=True, exist_ok=True)
 
@@ -59,23 +69,16 @@ def serialize(
 
 
 def serialize_providers(
-    providers: list[dict[str, Union[str, float, Decimal, int, bool, None]]] = None
+    providers: list[dict[str, Union[str, float, Decimal, int, bool, None]]] = None,
+    cache_dir: str = default_cache_dir,
 ) -> None:
-    ## Serialize providers
-    for provider in providers:
-        # log.debug(f"Provider type: {type(provider)}")
-
-        # for k in provider.keys():
-        #     log.debug(f"Provider item ({type(provider[k])}): {provider[k]}")
-
-        _serialize_prep = json.dumps(provider, indent=2).encode("utf-8")
-        # log.debug(f"Serialize string type: {type(_serialize_prep)}")
-
-        provider_serialize = serialize(
-            input=_serialize_prep,
-            output_dir=f"providers/{get_date()}",
-            filename=f"{get_ts()}_{provider['name']}.msgpack",
-        )
+    ## Serialize providers to one segment file, instead of one file per provider
+    with SegmentLogWriter(
+        log_dir=f"{cache_dir}/providers/{get_date()}/{get_hour()}",
+        prefix="providers",
+    ) as writer:
+        for provider in providers:
+            writer.append(provider)
 
 
 def prepare_res_obj(response: HtmlResponse = None) -> dict:
@@ -105,54 +108,262 @@ class OhioenergyPipeline:
 
 
 class OhioenergySerializePipeline:
-    def process_item(self, item: OhioenergyItem, spider):
-        item_dict = item.__dict__["_values"]
-        # log.debug(f"Item dict ({type(item_dict)}): {item_dict}")
-
-        providers_bytes = json.dumps(item_dict).encode("utf-8")
-        # log.debug(f"Provider bytes ({type(providers_bytes)}): {providers_bytes}")
+    """Append items to a rolling msgpack segment log.
+
+    Items are written as native msgpack maps to one segment file per run,
+    under SEGMENT_LOG_DIR/<date>/<hour>/. Segments rotate at
+    SEGMENT_LOG_MAX_BYTES & are fsynced according to SEGMENT_LOG_FSYNC.
+    """
+
+    def __init__(
+        self,
+        log_dir: str = f"{default_cache_dir}/providers",
+        max_segment_bytes: int = default_segment_max_bytes,
+        fsync_policy: str = "close",
+    ):
+        """Write segments under log_dir/<date>/<hour>/."""
+        self.log_dir = log_dir
+        self.max_segment_bytes = max_segment_bytes
+        self.fsync_policy = fsync_policy
+
+        self.writer: SegmentLogWriter | None = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """Build the pipeline with its segment log settings from the crawler."""
+        return cls(
+            log_dir=crawler.settings.get(
+                "SEGMENT_LOG_DIR", f"{default_cache_dir}/providers"
+            ),
+            max_segment_bytes=crawler.settings.getint(
+                "SEGMENT_LOG_MAX_BYTES", default_segment_max_bytes
+            ),
+            fsync_policy=crawler.settings.get("SEGMENT_LOG_FSYNC", "close"),
+        )
 
-        # log.info(f"Serializing results.")
-        serialize(
-            input=providers_bytes,
-            output_dir=f"providers/{get_date()}/{get_hour()}",
-            filename=f"{get_ts()}_{item['name']}.msgpack",
+    def open_spider(self, spider):
+        """Open a segment writer for this run's date & hour."""
+        self.writer = SegmentLogWriter(
+            log_dir=f"{self.log_dir}/{get_date()}/{get_hour()}",
+            prefix=spider.name,
+            max_segment_bytes=self.max_segment_bytes,
+            fsync_policy=self.fsync_policy,
         )
 
+    def close_spider(self, spider):
+        """Close the segment writer, flushing the last segment."""
+        if self.writer:
+            self.writer.close()
+            log.info(f"Serialized {self.writer.records_written} item(s) to segment log")
 
-class OhioenergySavePipeline:
-    """Save OhioenergyItem to database."""
+    def process_item(self, item: OhioenergyItem, spider):
+        """Append the item to the segment log."""
+        with latency_stats.timed(f"pipeline/{self.__class__.__name__}"):
+            self.writer.append(ItemAdapter(item).asdict())
+
+        return item
+
+
+class OhioenergyBufferedPipeline(ABC):
+    """Base class for pipelines that write items in batches.
+
+    Items are converted with row_from_item() & buffered in memory. The
+    buffer is passed to write_rows() when it reaches SAVE_PIPELINE_BATCH_SIZE,
+    when SAVE_PIPELINE_FLUSH_INTERVAL seconds have passed since the last
+    flush, and when the spider closes. Rows stay buffered when write_rows()
+    fails & are retried on the next flush. Rows still unwritten when the
+    spider closes are sent with the rows_dropped signal.
+    """
+
+    def __init__(
+        self, batch_size: int = 500, flush_interval: float = 5.0, crawler=None
+    ):
+        """Buffer up to batch_size rows, flushing every flush_interval seconds."""
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.crawler = crawler
+
+        self.buffer: list[dict] = []
+        self.last_flush = time.monotonic()
+        self.flush_loop: task.LoopingCall | None = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """Build the pipeline with its batch settings from the crawler."""
+        return cls(
+            batch_size=crawler.settings.getint("SAVE_PIPELINE_BATCH_SIZE", 500),
+            flush_interval=crawler.settings.getfloat(
+                "SAVE_PIPELINE_FLUSH_INTERVAL", 5.0
+            ),
+            crawler=crawler,
+        )
+
+    @abstractmethod
+    def row_from_item(self, item: OhioenergyItem) -> dict:
+        """Convert an item to the row write_rows() expects."""
+
+    @abstractmethod
+    def write_rows(self, rows: list[dict]) -> int:
+        """Write a batch of rows & return how many were written."""
+
+    def open_spider(self, spider):
+        """Empty the buffer & start the flush timer."""
+        self.buffer = []
+        self.last_flush = time.monotonic()
+
+        ## Flush on a timer too, so a slow crawl doesn't hold items in memory
+        if self.flush_interval > 0:
+            self.flush_loop = task.LoopingCall(self.flush_if_stale)
+            self.flush_loop.start(self.flush_interval, now=False)
+
+    def close_spider(self, spider):
+        """Stop the flush timer & write the rows left in the buffer."""
+        if self.flush_loop and self.flush_loop.running:
+            self.flush_loop.stop()
+
+        self.flush()
+
+        if self.buffer:
+            log.error(
+                f"{self.__class__.__name__} dropped {len(self.buffer)} unwritten row(s)"
+            )
+            if self.crawler:
+                self.crawler.signals.send_catch_log(
+                    signal=rows_dropped, pipeline=self, rows=self.buffer
+                )
 
     def process_item(self, item: OhioenergyItem, spider):
-        """Process item, save to database."""
+        """Process item, add to buffer & flush when the buffer is full."""
         if not item:
             raise ValueError("Missing item data")
 
-        # log.debug(f"Item ({type(item)}: {item})")
-        item_dict = item.__dict__["_values"]
-        # log.debug(f"Item dict: {item_dict}")
-        session = SessionLocal
-        # log.debug(f"Session ({type(session)}): {session}")
+        with latency_stats.timed(f"pipeline/{self.__class__.__name__}"):
+            self.buffer.append(self.row_from_item(item))
 
-        item_dict["id"] = generate_uuid_str()
+            if len(self.buffer) >= self.batch_size:
+                self.flush()
+            else:
+                self.flush_if_stale()
 
-        provider = provider_models.OhioenergyProvider(**item_dict)
-        log.debug(f"Provider: {provider}")
+        return item
 
-        for _item in provider.__dict__:
-            log.debug(f"Provider item ({type(_item)}): {_item}")
+    def flush_if_stale(self):
+        """Flush when flush_interval seconds have passed since the last flush."""
+        if self.flush_interval > 0 and (
+            time.monotonic() - self.last_flush >= self.flush_interval
+        ):
+            self.flush()
 
-        with session as sess:
-            try:
-                result = sess.add(provider)
-                log.debug(f"Provider add result: {result}")
-            except IntegrityError as integrity_exc:
-                raise IntegrityError(
-                    f"Integrity error adding provider to session. Exception details: {integrity_exc}"
-                )
-            except Exception as exc:
-                raise Exception(
-                    f"Unhandled exception adding provider to session. Exception defailt: {exc}"
-                )
+    def flush(self):
+        """Write buffered rows & empty the buffer.
+
+        A failed write is logged & the rows are put back, so the flush timer
+        keeps running & the next flush retries them.
+        """
+        self.last_flush = time.monotonic()
+
+        if not self.buffer:
+            return
+
+        rows = self.buffer
+        self.buffer = []
+
+        try:
+            with latency_stats.timed(f"flush/{self.__class__.__name__}"):
+                written = self.write_rows(rows)
+        except Exception as exc:
+            ## Items buffered during the write go after the failed batch
+            self.buffer = rows + self.buffer
+            log.error(
+                f"{self.__class__.__name__} failed to write {len(rows)} row(s), "
+                f"keeping them buffered: {exc}"
+            )
+
+            return
+
+        log.debug(f"{self.__class__.__name__} flushed {written} row(s)")
+
+
+class OhioenergySavePipeline(OhioenergyBufferedPipeline):
+    """Save OhioenergyItem to database.
+
+    Rows are saved to the providers table in batches. Offers that have not
+    changed since they were last stored only bump their last_seen timestamp.
+    """
+
+    def open_spider(self, spider):
+        """Create missing tables before the first flush."""
+        init_database()
+
+        super().open_spider(spider)
+
+    def row_from_item(self, item: OhioenergyItem) -> dict:
+        """Convert an item to a providers row."""
+        return provider_row_from_item(item)
+
+    def write_rows(self, rows: list[dict]) -> int:
+        """Save rows with save_providers(), skipping unchanged offers."""
+        inserted, unchanged = save_providers(rows=rows)
+        log.debug(f"Inserted {inserted} new/changed offer(s), {unchanged} unchanged")
+
+        return inserted + unchanged
+
+
+class OhioenergySnapshotPipeline(OhioenergyBufferedPipeline):
+    """Save a typed copy of OhioenergyItem to the offer_snapshots table."""
+
+    def open_spider(self, spider):
+        """Create missing tables before the first flush."""
+        init_database()
+
+        super().open_spider(spider)
+
+    def row_from_item(self, item: OhioenergyItem) -> dict:
+        """Convert an item to a typed offer_snapshots row."""
+        return snapshot_row_from_item(item)
+
+    def write_rows(self, rows: list[dict]) -> int:
+        """Insert snapshot rows."""
+        return bulk_insert_snapshots(rows=rows)
+
+
+class OhioenergyParquetPipeline(OhioenergyBufferedPipeline):
+    """Append typed snapshots to Parquet files partitioned by scrape date.
+
+    Requires pyarrow. Files are written under SNAPSHOT_PARQUET_DIR.
+    """
+
+    def __init__(self, snapshot_dir: str = default_snapshot_dir, **kwargs):
+        """Write Parquet files under snapshot_dir."""
+        super().__init__(**kwargs)
+
+        self.snapshot_dir = snapshot_dir
+        self.writer: SnapshotParquetWriter | None = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """Build the pipeline with its snapshot dir & batch settings."""
+        return cls(
+            snapshot_dir=crawler.settings.get(
+                "SNAPSHOT_PARQUET_DIR", default_snapshot_dir
+            ),
+            batch_size=crawler.settings.getint("SAVE_PIPELINE_BATCH_SIZE", 500),
+            flush_interval=crawler.settings.getfloat(
+                "SAVE_PIPELINE_FLUSH_INTERVAL", 5.0
+            ),
+            crawler=crawler,
+        )
+
+    def open_spider(self, spider):
+        """Open the Parquet writer before the flush timer starts."""
+        self.writer = SnapshotParquetWriter(root_dir=self.snapshot_dir)
+
+        super().open_spider(spider)
+
+    def row_from_item(self, item: OhioenergyItem) -> dict:
+        """Convert an item to a typed snapshot row."""
+        return snapshot_row_from_item(item)
 
-            session.commit()
+    def write_rows(self, rows: list[dict]) -> int:
+        """Append rows to a new Parquet file."""
+        return self.writer.write(rows=rows)
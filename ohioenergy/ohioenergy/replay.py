@@ -0,0 +1,394 @@
+# Offline replay of captured comparison pages
+#
+# See documentation in:
+# https://docs.scrapy.org/en/latest/topics/settings.html#download-handlers
+"""Replay captured comparison pages instead of downloading them."""
+
+import itertools
+import re
+import sqlite3
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator
+from urllib.parse import parse_qs, urlparse
+
+import msgpack
+from core.config import logging_settings
+from core.constants import comparison_page_path
+from core.logging.logger import get_logger
+from scrapy.exceptions import NotConfigured
+from scrapy.http import Headers, Response
+from scrapy.responsetypes import responsetypes
+from twisted.internet import defer
+from w3lib.http import headers_raw_to_dict
+
+from ohioenergy.httpcache import decompress_body
+
+log = get_logger(__name__, level=logging_settings.LOG_LEVEL)
+
+## Scrapy 2.14+ awaits download_request(request) & close(), older versions
+#  call download_request(request, spider) & expect Deferreds
+try:
+    from scrapy.core.downloader.handlers.base import BaseDownloadHandler
+except ImportError:
+    BaseDownloadHandler = None
+
+async_download_handlers = BaseDownloadHandler is not None
+
+## Copies of a territory made with REPLAY_MULTIPLY are numbered
+#  TerritoryId + copy * replay_territory_offset, i.e. territory 6's third copy
+#  is 2006, & replay the source territory's page
+replay_territory_offset = 1000
+default_replay_concurrency = 64
+
+html_suffixes = [".html", ".htm"]
+msgpack_suffixes = [".msgpack", ".mp"]
+sqlite_suffixes = [".sqlite", ".sqlite3", ".db"]
+
+## Saved pages named <Category>_<TerritoryId>_<RateCode>.html, i.e.
+#  Electric_6_1.html, replay for that page only. Pages without a known URL
+#  are replayed for any page missing a fixture
+fixture_name_pattern = re.compile(
+    r"^(?P<category>[A-Za-z]+)_(?P<territory_id>\d+)_(?P<rate_code>\d+)$"
+)
+
+PageKey = tuple[str, int, int]
+
+
+def page_key(url: str = None) -> PageKey | None:
+    """Return a comparison page URL's (Category, TerritoryId, RateCode).
+
+    Territory copies map back to their source territory. Returns None for
+    URLs that aren't a comparison page, i.e. robots.txt.
+    """
+    if not url:
+        raise ValueError("Missing url")
+
+    parsed = urlparse(url)
+    if not parsed.path.endswith(comparison_page_path):
+        return None
+
+    query = parse_qs(parsed.query)
+    try:
+        return (
+            query["Category"][0],
+            int(query["TerritoryId"][0]) % replay_territory_offset,
+            int(query["RateCode"][0]),
+        )
+    except (KeyError, IndexError, ValueError):
+        return None
+
+
+def replay_territory_ids(territory_id: int = None, copies: int = 1) -> list[int]:
+    """Return a territory's ID & the IDs of its copies, for REPLAY_MULTIPLY."""
+    if territory_id is None:
+        raise ValueError("Missing territory_id")
+
+    return [
+        int(territory_id) + copy * replay_territory_offset
+        for copy in range(max(copies, 1))
+    ]
+
+
+def html_page(body: bytes = None, encoding: str = None, url: str = None) -> dict:
+    """Build a captured page dict for an HTML body."""
+    content_type = f"text/html; charset={encoding}" if encoding else "text/html"
+
+    return {
+        "url": url,
+        "status": 200,
+        "headers": {"Content-Type": content_type},
+        "body": body,
+    }
+
+
+def iter_html_fixtures(path: Path = None) -> Iterator[tuple[PageKey | None, dict]]:
+    """Read a saved HTML page, keyed by its Category_TerritoryId_RateCode.html name."""
+    match = fixture_name_pattern.match(path.stem)
+    key = (
+        (
+            match.group("category"),
+            int(match.group("territory_id")),
+            int(match.group("rate_code")),
+        )
+        if match
+        else None
+    )
+
+    yield key, html_page(body=path.read_bytes())
+
+
+def iter_msgpack_fixtures(
+    path: Path = None,
+) -> Iterator[tuple[PageKey | None, dict]]:
+    """Read prepare_res_obj() dumps, or bare page bodies, from a msgpack file."""
+    with open(path, "rb") as f:
+        for obj in msgpack.Unpacker(f, raw=False):
+            if isinstance(obj, dict) and obj.get("body"):
+                encoding = obj.get("encoding") or "utf-8"
+                body = obj["body"]
+                if isinstance(body, str):
+                    body = body.encode(encoding)
+
+                url = obj.get("url")
+                yield page_key(url) if url else None, html_page(
+                    body=body, encoding=encoding, url=url
+                )
+            elif isinstance(obj, (str, bytes)) and obj:
+                yield None, html_page(
+                    body=obj.encode() if isinstance(obj, str) else obj
+                )
+
+
+def iter_sqlite_fixtures(path: Path = None) -> Iterator[tuple[PageKey | None, dict]]:
+    """Read cached 200 responses from a SqliteCacheStorage database."""
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = db.execute(
+            """
+            SELECT r.url, r.status, r.headers, b.codec, b.data
+            FROM responses r JOIN bodies b ON b.digest = r.body_digest
+            WHERE r.status = 200
+            """
+        ).fetchall()
+    except sqlite3.DatabaseError as exc:
+        log.warning(f"Skipping {path}, not an HTTP cache database: {exc}")
+        return
+    finally:
+        db.close()
+
+    for url, status, raw_headers, codec, data in rows:
+        body = decompress_body(codec=codec, data=data)
+        if body is None:
+            log.warning(f"Can't decompress cached {codec} body for {url}, skipping")
+            continue
+
+        yield page_key(url), {
+            "url": url,
+            "status": status,
+            "headers": headers_raw_to_dict(raw_headers),
+            "body": body,
+        }
+
+
+class ReplayFixtures:
+    """Captured pages keyed by (Category, TerritoryId, RateCode).
+
+    Pages without a fixture of their own are served the captured pages in
+    turn, so a handful of saved pages can drive a full crawl.
+    """
+
+    def __init__(self):
+        """Start with no captured pages."""
+        self.pages: dict[PageKey, dict] = {}
+        self.unkeyed: list[dict] = []
+        self._fallback = None
+
+    def __len__(self) -> int:
+        """Count captured pages, keyed or not."""
+        return len(self.pages) + len(self.unkeyed)
+
+    def add(self, key: PageKey | None = None, page: dict = None) -> None:
+        """Add a captured page, under key or to the pages served in turn."""
+        if key is None:
+            self.unkeyed.append(page)
+        else:
+            ## Newest capture of a page wins, files are read in name order
+            self.pages[key] = page
+
+        self._fallback = None
+
+    def get(self, key: PageKey = None) -> tuple[dict | None, bool]:
+        """Return the page to serve for key, & whether it's the page's own."""
+        page = self.pages.get(key)
+        if page is not None:
+            return page, True
+
+        if not len(self):
+            return None, False
+
+        if self._fallback is None:
+            self._fallback = itertools.cycle(list(self.pages.values()) + self.unkeyed)
+
+        return next(self._fallback), False
+
+    @classmethod
+    def from_dir(cls, fixtures_dir: str = None) -> "ReplayFixtures":
+        """Load .html, msgpack & HTTP cache .sqlite files under fixtures_dir."""
+        if not fixtures_dir:
+            raise ValueError("Missing fixtures_dir")
+        if not Path(fixtures_dir).is_dir():
+            raise FileNotFoundError(f"Replay directory not found: {fixtures_dir}")
+
+        fixtures = cls()
+        for path in sorted(Path(fixtures_dir).rglob("*")):
+            suffix = path.suffix.lower()
+            if suffix in html_suffixes:
+                pages = iter_html_fixtures(path)
+            elif suffix in msgpack_suffixes:
+                pages = iter_msgpack_fixtures(path)
+            elif suffix in sqlite_suffixes:
+                pages = iter_sqlite_fixtures(path)
+            else:
+                continue
+
+            for key, page in pages:
+                fixtures.add(key=key, page=page)
+
+        log.info(
+            f"Loaded {len(fixtures)} replay fixture(s) from {fixtures_dir}, "
+            f"{len(fixtures.pages)} for a known page"
+        )
+
+        return fixtures
+
+
+@lru_cache(maxsize=4)
+def load_fixtures(fixtures_dir: str = None) -> ReplayFixtures:
+    """Load fixtures once per directory, daemon mode re-runs reuse them."""
+    return ReplayFixtures.from_dir(fixtures_dir)
+
+
+def replay_settings(
+    replay_dir: str = None,
+    multiply: int = 1,
+    concurrency: int = default_replay_concurrency,
+    output_dir: str = None,
+) -> dict:
+    """Build settings that replay captured pages at full speed, without the network.
+
+    Throttling, robots.txt, the HTTP cache, conditional requests & the page
+    hash skip are turned off, so every replayed page is parsed & sent through
+    the pipelines. Replays aren't recorded as crawl runs. With output_dir,
+    segment logs, Parquet snapshots & latency reports are written under it
+    instead of .cache/.
+
+    Replayed items are saved to the database core.database is using, see
+    use_database().
+    """
+    if not replay_dir:
+        raise ValueError("Missing replay_dir")
+
+    handler = "ohioenergy.replay.ReplayDownloadHandler"
+
+    output_settings = {}
+    if output_dir:
+        output_settings = {
+            "SEGMENT_LOG_DIR": str(Path(output_dir) / "providers"),
+            "SNAPSHOT_PARQUET_DIR": str(Path(output_dir) / "snapshots"),
+            "LATENCY_STATS_DIR": str(Path(output_dir) / "stats"),
+        }
+
+    return {
+        "REPLAY_DIR": replay_dir,
+        "REPLAY_MULTIPLY": multiply,
+        "DOWNLOAD_HANDLERS": {"http": handler, "https": handler},
+        "CONCURRENT_REQUESTS": concurrency,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": concurrency,
+        "DOWNLOAD_DELAY": 0,
+        "AUTOTHROTTLE_ENABLED": False,
+        "ROBOTSTXT_OBEY": False,
+        "HTTPCACHE_ENABLED": False,
+        "CONDITIONAL_GET_ENABLED": False,
+        "PAGE_HASH_ENABLED": False,
+        "CRAWL_RUNS_ENABLED": False,
+        **output_settings,
+    }
+
+
+def replay_summary(stats: dict = None) -> str:
+    """Summarize a crawl's replayed pages & item throughput in one line."""
+    if stats is None:
+        raise ValueError("Missing stats")
+
+    pages = stats.get("replay/pages", 0)
+    items = stats.get("item_scraped_count", 0)
+    elapsed = stats.get("elapsed_time_seconds") or 0
+
+    rate = f"{items / elapsed:.0f} items/s" if elapsed else "n/a items/s"
+
+    return f"Replayed {pages} page(s) into {items} item(s) in {elapsed:.2f}s ({rate})"
+
+
+class ReplayDownloadHandler:
+    """Serve requests from captured pages instead of the network.
+
+    Fixtures are loaded from REPLAY_DIR, see ReplayFixtures.from_dir().
+    Comparison pages without a fixture get another captured page, other URLs
+    get a 404. Responses are returned immediately, so a crawl runs as fast as
+    parsing & the pipelines allow.
+
+    Enable with main.py --replay, or the settings from replay_settings().
+    """
+
+    lazy = False
+
+    def __init__(self, fixtures: ReplayFixtures = None, stats=None):
+        """Serve responses from fixtures, counting them in stats."""
+        self.fixtures = fixtures
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """Load fixtures from REPLAY_DIR. Raise NotConfigured if there are none."""
+        replay_dir = crawler.settings.get("REPLAY_DIR")
+        if not replay_dir:
+            raise NotConfigured("REPLAY_DIR is not set")
+
+        fixtures = load_fixtures(replay_dir)
+        if not len(fixtures):
+            raise NotConfigured(f"No replay fixtures found in {replay_dir}")
+
+        return cls(fixtures=fixtures, stats=crawler.stats)
+
+    def replay(self, request) -> Response:
+        """Build the response for a request from its captured page."""
+        start = time.monotonic()
+
+        key = page_key(request.url)
+        page, exact = self.fixtures.get(key) if key else (None, False)
+
+        if page is None:
+            self.stats.inc_value("replay/missing")
+
+            return Response(url=request.url, status=404)
+
+        self.stats.inc_value("replay/pages")
+        if not exact:
+            self.stats.inc_value("replay/substituted")
+
+        headers = Headers(page["headers"])
+        respcls = responsetypes.from_args(
+            headers=headers, url=request.url, body=page["body"]
+        )
+        response = respcls(
+            url=request.url,
+            status=page["status"],
+            headers=headers,
+            body=page["body"],
+        )
+        ## Set by Scrapy's HTTP handlers, read by AutoThrottle & the metrics
+        request.meta["download_latency"] = time.monotonic() - start
+
+        return response
+
+    if async_download_handlers:
+
+        async def download_request(self, request):
+            """Return the captured response for request."""
+            return self.replay(request)
+
+        async def close(self):
+            """Nothing to close, fixtures are only held in memory."""
+            pass
+
+    else:
+
+        def download_request(self, request, spider=None):
+            """Return a Deferred firing with the captured response for request."""
+            return defer.succeed(self.replay(request))
+
+        def close(self):
+            """Nothing to close, fixtures are only held in memory."""
+            return defer.succeed(None)
@@ -20,14 +20,15 @@ NEWSPIDER_MODULE = "ohioenergy.spiders"
 ROBOTSTXT_OBEY = True
 
 # Configure maximum concurrent requests performed by Scrapy (default: 16)
-# CONCURRENT_REQUESTS = 32
+CONCURRENT_REQUESTS = 16
 
 # Configure a delay for requests for the same website (default: 0)
 # See https://docs.scrapy.org/en/latest/topics/settings.html#download-delay
 # See also autothrottle settings and docs
 # DOWNLOAD_DELAY = 3
 # The download delay setting will honor only one of:
-# CONCURRENT_REQUESTS_PER_DOMAIN = 16
+## Every territory/rate code page is on energychoice.ohio.gov, this caps the fan-out
+CONCURRENT_REQUESTS_PER_DOMAIN = 8
 # CONCURRENT_REQUESTS_PER_IP = 16
 
 # Disable cookies (enabled by default)
@@ -44,21 +45,72 @@ ROBOTSTXT_OBEY = True
 
 # Enable or disable spider middlewares
 # See https://docs.scrapy.org/en/latest/topics/spider-middleware.html
-# SPIDER_MIDDLEWARES = {
-#    "ohioenergy.middlewares.OhioenergySpiderMiddleware": 543,
-# }
+SPIDER_MIDDLEWARES = {
+    # "ohioenergy.middlewares.OhioenergySpiderMiddleware": 543,
+    "ohioenergy.middlewares.OhioenergyPageHashMiddleware": 550,
+}
+
+## Skip parsing pages whose body hash matches the last crawl. With
+#  PAGE_HASH_NORMALIZE, ASP.NET __VIEWSTATE/__EVENTVALIDATION values &
+#  whitespace are ignored when comparing.
+PAGE_HASH_ENABLED = True
+PAGE_HASH_NORMALIZE = True
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-# DOWNLOADER_MIDDLEWARES = {
-#    "ohioenergy.middlewares.OhioenergyDownloaderMiddleware": 543,
-# }
+DOWNLOADER_MIDDLEWARES = {
+    "ohioenergy.middlewares.OhioenergyDownloaderMiddleware": 543,
+}
+
+## Send If-None-Match/If-Modified-Since with the validators a page was last
+#  served with. Pages answered with 304 Not Modified are not parsed.
+CONDITIONAL_GET_ENABLED = True
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
-# EXTENSIONS = {
-#    "scrapy.extensions.telnet.TelnetConsole": None,
-# }
+EXTENSIONS = {
+    # "scrapy.extensions.telnet.TelnetConsole": None,
+    "ohioenergy.extensions.OhioenergyDbStatsExtension": 500,
+    "ohioenergy.extensions.OhioenergyLatencyStatsExtension": 510,
+    "ohioenergy.extensions.OhioenergyMetricsExtension": 520,
+    "ohioenergy.extensions.OhioenergyCrawlRunExtension": 530,
+}
+
+## Time database statements & log a summary when the spider closes. Defaults
+#  to DB_INSTRUMENT in core/env_files/database.env. Statements slower than
+#  DB_SLOW_QUERY_MS milliseconds are logged as they happen.
+# DB_STATS_ENABLED = True
+# DB_SLOW_QUERY_MS = 250
+
+## Record each finished crawl in the crawl_runs table. The query API clears
+#  its cached results when a new crawl run is recorded.
+CRAWL_RUNS_ENABLED = True
+
+## Latency histograms for downloads, parsing, pipelines & batch writes. Written
+#  to LATENCY_STATS_DIR as JSON when the spider closes, set it to "" to only
+#  add them to the crawl's stats.
+LATENCY_STATS_ENABLED = True
+LATENCY_STATS_DIR = ".cache/stats"
+
+## Prometheus metrics endpoint at http://METRICS_HOST:METRICS_PORT/metrics,
+#  requires prometheus_client (pdm install -G metrics). Queue depth is
+#  sampled every METRICS_INTERVAL seconds.
+METRICS_ENABLED = False
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9410
+METRICS_INTERVAL = 5.0
+
+## Seconds between crawls when running main.py --daemon. Each crawl starts up
+#  to CRAWL_JITTER seconds early or late, so scheduled crawls don't hit the
+#  site at the same time every hour.
+CRAWL_INTERVAL = 3600
+CRAWL_JITTER = 300
+
+## Replay captured pages from REPLAY_DIR instead of crawling the site, see
+#  main.py --replay & ohioenergy/replay.py. REPLAY_MULTIPLY crawls each
+#  territory as that many copies, to load test the pipelines.
+REPLAY_DIR = None
+REPLAY_MULTIPLY = 1
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
@@ -66,18 +118,37 @@ ITEM_PIPELINES = {
     # "ohioenergy.pipelines.OhioenergyPipeline": 300,
     # "ohioenergy.pipelines.OhioenergySerializePipeline": 100,
     "ohioenergy.pipelines.OhioenergySavePipeline": 200,
+    "ohioenergy.pipelines.OhioenergySnapshotPipeline": 210,
+    ## Requires pyarrow (pdm install -G analytics)
+    # "ohioenergy.pipelines.OhioenergyParquetPipeline": 220,
 }
 
+## Database/Parquet pipelines buffer items & bulk insert them when the buffer
+#  reaches SAVE_PIPELINE_BATCH_SIZE items, or every SAVE_PIPELINE_FLUSH_INTERVAL
+#  seconds. Set the interval to 0 to only flush on batch size & spider close.
+SAVE_PIPELINE_BATCH_SIZE = 500
+SAVE_PIPELINE_FLUSH_INTERVAL = 5.0
+
+## OhioenergySerializePipeline appends items to one msgpack segment file per run,
+#  under SEGMENT_LOG_DIR/<date>/<hour>/. Segments rotate at SEGMENT_LOG_MAX_BYTES.
+#  SEGMENT_LOG_FSYNC is one of: never, close (on rotate/close), always (every item)
+SEGMENT_LOG_DIR = ".cache/providers"
+SEGMENT_LOG_MAX_BYTES = 64 * 1024 * 1024
+SEGMENT_LOG_FSYNC = "close"
+
+## Root directory for OhioenergyParquetPipeline's scrape_date=YYYY-MM-DD/ partitions
+SNAPSHOT_PARQUET_DIR = ".cache/snapshots"
+
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
-# AUTOTHROTTLE_ENABLED = True
+AUTOTHROTTLE_ENABLED = True
 # The initial download delay
-# AUTOTHROTTLE_START_DELAY = 5
+AUTOTHROTTLE_START_DELAY = 1
 # The maximum download delay to be set in case of high latencies
-# AUTOTHROTTLE_MAX_DELAY = 60
+AUTOTHROTTLE_MAX_DELAY = 30
 # The average number of requests Scrapy should be sending in parallel to
 # each remote server
-# AUTOTHROTTLE_TARGET_CONCURRENCY = 1.0
+AUTOTHROTTLE_TARGET_CONCURRENCY = 4.0
 # Enable showing throttling stats for every response received:
 # AUTOTHROTTLE_DEBUG = False
 
@@ -98,9 +169,7 @@ FEED_EXPORT_ENCODING = "utf-8"
 DEFAULT_REQUEST_HEADERS = {
     "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3",
     "accept-language": "en-US,en;q=0.9",
-    "cache-control": "no-cache",
     "cookie": "MUID=; SRCHD=AF=NOFORM; SRCHUID=1; SRCHUSR=; _EDGE_S=SID=; MUIDB=; _SS=SID=; ipv6=; SRCHHPGUSR=;",
-    "pragma": "no-cache",
     "upgrade-insecure-requests": "1",
     "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/73.0.3683.103 Safari/537.36",
 }
@@ -108,5 +177,14 @@ DEFAULT_REQUEST_HEADERS = {
 HTTPCACHE_ENABLED = True
 HTTPCACHE_EXPIRATION_SECS = 900
 HTTPCACHE_DIR = "httpcache"
-HTTPCACHE_IGNORE_HTTP_CODES = [400, 500]
-HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
+## 304s are only meaningful for the conditional request that got them
+HTTPCACHE_IGNORE_HTTP_CODES = [304, 400, 500]
+## Responses are kept in one SQLite file per spider, with compressed bodies
+#  stored once per unique page. Entries unused for HTTPCACHE_SQLITE_MAX_AGE
+#  seconds are evicted, then the least recently used until the bodies fit in
+#  HTTPCACHE_SQLITE_MAX_BYTES. Bodies are zstd compressed when zstandard is
+#  installed (pdm install -G compression), zlib otherwise.
+HTTPCACHE_STORAGE = "ohioenergy.httpcache.SqliteCacheStorage"
+HTTPCACHE_SQLITE_MAX_AGE = 7 * 24 * 60 * 60
+HTTPCACHE_SQLITE_MAX_BYTES = 512 * 1024 * 1024
+HTTPCACHE_ZSTD_LEVEL = 9
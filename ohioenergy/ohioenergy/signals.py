@@ -0,0 +1,8 @@
+"""Custom signals sent by the ohioenergy crawler components.
+
+Connect handlers with crawler.signals.connect(handler, signal=rows_dropped).
+"""
+
+## Sent by OhioenergyBufferedPipeline when it closes with rows it could not
+#  write. Args: pipeline, rows
+rows_dropped = object()
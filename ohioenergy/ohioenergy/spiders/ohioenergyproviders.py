@@ -1,17 +1,28 @@
 import json
+import time
 from decimal import Decimal
 from pathlib import Path
 from typing import Union
+from urllib.parse import urlencode
 
 import msgpack
 import scrapy
 from core.config import logging_settings
+from core.constants import (
+    category_territory_ids,
+    comparison_page_url,
+    default_rate_codes,
+    utility_categories,
+)
+from core.instrumentation import latency_stats
 from core.logging.logger import get_logger
 from lib.file_utils import ensure_dir, write_scrapy_text_to_file
 from lib.msgpack_utils import serialize
+from lib.normalize_utils import NormalizeReport, normalize_provider
 from lib.text_utils import (
     clean_word_list,
     extract_table_header_names,
+    iter_providers_table,
     parse_providers_table,
     parse_table_body,
 )
@@ -19,6 +30,7 @@ from lib.time_utils import get_date, get_ts
 from scrapy.http.response.html import HtmlResponse
 
 from ohioenergy.items import OhioenergyItem
+from ohioenergy.replay import replay_territory_ids
 
 log = get_logger(__name__, level=logging_settings.LOG_LEVEL)
 
@@ -44,26 +56,162 @@ def prepare_res_obj(response: HtmlResponse = None) -> dict:
     return return_obj
 
 
+def split_arg(arg: str | list | None = None) -> list[str] | None:
+    """Split a comma-separated spider argument into a list.
+
+    Spider arguments passed with -a are always strings, i.e. -a territory_ids=1,6.
+    """
+    if arg is None:
+        return None
+
+    if isinstance(arg, str):
+        return [a.strip() for a in arg.split(",") if a.strip()]
+
+    return [str(a) for a in arg]
+
+
+def build_comparison_url(
+    category: str = None, territory_id: int = None, rate_code: int = None
+) -> str:
+    """Build an Apples to Apples comparison page URL."""
+    if not category:
+        raise ValueError("Missing category")
+    if territory_id is None:
+        raise ValueError("Missing territory_id")
+    if rate_code is None:
+        raise ValueError("Missing rate_code")
+
+    query = urlencode(
+        {"Category": category, "TerritoryId": territory_id, "RateCode": rate_code}
+    )
+
+    return f"{comparison_page_url}?{query}"
+
+
 class OhioenergyprovidersSpider(scrapy.Spider):
+    """Crawl every territory/rate code comparison page for each utility category.
+
+    Requests are built in start_requests() & scheduled concurrently. Limit the
+    crawl with spider arguments, i.e.:
+
+    scrapy crawl ohioenergyproviders -a categories=Electric -a territory_ids=6
+    """
+
     name = "ohioenergyproviders"
     allowed_domains = ["energychoice.ohio.gov"]
-    start_urls = [
-        "https://energychoice.ohio.gov/ApplesToApplesComparision.aspx?Category=Electric&TerritoryId=6&RateCode=1",
-    ]
+
+    def __init__(
+        self,
+        categories: str | list = None,
+        territory_ids: str | list = None,
+        rate_codes: str | list = None,
+        *args,
+        **kwargs,
+    ):
+        """Split comma separated spider arguments & check the categories."""
+        super().__init__(*args, **kwargs)
+
+        self.categories = split_arg(categories) or list(utility_categories.keys())
+        self.territory_ids = split_arg(territory_ids)
+        self.rate_codes = split_arg(rate_codes) or [str(r) for r in default_rate_codes]
+
+        for category in self.categories:
+            if category not in utility_categories:
+                raise ValueError(
+                    f"Invalid category: {category}. "
+                    f"Must be one of {list(utility_categories.keys())}"
+                )
+
+        ## Counts values normalize_provider() couldn't parse, per field
+        self.normalize_report = NormalizeReport()
+
+    async def start(self):
+        """Yield the start requests."""
+        ## Scrapy 2.13+ only calls start() & older versions only call
+        #  start_requests(), both schedule the same fan-out
+        for request in self.start_requests():
+            yield request
+
+    def start_requests(self):
+        """Yield a request for each category, territory & rate code."""
+        ## When replaying captured pages, each territory can be crawled as
+        #  several copies to simulate more territories
+        copies = (
+            self.settings.getint("REPLAY_MULTIPLY", 1)
+            if self.settings.get("REPLAY_DIR")
+            else 1
+        )
+
+        for category in self.categories:
+            for territory_id in category_territory_ids[category]:
+                ## Skip territories not requested with -a territory_ids=...
+                if self.territory_ids and str(territory_id) not in self.territory_ids:
+                    continue
+
+                for copy_id in replay_territory_ids(territory_id, copies=copies):
+                    for rate_code in self.rate_codes:
+                        url = build_comparison_url(
+                            category=category,
+                            territory_id=copy_id,
+                            rate_code=rate_code,
+                        )
+
+                        yield scrapy.Request(
+                            url,
+                            callback=self.parse,
+                            meta={
+                                "category": category,
+                                "utility_type": utility_categories[category],
+                                "territory_id": copy_id,
+                                "rate_code": int(rate_code),
+                            },
+                        )
 
     def parse(self, response: HtmlResponse):
-        log.info(f"Begin parsing")
+        utility_type = response.meta["utility_type"]
+        territory_id = response.meta["territory_id"]
+        rate_code = response.meta["rate_code"]
 
-        scrape_ts = get_ts()
+        log.info(
+            f"Begin parsing {utility_type} territory {territory_id}, "
+            f"rate code {rate_code}"
+        )
 
-        parsed_table = parse_providers_table(scrapy_response=response)
+        scrape_ts = get_ts()
+        scrape_epoch = int(time.time())
 
-        for item in parsed_table["table_body"]:
+        ## Providers are yielded as each table row is parsed. Only time spent
+        #  parsing is recorded, not the pipelines handling each item
+        for item in latency_stats.timed_iter(
+            iter_providers_table(scrapy_response=response),
+            stage="parse/parse_providers_table",
+        ):
             ## Create OhioenergyItem to pass into pipelines
-            item["utility_type"] = "electric"
+            item["utility_type"] = utility_type
+            item["territory_id"] = territory_id
+            item["rate_code"] = rate_code
             item["scrape_timestamp"] = scrape_ts
+            item["scrape_epoch"] = scrape_epoch
+
+            ## Typed price, term, fees, renewable & intro price, parsed once
+            #  here instead of by every consumer
+            with latency_stats.timed("parse/normalize_provider"):
+                item["normalized"] = normalize_provider(
+                    item, report=self.normalize_report
+                )
+
             provider_item = OhioenergyItem(**item)
 
             ## Yield items, pipelines kick in next. If no pipelines,
             #  item will just be returned
             yield provider_item
+
+    def closed(self, reason):
+        """Add the normalize report to the crawl stats & log rejected values."""
+        summary = self.normalize_report.summary()
+
+        for field, counts in summary["fields"].items():
+            for key in ["normalized", "empty", "rejected"]:
+                self.crawler.stats.set_value(f"normalize/{field}/{key}", counts[key])
+
+        self.normalize_report.log_rejects()
@@ -0,0 +1,145 @@
+"""Rank offers by effective annual cost at a grid of monthly usage levels.
+
+Offers are loaded from the offer_snapshots table, or from Parquet snapshots
+with --parquet-dir, & costed in one pass with lib.analytics_utils. By
+default only each comparison page's latest scrape is ranked, pass --history
+to rank every scrape.
+
+Usage, from the ohioenergy/ app directory (requires pdm install -G analytics):
+
+    python rank_offers.py --usage 500,1000,2000 --default-price 1=7.52
+    python rank_offers.py --parquet-dir .cache/snapshots --history --output ranks.csv
+"""
+import argparse
+import time
+
+import arrow
+from core.config import logging_settings
+from core.logging.logger import get_logger
+from lib.analytics_utils import (
+    best_offers,
+    default_early_exit_rate,
+    default_usage_grid,
+    latest_offers,
+    rank_offers,
+    read_snapshot_frame,
+    read_snapshot_frame_from_db,
+)
+
+log = get_logger(__name__, level=logging_settings.LOG_LEVEL)
+
+
+def parse_default_prices(values: list[str] = None) -> dict[int, float]:
+    """Parse TERRITORY_ID=CENTS pairs, i.e. ["1=7.52", "2=8.1"]."""
+    default_prices = {}
+
+    for value in values or []:
+        territory_id, _, cents = value.partition("=")
+        try:
+            default_prices[int(territory_id)] = float(cents)
+        except ValueError:
+            raise ValueError(
+                f"Invalid default price: {value!r}. Must be TERRITORY_ID=CENTS"
+            )
+
+    return default_prices
+
+
+def parse_args():
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Rank offers by effective annual cost at several usage levels."
+    )
+    parser.add_argument(
+        "--parquet-dir", help="Read Parquet snapshots instead of the database"
+    )
+    parser.add_argument("--start-date", help="First scrape date, i.e. 2023-05-01")
+    parser.add_argument("--end-date", help="Last scrape date, i.e. 2023-05-31")
+    parser.add_argument(
+        "--usage",
+        default=",".join(str(level) for level in default_usage_grid),
+        help="Comma separated monthly usage levels (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--default-price",
+        action="append",
+        help=(
+            "Utility default price for a territory as TERRITORY_ID=CENTS, "
+            "can be repeated"
+        ),
+    )
+    parser.add_argument(
+        "--early-exit-rate", type=float, default=default_early_exit_rate
+    )
+    parser.add_argument(
+        "--history", action="store_true", help="Rank every scrape, not only the latest"
+    )
+    parser.add_argument("--top", type=int, default=3, help="Offers to list per page")
+    parser.add_argument("--output", help="Write every ranked offer to this CSV file")
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    usage = [float(level) for level in args.usage.split(",")]
+    default_prices = parse_default_prices(args.default_price)
+
+    start = time.perf_counter()
+    if args.parquet_dir:
+        offers = read_snapshot_frame(
+            root_dir=args.parquet_dir,
+            start_date=args.start_date,
+            end_date=args.end_date,
+        )
+    else:
+        ## Dates are local & inclusive, like the Parquet scrape_date partitions
+        since_epoch = until_epoch = None
+        if args.start_date:
+            since_epoch = arrow.get(args.start_date, tzinfo="local").int_timestamp
+        if args.end_date:
+            until_epoch = (
+                arrow.get(args.end_date, tzinfo="local").shift(days=1).int_timestamp
+            )
+        offers = read_snapshot_frame_from_db(
+            since_epoch=since_epoch, until_epoch=until_epoch
+        )
+
+    if not args.history:
+        offers = latest_offers(offers)
+    loaded = time.perf_counter()
+
+    ranked = rank_offers(
+        offers,
+        usage=usage,
+        default_prices=default_prices,
+        early_exit_rate=args.early_exit_rate,
+    )
+    ranked_at = time.perf_counter()
+
+    log.info(
+        f"Ranked {len(ranked)} offer(s) at {len(usage)} usage level(s). "
+        f"Loaded in {loaded - start:.2f}s, ranked in {ranked_at - loaded:.2f}s"
+    )
+
+    if args.output:
+        ranked.to_csv(args.output, index=False)
+        log.info(f"Wrote ranked offers to {args.output}")
+
+    ## Median usage level, for a readable summary
+    summary_usage = usage[len(usage) // 2]
+    best = best_offers(ranked, usage=summary_usage, top=args.top)
+    columns = [
+        "utility_type",
+        "territory_id",
+        "rate_code",
+        "name",
+        "rate_type",
+        "price_cents",
+        f"cost_{summary_usage:g}",
+        f"rank_{summary_usage:g}",
+        f"savings_{summary_usage:g}",
+    ]
+    print(f"Top {args.top} offer(s) per page at {summary_usage:g}/month:")
+    print(best[columns].to_string(index=False))
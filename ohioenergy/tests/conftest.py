@@ -0,0 +1,19 @@
+"""Shared setup for the tests.
+
+Tests run in a throwaway working directory & write to a throwaway SQLite
+database, never the configured DB_URI or the app directory's logs/ & .cache/.
+"""
+import os
+import shutil
+import tempfile
+
+## Set before core.database is imported & reads DB_URI
+test_dir = tempfile.mkdtemp(prefix="ohioenergy-test-")
+os.environ["DB_URI"] = f"sqlite:///{test_dir}/test.sqlite"
+os.environ["SCRAPY_SETTINGS_MODULE"] = "ohioenergy.settings"
+os.chdir(test_dir)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    """Remove the throwaway working directory & database."""
+    shutil.rmtree(test_dir, ignore_errors=True)
@@ -0,0 +1,53 @@
+"""Reading offer frames from the offer_snapshots table.
+
+Needs the analytics dependency group, these are skipped without it.
+"""
+import pytest
+from benchmarks.fixtures import build_items
+from core.database import build_engine, init_database
+from lib.analytics_utils import read_snapshot_frame_from_db
+from lib.db_utils import bulk_insert_snapshots, snapshot_row_from_item
+
+pytest.importorskip("pandas")
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Build a throwaway SQLite database with a scrape at each of 3 epochs."""
+    engine = build_engine(f"sqlite:///{tmp_path}/snapshots.sqlite")
+    init_database(engine)
+
+    items = build_items(rows=2)
+    bulk_insert_snapshots(
+        rows=[
+            snapshot_row_from_item(dict(item, scrape_epoch=scrape_epoch))
+            for scrape_epoch in [1000, 2000, 3000]
+            for item in items
+        ],
+        engine=engine,
+    )
+
+    yield engine
+
+    engine.dispose()
+
+
+@pytest.mark.parametrize(
+    "since_epoch, until_epoch, epochs",
+    [
+        (None, None, [1000, 2000, 3000]),
+        (2000, None, [2000, 3000]),
+        (None, 3000, [1000, 2000]),
+        (2000, 3000, [2000]),
+    ],
+)
+def test_read_snapshot_frame_from_db_epoch_range(
+    engine, since_epoch, until_epoch, epochs
+):
+    """Rows are read from since_epoch up to, but not including, until_epoch."""
+    frame = read_snapshot_frame_from_db(
+        since_epoch=since_epoch, until_epoch=until_epoch, engine=engine
+    )
+
+    assert sorted(frame["scrape_epoch"].unique()) == epochs
+    assert len(frame) == 2 * len(epochs)
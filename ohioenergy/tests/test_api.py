@@ -0,0 +1,182 @@
+"""Query API pagination & caching against a throwaway SQLite database.
+
+Needs the api dependency group, these are skipped without it.
+"""
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("aiosqlite")
+
+import api.database  # noqa: E402
+import api.dependencies  # noqa: E402
+import api.main  # noqa: E402
+from api.cache import QueryCache  # noqa: E402
+from api.main import app  # noqa: E402
+from api.pagination import decode_cursor, encode_cursor  # noqa: E402
+from benchmarks.fixtures import build_items  # noqa: E402
+from core.config import app_settings  # noqa: E402
+from core.database import build_engine, init_database  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from lib.db_utils import (  # noqa: E402
+    bulk_insert_snapshots,
+    record_crawl_run,
+    snapshot_row_from_item,
+)
+
+territory_id = 6
+
+
+def insert_snapshots(engine, rows: int = None, scrape_epoch: int = None) -> None:
+    """Insert one scrape of synthetic offers into territory_id."""
+    items = build_items(rows=rows, territory_id=territory_id)
+    bulk_insert_snapshots(
+        rows=[
+            snapshot_row_from_item(dict(item, scrape_epoch=scrape_epoch))
+            for item in items
+        ],
+        engine=engine,
+    )
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """Point the API at a throwaway database, with a fresh query cache."""
+    uri = f"sqlite:///{tmp_path}/api.sqlite"
+    engine = build_engine(uri)
+    init_database(engine)
+
+    monkeypatch.setattr(api.database, "SQLALCHEMY_READONLY_DATABASE_URI", uri)
+    api.database.get_async_engine.cache_clear()
+    api.database.get_async_sessionmaker.cache_clear()
+
+    cache = QueryCache(max_entries=16, ttl=300)
+    monkeypatch.setattr(api.dependencies, "query_cache", cache)
+    monkeypatch.setattr(api.main, "query_cache", cache)
+    ## Check crawl_runs on every request
+    monkeypatch.setattr(app_settings, "API_CRAWL_CHECK_INTERVAL", 0)
+
+    yield engine
+
+    api.database.get_async_engine.cache_clear()
+    api.database.get_async_sessionmaker.cache_clear()
+    engine.dispose()
+
+
+@pytest.fixture
+def client(engine):
+    """Run the app, disposing its async engine on exit."""
+    with TestClient(app) as client:
+        yield client
+
+
+def cache_stats(client) -> dict:
+    """Return the query cache stats from /health."""
+    return client.get("/health").json()["cache"]
+
+
+def test_cursor_round_trip():
+    """Cursors decode to the values they were encoded from."""
+    cursor = encode_cursor([Decimal("5.1900"), 42])
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, size=2) == ["5.1900", 42]
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", encode_cursor([1, 2])])
+def test_decode_cursor_rejects_invalid_cursors(cursor):
+    """Cursors that don't decode to size values raise a 400."""
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor(cursor, size=1)
+
+    assert exc_info.value.status_code == 400
+
+
+def test_pages_follow_cursors_to_the_last_page(engine, client):
+    """Paging with next_cursor returns every offer once, in id order."""
+    insert_snapshots(engine, rows=25, scrape_epoch=1000)
+
+    ids = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 10} | ({"cursor": cursor} if cursor else {})
+        response = client.get(f"/territories/{territory_id}/offers", params=params)
+        assert response.status_code == 200
+
+        page = response.json()
+        ids += [item["id"] for item in page["items"]]
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert len(ids) == 25
+    assert ids == sorted(set(ids))
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", encode_cursor([1, 2])])
+def test_bad_cursor_is_a_400(engine, client, cursor):
+    """The API answers a cursor it didn't issue with a 400."""
+    response = client.get(
+        f"/territories/{territory_id}/offers", params={"cursor": cursor}
+    )
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+def test_cached_entries_expire_after_ttl(monkeypatch):
+    """Entries are dropped once ttl seconds have passed."""
+    now = [100.0]
+    monkeypatch.setattr("api.cache.time.monotonic", lambda: now[0])
+    cache = QueryCache(max_entries=16, ttl=30)
+
+    cache.set("key", "value")
+    now[0] += 29
+    assert cache.get("key") == (True, "value")
+
+    now[0] += 2
+    assert cache.get("key") == (False, None)
+    assert len(cache.entries) == 0
+
+
+def test_least_recently_used_entries_are_evicted():
+    """Past max_entries, the least recently read or set entry is evicted."""
+    cache = QueryCache(max_entries=2, ttl=300)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    ## Reading a makes b the least recently used
+    assert cache.get("a") == (True, 1)
+    cache.set("c", 3)
+
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.get("c") == (True, 3)
+
+
+def test_new_crawl_run_clears_cached_results(engine, client):
+    """Results stay cached until a crawl run is recorded."""
+    url = f"/territories/{territory_id}/offers"
+    insert_snapshots(engine, rows=5, scrape_epoch=1000)
+
+    first = client.get(url).json()
+    assert len(first["items"]) == 5
+    assert client.get(url).json() == first
+    stats = cache_stats(client)
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+    ## A crawl's rows are served stale until its run is recorded
+    insert_snapshots(engine, rows=3, scrape_epoch=2000)
+    assert client.get(url).json() == first
+
+    record_crawl_run(spider="ohioenergy", engine=engine)
+    latest = client.get(url).json()
+
+    assert len(latest["items"]) == 3
+    assert {item["scrape_epoch"] for item in latest["items"]} == {2000}
+    assert cache_stats(client)["crawl_run_id"] == 1
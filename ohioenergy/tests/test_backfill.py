@@ -0,0 +1,71 @@
+"""run_backfill() from a segment archive into the test database."""
+from backfill import run_backfill
+from benchmarks.fixtures import build_items
+from core.database import get_engine
+from lib.segment_log import SegmentLogWriter
+from lib.time_utils import epoch_from_ts
+from models.backfill_models import BackfillCheckpoint
+from models.provider_models import OfferFingerprint, OhioenergyProvider
+from sqlalchemy import delete, func, select
+
+scrape_epoch = 1700000000
+## Archived before items had a scrape_epoch
+old_scrape_timestamp = "2023-11-14_20:11:05"
+
+
+def write_archive(cache_dir) -> int:
+    """Write a segment of synthetic items & return how many records it holds."""
+    records = [dict(item, scrape_epoch=scrape_epoch) for item in build_items(rows=5)]
+
+    old_record = dict(records[0], name="Old Provider LLC")
+    del old_record["scrape_epoch"]
+    old_record["scrape_timestamp"] = old_scrape_timestamp
+    records.append(old_record)
+
+    segment_dir = cache_dir / "providers" / "2023-11-14" / "22"
+    segment_dir.mkdir(parents=True)
+    with SegmentLogWriter(log_dir=str(segment_dir), prefix="providers") as writer:
+        for record in records:
+            writer.append(record)
+
+    return len(records)
+
+
+def backfill(cache_dir, **kwargs) -> dict[str, int]:
+    """Backfill cache_dir with one worker process."""
+    return run_backfill(cache_dir=str(cache_dir), workers=1, **kwargs)
+
+
+def test_backfilling_twice_keeps_counts_and_archived_epochs(tmp_path):
+    """Replaying a segment again keeps counts & the archived epochs."""
+    records = write_archive(tmp_path)
+
+    first = backfill(tmp_path, rebuild=True)
+    assert (first["files"], first["inserted"], first["unchanged"]) == (1, records, 0)
+
+    ## Checkpointed files are skipped
+    second = backfill(tmp_path)
+    assert (second["files"], second["skipped"]) == (0, 1)
+
+    ## A file replayed again, i.e. after it grew, doesn't count offers twice
+    with get_engine().begin() as conn:
+        conn.execute(delete(BackfillCheckpoint.__table__))
+    third = backfill(tmp_path)
+    assert (third["files"], third["inserted"], third["unchanged"]) == (1, 0, records)
+
+    with get_engine().connect() as conn:
+        providers = conn.scalar(select(func.count()).select_from(OhioenergyProvider))
+        fingerprints = conn.execute(
+            select(
+                OfferFingerprint.first_seen,
+                OfferFingerprint.last_seen,
+                OfferFingerprint.seen_count,
+            )
+        ).all()
+
+    old_epoch = epoch_from_ts(old_scrape_timestamp)
+    assert providers == records
+    assert sorted(set(fingerprints)) == sorted(
+        {(scrape_epoch, scrape_epoch, 1), (old_epoch, old_epoch, 1)}
+    )
+    assert len(fingerprints) == records
@@ -0,0 +1,64 @@
+"""Engine setup & schema migration of existing databases."""
+from core.config import database_settings
+from core.database import add_missing_columns, build_engine, init_database
+from sqlalchemy import inspect, text
+
+## providers as created before territory_id & rate_code were added
+old_providers_table = """
+CREATE TABLE providers (
+    id VARCHAR(36) NOT NULL PRIMARY KEY,
+    utility_type VARCHAR NOT NULL,
+    scrape_timestamp VARCHAR NOT NULL,
+    name VARCHAR NOT NULL,
+    address VARCHAR NOT NULL,
+    phone VARCHAR NOT NULL,
+    url VARCHAR NOT NULL,
+    price VARCHAR NOT NULL,
+    rate_type VARCHAR NOT NULL,
+    percent_renewable VARCHAR NOT NULL,
+    intro_price VARCHAR NOT NULL,
+    term_length VARCHAR NOT NULL,
+    early_term_fee VARCHAR NOT NULL,
+    monthly_fee VARCHAR NOT NULL,
+    promo_offer VARCHAR NOT NULL
+)
+"""
+
+
+def test_init_database_adds_new_columns_to_existing_table(tmp_path):
+    """Columns added to a model after its table was created are added."""
+    engine = build_engine(f"sqlite:///{tmp_path}/old.sqlite")
+    with engine.begin() as conn:
+        conn.execute(text(old_providers_table))
+        conn.execute(
+            text(
+                "INSERT INTO providers VALUES ('1', 'electric', 'ts', 'Provider', "
+                "'', '', '', '7.5', 'Fixed', '0%', 'No', '12 mo.', '$0.00', '$0.00', "
+                "'No')"
+            )
+        )
+
+    init_database(engine)
+
+    inspector = inspect(engine)
+    columns = {c["name"] for c in inspector.get_columns("providers")}
+    indexes = {i["name"] for i in inspector.get_indexes("providers")}
+    assert {"territory_id", "rate_code"} <= columns
+    assert "ix_providers_territory_id" in indexes
+
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT name, territory_id FROM providers")).one()
+    assert tuple(row) == ("Provider", None)
+
+    ## Nothing left to add on later runs
+    assert add_missing_columns(engine) == []
+
+
+def test_build_engine_sizes_only_queue_pools(tmp_path):
+    """Only QueuePool engines get pool_size & friends."""
+    ## SingletonThreadPool rejects pool_size & friends
+    memory_engine = build_engine("sqlite:///:memory:")
+    file_engine = build_engine(f"sqlite:///{tmp_path}/pool.sqlite")
+
+    assert type(memory_engine.pool).__name__ == "SingletonThreadPool"
+    assert file_engine.pool.size() == database_settings.DB_POOL_SIZE
@@ -0,0 +1,122 @@
+"""SqliteCacheStorage round trips, body dedup, expiry & eviction."""
+import os
+
+import pytest
+from ohioenergy.httpcache import SqliteCacheStorage
+from scrapy import Spider
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+
+
+@pytest.fixture
+def open_storage(tmp_path):
+    """Open a SqliteCacheStorage under tmp_path, closing it after the test."""
+    opened = []
+
+    def open_storage(**settings) -> SqliteCacheStorage:
+        crawler = get_crawler(
+            settings_dict={
+                "HTTPCACHE_DIR": str(tmp_path),
+                "HTTPCACHE_EXPIRATION_SECS": 0,
+                **settings,
+            }
+        )
+        spider = Spider(name="test")
+        spider.crawler = crawler
+
+        storage = SqliteCacheStorage(crawler.settings)
+        storage.open_spider(spider)
+        opened.append((storage, spider))
+
+        return storage
+
+    yield open_storage
+
+    for storage, spider in opened:
+        storage.close_spider(spider)
+
+
+def store(storage: SqliteCacheStorage, url: str, body: bytes) -> Request:
+    """Store a 200 response for url & return its request."""
+    request = Request(url)
+    response = HtmlResponse(
+        url=url, body=body, headers={"ETag": '"v1"'}, request=request
+    )
+    storage.store_response(None, request, response)
+
+    return request
+
+
+def count(storage: SqliteCacheStorage, table: str) -> int:
+    """Count the rows in a cache table."""
+    (rows,) = storage.db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+
+    return rows
+
+
+def test_store_and_retrieve_round_trip(open_storage):
+    """A stored response is served back with its status, headers & body."""
+    storage = open_storage()
+    body = b"<html><body>offers</body></html>"
+    request = store(storage, "https://example.com/a", body)
+
+    response = storage.retrieve_response(None, request)
+
+    assert isinstance(response, HtmlResponse)
+    assert (response.url, response.status, response.body) == (
+        "https://example.com/a",
+        200,
+        body,
+    )
+    assert response.headers["ETag"] == b'"v1"'
+    assert storage.retrieve_response(None, Request("https://example.com/b")) is None
+
+
+def test_identical_bodies_are_stored_once(open_storage):
+    """Responses with the same body share one row in bodies."""
+    storage = open_storage()
+    body = b"<html><body>same page</body></html>"
+    first = store(storage, "https://example.com/a", body)
+    second = store(storage, "https://example.com/b", body)
+
+    assert count(storage, "responses") == 2
+    assert count(storage, "bodies") == 1
+    assert storage.retrieve_response(None, first).body == body
+    assert storage.retrieve_response(None, second).body == body
+
+
+def test_expired_responses_are_not_served_or_kept(open_storage):
+    """Entries past HTTPCACHE_EXPIRATION_SECS or unused for max age go away."""
+    storage = open_storage(HTTPCACHE_EXPIRATION_SECS=60, HTTPCACHE_SQLITE_MAX_AGE=3600)
+    request = store(storage, "https://example.com/a", b"<html>old</html>")
+
+    storage.db.execute("UPDATE responses SET stored_at = stored_at - 120")
+    assert storage.retrieve_response(None, request) is None
+
+    storage.db.execute("UPDATE responses SET accessed_at = accessed_at - 7200")
+    storage.evict()
+    assert (count(storage, "responses"), count(storage, "bodies")) == (0, 0)
+
+
+def test_least_recently_used_are_evicted_to_fit_max_bytes(open_storage):
+    """Eviction drops the least recently used entries until bodies fit."""
+    storage = open_storage(HTTPCACHE_SQLITE_MAX_BYTES=2500)
+
+    ## Random bodies don't compress, so each one stores ~1000 bytes
+    requests = {
+        name: store(storage, f"https://example.com/{name}", os.urandom(1000))
+        for name in ["a", "b", "c"]
+    }
+    ## b was used longest ago, then c, then a
+    for minutes_ago, name in [(3, "b"), (2, "c"), (1, "a")]:
+        storage.db.execute(
+            "UPDATE responses SET accessed_at = accessed_at - ? WHERE url = ?",
+            (minutes_ago * 60, f"https://example.com/{name}"),
+        )
+
+    storage.evict()
+
+    assert storage.retrieve_response(None, requests["b"]) is None
+    assert storage.retrieve_response(None, requests["a"]) is not None
+    assert storage.retrieve_response(None, requests["c"]) is not None
+    assert count(storage, "bodies") == 2
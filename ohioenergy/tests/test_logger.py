@@ -0,0 +1,44 @@
+"""Logging from forked child processes."""
+import multiprocessing
+import time
+from pathlib import Path
+
+from core.logging import logger
+from core.logging.logger import default_log_file, get_logger
+
+log = get_logger(__name__)
+
+
+def log_from_child(message: str):
+    """Log a message & exit non-zero unless it went to the parent's queue."""
+    ## Exit 0 only if the child sends records to the parent, not to a
+    #  listener & log file of its own
+    log.info(message)
+
+    if logger._queue_listener is not None:
+        raise SystemExit(1)
+    if logger._queue_handler.queue is not logger._child_log_queue:
+        raise SystemExit(2)
+
+
+def test_forked_child_logs_through_parent():
+    """A forked child's records are written by the parent's listener."""
+    message = "logged from a forked child"
+
+    child = multiprocessing.get_context("fork").Process(
+        target=log_from_child, args=(message,)
+    )
+    child.start()
+    child.join(timeout=10)
+
+    assert child.exitcode == 0
+
+    ## The parent's listener writes the record, give its threads a moment
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        if message in Path(default_log_file).read_text():
+            break
+        time.sleep(0.05)
+
+    log_lines = Path(default_log_file).read_text().splitlines()
+    assert [line for line in log_lines if message in line]
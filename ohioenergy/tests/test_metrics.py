@@ -0,0 +1,103 @@
+"""The Prometheus metrics endpoint after a crawl of replayed pages."""
+import os
+import socket
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from benchmarks.fixtures import build_comparison_page
+
+app_dir = Path(__file__).resolve().parent.parent
+
+pytest.importorskip("prometheus_client")
+
+## Runs a replayed crawl with the metrics endpoint on, then prints /metrics.
+#  A new interpreter, because Twisted's reactor can't be restarted
+crawl_script = """
+import sys
+import urllib.request
+
+from scrapy.crawler import CrawlerRunner
+from scrapy.utils.project import get_project_settings
+from twisted.internet import reactor, threads
+
+from ohioenergy.replay import replay_settings
+from ohioenergy.spiders.ohioenergyproviders import OhioenergyprovidersSpider
+
+fixtures_dir, port = sys.argv[1], int(sys.argv[2])
+
+settings = get_project_settings()
+settings.setdict(replay_settings(fixtures_dir), priority="cmdline")
+settings.setdict(
+    {"METRICS_ENABLED": True, "METRICS_PORT": port, "CRAWL_RUNS_ENABLED": False},
+    priority="cmdline",
+)
+
+
+def fetch_metrics(_):
+    url = f"http://127.0.0.1:{port}/metrics"
+
+    return threads.deferToThread(lambda: urllib.request.urlopen(url).read())
+
+
+runner = CrawlerRunner(settings)
+d = runner.crawl(OhioenergyprovidersSpider, territory_ids="6", rate_codes="1,2")
+d.addCallback(fetch_metrics)
+d.addCallback(lambda body: sys.stdout.write(body.decode()))
+d.addBoth(lambda _: reactor.stop())
+reactor.run()
+"""
+
+
+def free_port() -> int:
+    """Return a TCP port that is free right now."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+
+        return sock.getsockname()[1]
+
+
+def test_metrics_endpoint_after_replayed_crawl(tmp_path):
+    """A replayed crawl's items & responses show up on the metrics endpoint."""
+    fixtures_dir = tmp_path / "fixtures"
+    fixtures_dir.mkdir()
+    (fixtures_dir / "Electric_6_1.html").write_text(build_comparison_page(rows=5))
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [str(app_dir)] + [p for p in [env.get("PYTHONPATH")] if p]
+    )
+    env["DB_URI"] = f"sqlite:///{tmp_path}/metrics.sqlite"
+    env["SCRAPY_SETTINGS_MODULE"] = "ohioenergy.settings"
+
+    proc = subprocess.run(
+        [sys.executable, "-c", crawl_script, str(fixtures_dir), str(free_port())],
+        cwd=tmp_path,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+
+    samples = dict(
+        line.rsplit(" ", 1)
+        for line in proc.stdout.splitlines()
+        if line.startswith("ohioenergy_")
+    )
+
+    ## 2 replayed pages of 5 offers each
+    spider = 'spider="ohioenergyproviders"'
+    assert float(samples[f"ohioenergy_items_scraped_total{{{spider}}}"]) == 10
+    assert float(samples[f'ohioenergy_responses_total{{{spider},status="200"}}']) == 2
+
+    download_latency = "ohioenergy_download_latency_seconds_count"
+    assert float(samples[f"{download_latency}{{{spider}}}"]) == 2
+    stage_latency = "ohioenergy_stage_latency_seconds_count"
+    assert (
+        float(samples[f'{stage_latency}{{stage="parse/parse_providers_table"}}']) == 2
+    )
+    assert (
+        float(samples[f'{stage_latency}{{stage="flush/OhioenergySavePipeline"}}']) >= 1
+    )
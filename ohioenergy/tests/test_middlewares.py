@@ -0,0 +1,124 @@
+"""Page hash & conditional GET middlewares only store records for saved pages."""
+import pytest
+from core.database import init_database
+from lib.db_utils import get_page_hash, get_page_validator, record_page_validator
+from ohioenergy.middlewares import (
+    OhioenergyDownloaderMiddleware,
+    OhioenergyPageHashMiddleware,
+)
+from ohioenergy.signals import rows_dropped
+from scrapy import Spider, signals
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+from twisted.python.failure import Failure
+
+
+@pytest.fixture
+def crawler():
+    """Build a crawler with a spider & a database with every table."""
+    init_database()
+    crawler = get_crawler()
+    crawler.spider = Spider(name="test")
+
+    return crawler
+
+
+def response(url: str) -> HtmlResponse:
+    """Build a 200 response for url."""
+    return HtmlResponse(
+        url=url,
+        body=b"<html><body><table></table></body></html>",
+        request=Request(url),
+    )
+
+
+def parse_page(mw, crawler, url: str) -> list:
+    """Run a page's output through the middleware & return what it yields."""
+    return list(
+        mw.process_spider_output(response(url), [{"name": "offer"}], crawler.spider)
+    )
+
+
+def test_page_hash_stored_after_spider_closed(crawler):
+    """A changed page's hash is stored at spider_closed, not before."""
+    mw = OhioenergyPageHashMiddleware.from_crawler(crawler)
+    url = "https://example.com/hash/closed"
+
+    assert parse_page(mw, crawler, url) == [{"name": "offer"}]
+    assert get_page_hash(url=url) is None
+
+    crawler.signals.send_catch_log(
+        signal=signals.spider_closed,
+        spider=crawler.spider,
+        reason="finished",
+    )
+
+    assert get_page_hash(url=url) is not None
+
+
+def test_page_hash_not_stored_after_item_error(crawler):
+    """A page whose item failed doesn't store its hash."""
+    mw = OhioenergyPageHashMiddleware.from_crawler(crawler)
+    url = "https://example.com/hash/item_error"
+
+    parse_page(mw, crawler, url)
+    mw.item_error(
+        {"name": "offer"}, response(url), crawler.spider, Failure(ValueError())
+    )
+    mw.spider_closed(crawler.spider)
+
+    assert get_page_hash(url=url) is None
+
+
+def test_page_hash_not_stored_after_rows_dropped(crawler):
+    """No hashes are stored after a pipeline dropped rows."""
+    mw = OhioenergyPageHashMiddleware.from_crawler(crawler)
+    url = "https://example.com/hash/rows_dropped"
+
+    parse_page(mw, crawler, url)
+    crawler.signals.send_catch_log(signal=rows_dropped, pipeline=None, rows=[{}])
+    mw.spider_closed(crawler.spider)
+
+    assert get_page_hash(url=url) is None
+
+
+def validator_response(url: str) -> HtmlResponse:
+    """Build a 200 response with an ETag for url."""
+    return HtmlResponse(
+        url=url,
+        body=b"<html></html>",
+        headers={"ETag": '"v2"'},
+        request=Request(url),
+    )
+
+
+def test_page_validator_stored_after_spider_closed(crawler):
+    """A page's validators are stored at spider_closed, not before."""
+    mw = OhioenergyDownloaderMiddleware.from_crawler(crawler)
+    url = "https://example.com/validator/closed"
+
+    mw.process_response(Request(url), validator_response(url), crawler.spider)
+
+    assert get_page_validator(url=url) is None
+
+    mw.spider_closed(crawler.spider)
+
+    assert get_page_validator(url=url).etag == '"v2"'
+
+
+def test_page_validator_deleted_after_item_error(crawler):
+    """A page whose item failed has its stored validators deleted."""
+    mw = OhioenergyDownloaderMiddleware.from_crawler(crawler)
+    url = "https://example.com/validator/item_error"
+    record_page_validator(url=url, etag='"v1"')
+
+    mw.process_response(Request(url), validator_response(url), crawler.spider)
+    mw.item_error(
+        {"name": "offer"},
+        validator_response(url),
+        crawler.spider,
+        Failure(ValueError()),
+    )
+    mw.spider_closed(crawler.spider)
+
+    assert get_page_validator(url=url) is None
@@ -0,0 +1,116 @@
+"""OhioenergyBufferedPipeline batching, flush timer & failed writes."""
+import pytest
+from ohioenergy.pipelines import OhioenergyBufferedPipeline
+from twisted.internet import task
+
+from ohioenergy import pipelines
+
+
+class ListPipeline(OhioenergyBufferedPipeline):
+    """Buffered pipeline that writes batches to a list."""
+
+    def __init__(self, fail_writes: int = 0, **kwargs):
+        """Fail the first fail_writes calls to write_rows()."""
+        super().__init__(**kwargs)
+
+        self.batches: list[list[dict]] = []
+        self.fail_writes = fail_writes
+
+    def row_from_item(self, item: dict) -> dict:
+        """Copy the item as its row."""
+        return dict(item)
+
+    def write_rows(self, rows: list[dict]) -> int:
+        """Append the batch to batches, or raise while writes should fail."""
+        if self.fail_writes:
+            self.fail_writes -= 1
+            raise RuntimeError("database is locked")
+
+        self.batches.append(rows)
+
+        return len(rows)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Drive the flush timer & time.monotonic() from a fake clock."""
+    clock = task.Clock()
+
+    class ClockLoopingCall(task.LoopingCall):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.clock = clock
+
+    monkeypatch.setattr(pipelines.task, "LoopingCall", ClockLoopingCall)
+    monkeypatch.setattr(pipelines.time, "monotonic", clock.seconds)
+
+    return clock
+
+
+def items(count: int) -> list[dict]:
+    """Build count items with distinct territory ids."""
+    return [{"territory_id": n} for n in range(count)]
+
+
+def test_buffered_pipeline_is_abstract():
+    """Subclasses must implement row_from_item() & write_rows()."""
+    with pytest.raises(TypeError):
+        OhioenergyBufferedPipeline()
+
+
+def test_flushes_full_batches(clock):
+    """Full batches are written as they fill, the rest on close."""
+    pipeline = ListPipeline(batch_size=3, flush_interval=0)
+    pipeline.open_spider(None)
+
+    for item in items(7):
+        pipeline.process_item(item, None)
+
+    assert [len(batch) for batch in pipeline.batches] == [3, 3]
+    assert len(pipeline.buffer) == 1
+
+    pipeline.close_spider(None)
+
+    assert [len(batch) for batch in pipeline.batches] == [3, 3, 1]
+    assert pipeline.buffer == []
+
+
+def test_timer_flushes_stale_buffer(clock):
+    """The flush timer writes a buffer that hasn't filled a batch."""
+    pipeline = ListPipeline(batch_size=100, flush_interval=5.0)
+    pipeline.open_spider(None)
+
+    for item in items(2):
+        pipeline.process_item(item, None)
+    clock.advance(4)
+
+    assert pipeline.batches == []
+
+    clock.advance(1)
+
+    assert [len(batch) for batch in pipeline.batches] == [2]
+
+    pipeline.close_spider(None)
+
+    assert not pipeline.flush_loop.running
+
+
+def test_failed_write_keeps_rows_for_next_flush(clock):
+    """Rows from a failed write are retried, ahead of newer rows."""
+    pipeline = ListPipeline(fail_writes=1, batch_size=100, flush_interval=5.0)
+    pipeline.open_spider(None)
+
+    for item in items(2):
+        pipeline.process_item(item, None)
+    clock.advance(5)
+
+    assert pipeline.batches == []
+    assert len(pipeline.buffer) == 2
+    assert pipeline.flush_loop.running
+
+    pipeline.process_item({"territory_id": 2}, None)
+    clock.advance(5)
+
+    assert pipeline.batches == [items(3)]
+
+    pipeline.close_spider(None)
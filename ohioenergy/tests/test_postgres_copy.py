@@ -0,0 +1,116 @@
+"""copy_rows() & save_providers() against a real PostgreSQL.
+
+Set TEST_POSTGRES_URI to a postgresql+psycopg:// URI to run these, they are
+skipped otherwise. Each run works in its own schema, which is dropped after.
+"""
+import os
+import uuid
+
+import pytest
+from benchmarks.fixtures import build_items
+from core.database import Base, build_engine
+from lib.db_utils import copy_rows, provider_row_from_item, save_providers
+from models.provider_models import OhioenergyProvider
+from sqlalchemy import event, func, select, text
+from sqlalchemy.exc import OperationalError
+
+test_postgres_uri = os.environ.get("TEST_POSTGRES_URI")
+
+pytestmark = pytest.mark.skipif(
+    not test_postgres_uri, reason="TEST_POSTGRES_URI is not set"
+)
+
+
+@pytest.fixture(scope="module")
+def engine():
+    """Build an engine whose connections use a throwaway schema."""
+    pytest.importorskip("psycopg")
+
+    schema = f"ohioenergy_test_{uuid.uuid4().hex[:8]}"
+    admin_engine = build_engine(test_postgres_uri)
+    try:
+        with admin_engine.begin() as conn:
+            conn.execute(text(f"CREATE SCHEMA {schema}"))
+    except OperationalError as exc:
+        admin_engine.dispose()
+        pytest.skip(f"PostgreSQL unavailable: {exc}")
+
+    ## copy_rows() sends raw SQL, so tables are found through search_path
+    engine = build_engine(test_postgres_uri)
+
+    @event.listens_for(engine, "connect")
+    def set_search_path(dbapi_connection, connection_record):
+        ## Outside a transaction, so a rollback doesn't undo it
+        autocommit = dbapi_connection.autocommit
+        dbapi_connection.autocommit = True
+        with dbapi_connection.cursor() as cursor:
+            cursor.execute(f"SET search_path TO {schema}")
+        dbapi_connection.autocommit = autocommit
+
+    Base.metadata.create_all(engine)
+
+    yield engine
+
+    engine.dispose()
+    with admin_engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+    admin_engine.dispose()
+
+
+def provider_rows(count: int, territory_id: int) -> list[dict]:
+    """Build provider rows from synthetic items."""
+    return [
+        provider_row_from_item(item)
+        for item in build_items(rows=count, territory_id=territory_id)
+    ]
+
+
+def count_providers(engine, territory_id: int) -> int:
+    """Count providers rows for a territory."""
+    with engine.connect() as conn:
+        return conn.scalar(
+            select(func.count())
+            .select_from(OhioenergyProvider)
+            .where(OhioenergyProvider.territory_id == territory_id)
+        )
+
+
+def test_copy_rows_skips_duplicate_keys(engine):
+    """Rows already in the table & duplicates within a batch are skipped."""
+    rows = provider_rows(50, territory_id=1)
+
+    with engine.begin() as conn:
+        assert copy_rows(conn=conn, table=OhioenergyProvider.__table__, rows=rows) == 50
+
+    ## A re-run of the same rows, plus new ones & a duplicate within the batch
+    new_rows = provider_rows(10, territory_id=1)
+    rerun = rows + new_rows + new_rows[:1]
+    with engine.begin() as conn:
+        assert (
+            copy_rows(conn=conn, table=OhioenergyProvider.__table__, rows=rerun) == 10
+        )
+
+    assert count_providers(engine, territory_id=1) == 60
+
+
+def test_copy_rows_twice_in_one_transaction(engine):
+    """Each call stages rows in its own pg_temp table."""
+    rows = provider_rows(20, territory_id=3)
+
+    with engine.begin() as conn:
+        for batch in [rows[:10], rows[10:]]:
+            assert (
+                copy_rows(conn=conn, table=OhioenergyProvider.__table__, rows=batch)
+                == 10
+            )
+
+    assert count_providers(engine, territory_id=3) == 20
+
+
+def test_save_providers_rerun_inserts_nothing(engine):
+    """Saving the same rows again leaves the providers table alone."""
+    rows = provider_rows(50, territory_id=2)
+
+    assert save_providers(rows=rows, engine=engine) == (50, 0)
+    assert save_providers(rows=rows, engine=engine) == (0, 50)
+    assert count_providers(engine, territory_id=2) == 50
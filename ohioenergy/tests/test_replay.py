@@ -0,0 +1,53 @@
+"""main.py --replay against a throwaway fixtures directory."""
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.fixtures import build_comparison_page
+
+app_dir = Path(__file__).resolve().parent.parent
+
+
+def test_replay_never_writes_to_db_uri(tmp_path):
+    """Replayed items go to --replay-db-uri, never the configured DB_URI."""
+    fixtures_dir = tmp_path / "fixtures"
+    fixtures_dir.mkdir()
+    (fixtures_dir / "Electric_6_1.html").write_text(build_comparison_page(rows=5))
+
+    configured_db = tmp_path / "configured.sqlite"
+    replay_db = tmp_path / "replay.sqlite"
+
+    env = dict(os.environ)
+    env["DB_URI"] = f"sqlite:///{configured_db}"
+    env["SCRAPY_SETTINGS_MODULE"] = "ohioenergy.settings"
+
+    proc = subprocess.run(
+        [
+            sys.executable,
+            str(app_dir / "main.py"),
+            "--replay",
+            str(fixtures_dir),
+            "--replay-db-uri",
+            f"sqlite:///{replay_db}",
+        ],
+        cwd=tmp_path,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+
+    assert not configured_db.exists()
+
+    db = sqlite3.connect(replay_db)
+    try:
+        (snapshots,) = db.execute("SELECT COUNT(*) FROM offer_snapshots").fetchone()
+        (crawl_runs,) = db.execute("SELECT COUNT(*) FROM crawl_runs").fetchone()
+    finally:
+        db.close()
+
+    assert snapshots > 0
+    assert crawl_runs == 0
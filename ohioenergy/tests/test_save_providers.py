@@ -0,0 +1,93 @@
+"""save_providers() change detection against a throwaway SQLite database."""
+import pytest
+from benchmarks.fixtures import build_items
+from core.database import build_engine, init_database
+from lib.db_utils import provider_row_from_item, save_providers
+from models.provider_models import OfferFingerprint, OhioenergyProvider
+from sqlalchemy import func, select
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Build a throwaway SQLite database with every table."""
+    engine = build_engine(f"sqlite:///{tmp_path}/providers.sqlite")
+    init_database(engine)
+
+    yield engine
+
+    engine.dispose()
+
+
+def provider_rows(count: int, scrape_epoch: int, **fields) -> list[dict]:
+    """Build provider rows from synthetic items, with fields overridden."""
+    rows = []
+    for item in build_items(rows=count):
+        item.update(scrape_epoch=scrape_epoch, **fields)
+        rows.append(provider_row_from_item(item))
+
+    return rows
+
+
+def count_providers(engine) -> int:
+    """Count rows in the providers table."""
+    with engine.connect() as conn:
+        return conn.scalar(select(func.count()).select_from(OhioenergyProvider))
+
+
+def fingerprints(engine) -> list:
+    """Return all fingerprints, oldest first."""
+    with engine.connect() as conn:
+        return conn.execute(
+            select(OfferFingerprint).order_by(OfferFingerprint.first_seen)
+        ).all()
+
+
+def test_resaving_the_same_rows_is_a_no_op(engine):
+    """Saving the same rows again inserts nothing & bumps nothing."""
+    rows = provider_rows(20, scrape_epoch=1000)
+
+    assert save_providers(rows=rows, engine=engine) == (20, 0)
+    assert save_providers(rows=rows, engine=engine) == (0, 20)
+
+    assert count_providers(engine) == 20
+    assert {
+        (row.first_seen, row.last_seen, row.seen_count) for row in fingerprints(engine)
+    } == {(1000, 1000, 1)}
+
+
+def test_unchanged_offers_bump_last_seen_from_row_epoch(engine):
+    """A later scrape of unchanged offers bumps last_seen to its epoch."""
+    save_providers(rows=provider_rows(20, scrape_epoch=1000), engine=engine)
+    rows = provider_rows(20, scrape_epoch=2000)
+
+    assert save_providers(rows=rows, engine=engine) == (0, 20)
+
+    assert count_providers(engine) == 20
+    assert {
+        (row.first_seen, row.last_seen, row.seen_count) for row in fingerprints(engine)
+    } == {(1000, 2000, 2)}
+
+
+def test_offer_changing_back_stores_a_new_version(engine):
+    """An offer that changes & changes back stores each version."""
+    ## A -> B -> A, saved in one batch & out of order
+    rows = (
+        provider_rows(1, scrape_epoch=3000, price="0.0519")
+        + provider_rows(1, scrape_epoch=1000, price="0.0519")
+        + provider_rows(1, scrape_epoch=2000, price="0.0699")
+    )
+
+    assert save_providers(rows=rows, engine=engine) == (3, 0)
+    assert save_providers(rows=rows, engine=engine) == (0, 3)
+    assert count_providers(engine) == 3
+
+    with engine.connect() as conn:
+        latest_id = conn.scalar(
+            select(OhioenergyProvider.id).where(OhioenergyProvider.scrape_epoch == 3000)
+        )
+
+    first, second = fingerprints(engine)
+    assert (first.first_seen, first.last_seen, first.seen_count) == (1000, 3000, 2)
+    assert first.provider_id == latest_id
+    assert (second.first_seen, second.last_seen, second.seen_count) == (2000, 2000, 1)
+    assert first.offer_key == second.offer_key
@@ -0,0 +1,46 @@
+"""SegmentLogWriter & iter_segment() round trips & damaged segments."""
+import msgpack
+from lib.segment_log import (
+    SegmentLogWriter,
+    iter_segment,
+    iter_segments,
+    length_prefix,
+    pack_record,
+    segment_suffix,
+)
+
+records = [{"territory_id": n, "name": f"Provider {n}"} for n in range(3)]
+
+
+def write_segment(path, data: bytes):
+    """Write raw bytes as a segment file."""
+    path.write_bytes(data)
+
+    return path
+
+
+def test_round_trip(tmp_path):
+    """Records appended to a segment log read back in order."""
+    with SegmentLogWriter(log_dir=str(tmp_path), prefix="providers") as writer:
+        for record in records:
+            writer.append(record)
+
+    assert list(iter_segments(tmp_path)) == records
+
+
+def test_truncated_tail_is_skipped(tmp_path):
+    """A record cut short at the end of a segment is skipped."""
+    data = b"".join(pack_record(record) for record in records)
+    segment = write_segment(tmp_path / f"truncated{segment_suffix}", data[:-3])
+
+    assert list(iter_segment(segment)) == records[:2]
+
+
+def test_record_must_fill_its_length(tmp_path):
+    """A record whose msgpack object ends before its length is skipped."""
+    ## Two msgpack objects framed as one record
+    packed = msgpack.packb(records[0]) + msgpack.packb(records[1])
+    data = length_prefix.pack(len(packed)) + packed + pack_record(records[2])
+    segment = write_segment(tmp_path / f"extra{segment_suffix}", data)
+
+    assert list(iter_segment(segment)) == [records[2]]